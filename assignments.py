@@ -0,0 +1,191 @@
+"""
+Saved team leader, team and working-day assignments per (year, week).
+
+The GUI saves every confirmed TL dialog here and prefills the dialog from it
+on the next run; pipeline.py reads it to run without the dialog. Entries are
+keyed by ISO week ('2025-W18') so exports that label weeks differently
+("18/2025", "KW18") still find them.
+"""
+import json
+import logging
+import os
+
+from weeks import format_iso_week
+
+logger = logging.getLogger(__name__)
+
+STORE_VERSION = 1
+
+
+class MissingWorkingDays(ValueError):
+    """Fundraisers of the export have no working days and no default was given."""
+
+
+def empty_selection():
+    """
+    Selection with no team leaders and no working days.
+
+    The team leader dialog answers with the same shape:
+    {'team_leaders': {week: {tl_name: working_days}},
+     'team_assignments': {week: {tl_name: [team member names]}},
+     'working_days': {week: {fundraiser_name: working_days}}}
+    """
+    return {'team_leaders': {}, 'team_assignments': {}, 'working_days': {}}
+
+
+def default_store_path():
+    """assignments.json in the per-user application data directory."""
+    base = os.environ.get('APPDATA') or os.path.join(os.path.expanduser('~'), '.config')
+    return os.path.join(base, 'Realisierungsdatenvisualizer', 'assignments.json')
+
+
+def load_store(path=None):
+    """
+    Load saved assignments.
+
+    Returns:
+        Dictionary of ISO week -> {'label', 'working_days', 'team_leaders',
+        'team_assignments'}, empty if nothing was saved yet
+    """
+    path = path or default_store_path()
+    if not os.path.exists(path):
+        return {}
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    return data.get('weeks', {})
+
+
+def save_store(weeks, path=None):
+    """Write saved assignments, replacing the file only once it is complete."""
+    path = path or default_store_path()
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    temp_path = path + '.tmp'
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        json.dump({'version': STORE_VERSION, 'weeks': weeks}, f, ensure_ascii=False, indent=2, sort_keys=True)
+    os.replace(temp_path, path)
+
+
+def store_selection(selection, week_keys, path=None):
+    """
+    Save a confirmed selection, replacing the stored entries of its weeks.
+
+    Args:
+        selection: Selection dict keyed by calendar week label
+        week_keys: {Calendar week label: week key}
+        path: Store file (default: default_store_path())
+    """
+    save_store(merge_selection(load_store(path), selection, week_keys), path)
+
+
+def merge_selection(weeks, selection, week_keys):
+    """
+    Replace the entries of a selection's weeks in loaded assignments.
+
+    Args:
+        weeks: Saved assignments as returned by load_store (updated in place)
+        selection: Selection dict keyed by calendar week label
+        week_keys: {Calendar week label: week key}
+
+    Returns:
+        weeks
+    """
+    for label, working_days in selection['working_days'].items():
+        key = week_keys.get(label)
+        if not key:
+            continue
+        weeks[format_iso_week(key)] = {
+            'label': label,
+            'working_days': working_days,
+            'team_leaders': selection['team_leaders'].get(label, {}),
+            'team_assignments': selection['team_assignments'].get(label, {}),
+        }
+    return weeks
+
+
+def prefill_selection(fundraisers_by_week, week_keys, weeks):
+    """
+    Selection for this export's weeks from saved assignments, and the roster changes.
+
+    Fundraisers no longer in a week are dropped from its saved entry;
+    fundraisers new to it get no working days.
+
+    Args:
+        fundraisers_by_week: {week label: [fundraiser names]} of this export
+        week_keys: {week label: week key}
+        weeks: Saved assignments as returned by load_store
+
+    Returns:
+        Tuple of (selection dict keyed by week label, roster diff
+        {week label: {'stored': bool, 'added': [names], 'removed': [names]}})
+    """
+    selection = empty_selection()
+    diff = {}
+    for label, names in fundraisers_by_week.items():
+        key = week_keys.get(label)
+        entry = weeks.get(format_iso_week(key)) if key else None
+        if entry is None:
+            diff[label] = {'stored': False, 'added': sorted(names), 'removed': []}
+            continue
+
+        present = set(names)
+        stored = set(entry['working_days'])
+        selection['working_days'][label] = {name: days for name, days in entry['working_days'].items()
+                                            if name in present}
+        selection['team_leaders'][label] = {name: days for name, days in entry['team_leaders'].items()
+                                            if name in present}
+        selection['team_assignments'][label] = {tl: [name for name in members if name in present]
+                                                for tl, members in entry['team_assignments'].items()
+                                                if tl in present}
+        diff[label] = {'stored': True, 'added': sorted(present - stored), 'removed': sorted(stored - present)}
+    return selection, diff
+
+
+def format_roster_diff(diff):
+    """One line per week whose roster differs from the saved one (or that was never saved)."""
+    lines = []
+    for label, change in diff.items():
+        if not change['stored']:
+            lines.append(f"{label}: no saved assignments")
+            continue
+        parts = []
+        if change['added']:
+            parts.append("new: " + ", ".join(change['added']))
+        if change['removed']:
+            parts.append("no longer in export: " + ", ".join(change['removed']))
+        if parts:
+            lines.append(f"{label}: " + "; ".join(parts))
+    return lines
+
+
+def missing_working_days(fundraisers_by_week, selection):
+    """(week label, fundraiser name) pairs the selection has no working days for."""
+    return [(label, name) for label, names in fundraisers_by_week.items() for name in names
+            if name not in selection['working_days'].get(label, {})]
+
+
+def stored_selection(path=None, default_days=None):
+    """
+    request_selection for pipeline.process_export that answers from saved assignments.
+
+    Args:
+        path: Store file (default: default_store_path())
+        default_days: Working days for fundraisers without saved ones; when
+            None, any missing working days raise MissingWorkingDays
+
+    Returns:
+        Callable taking (fundraisers_by_week, week_keys, fundraiser_ids)
+    """
+    def request_selection(fundraisers_by_week, week_keys, fundraiser_ids=None):
+        selection, diff = prefill_selection(fundraisers_by_week, week_keys, load_store(path))
+        for line in format_roster_diff(diff):
+            logger.info("Roster change %s", line)
+
+        missing = missing_working_days(fundraisers_by_week, selection)
+        if missing and default_days is None:
+            listed = ", ".join(f"{name} ({label})" for label, name in missing[:10])
+            more = f" and {len(missing) - 10} more" if len(missing) > 10 else ""
+            raise MissingWorkingDays(f"No saved working days for {listed}{more}")
+        for label, name in missing:
+            selection['working_days'].setdefault(label, {})[name] = default_days
+        return lambda: selection
+    return request_selection
@@ -0,0 +1,277 @@
+"""
+Benchmark every pipeline stage on synthetic exports of several sizes.
+
+Each size is generated once with synthetic_export.py (and reused from the
+data directory afterwards), then run through pipeline.run with working days
+for everyone and a team leader for every eight fundraisers, so the team
+leader bonus code runs too. Stage times come from an instrument.RunReport
+around the run; the HTML reports are rendered from the formatted CSV
+afterwards.
+Each size runs --repeat times and keeps the fastest time per stage.
+Reports are rendered in the first run only, and only for sizes up to
+--render-max-rows: PDF rendering currently re-reads the formatted CSV for
+every fundraiser, so its time grows with rows times fundraisers.
+
+    python benchmark.py -o results.json --save-baseline baseline.json
+    python benchmark.py -o results.json --baseline baseline.json --threshold 0.25
+
+With --baseline, a stage that is more than --threshold slower than the
+baseline (and at least --min-seconds slower, to ignore noise on tiny
+stages) is reported as a regression and the exit status is 1.
+"""
+import contextlib
+import io
+import json
+import os
+import platform
+import shutil
+import tempfile
+import time
+
+# Sizes: (fundraisers, weeks, donor rows)
+SIZES = {
+    '2k': (20, 5, 2_000),
+    '10k': (100, 5, 10_000),
+    '100k': (400, 10, 100_000),
+    '1m': (1000, 20, 1_000_000),
+}
+
+# Progress stage -> benchmark stage name; 'selection' only waits for the answer
+STAGE_NAMES = {
+    'parse': 'read_clean',
+    'points': 'points',
+    'eligibility': 'eligibility',
+    'payouts': 'payouts_tl_bonuses',
+    'csv': 'csv_write',
+    'render': 'pdf_render',
+}
+
+# Fundraisers per team in the benchmark selection (one of them the team leader)
+TEAM_SIZE = 8
+
+# Largest size (donor rows) whose PDF and HTML reports are rendered
+RENDER_MAX_ROWS = 10_000
+
+DEFAULT_THRESHOLD = 0.25
+DEFAULT_MIN_SECONDS = 0.05
+
+
+def benchmark_selection(fundraisers_by_week, week_keys, fundraiser_ids=None):
+    """
+    request_selection answering with 5 working days for every fundraiser and
+    a team leader for every TEAM_SIZE fundraisers of a week.
+    """
+    selection = {'team_leaders': {}, 'team_assignments': {}, 'working_days': {}}
+    for week, names in fundraisers_by_week.items():
+        names = sorted(names)
+        selection['working_days'][week] = {name: 5 for name in names}
+        for start in range(0, len(names), TEAM_SIZE):
+            team_leader, *members = names[start:start + TEAM_SIZE]
+            selection['team_leaders'].setdefault(week, {})[team_leader] = 5
+            selection['team_assignments'].setdefault(week, {})[team_leader] = members
+    return lambda: selection
+
+
+def synthetic_file(size, data_dir, seed=0):
+    """Path of the synthetic export for a size, generating it if missing."""
+    from synthetic_export import generate_export
+
+    if size not in SIZES:
+        raise ValueError(f"Unknown size {size!r}, expected one of {', '.join(SIZES)}")
+    path = os.path.join(data_dir, f"synthetic_{size}_seed{seed}.csv")
+    if not os.path.exists(path):
+        os.makedirs(data_dir, exist_ok=True)
+        fundraisers, weeks, donors = SIZES[size]
+        # Write under a temporary name so an interrupted run leaves no partial file
+        generate_export(path + '.tmp', fundraisers, weeks, donors, seed=seed)
+        os.replace(path + '.tmp', path)
+    return path
+
+
+def run_once(input_file, work_dir, render=True):
+    """
+    Stage times of one pipeline run and HTML rendering.
+
+    Returns:
+        Dictionary with 'stages' ({stage name: seconds}), 'rows',
+        'pdf_files' and 'html_files' (reports rendered)
+    """
+    from pipeline import PipelineConfig, run
+    from html_generator import generate_all_html_files
+    from instrument import RunReport
+    from weeks import week_key_map
+
+    output_file = os.path.join(work_dir, 'formatted.csv')
+    config = PipelineConfig(input_file, output_file, os.path.join(work_dir, 'pdf'), generate_pdf=render,
+                            request_selection=benchmark_selection)
+    # Keep anything the run prints out of the results
+    with RunReport() as report, contextlib.redirect_stdout(io.StringIO()):
+        result = run(config)
+    stages = {STAGE_NAMES[record['stage']]: record['wall_s'] for record in report.stages
+              if record['stage'] in STAGE_NAMES}
+
+    html_files = []
+    if render:
+        from csv_formatter import read_export
+
+        week_keys = week_key_map(read_export(input_file))
+        template = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'realisierungsdaten.html')
+        with RunReport() as report, contextlib.redirect_stdout(io.StringIO()):
+            html_files = generate_all_html_files(output_file, template, os.path.join(work_dir, 'html'),
+                                                 week_keys=week_keys)
+        stages['html_render'] = sum(record['wall_s'] for record in report.stages)
+    return {'stages': stages, 'rows': result['rows'], 'pdf_files': len(result['pdf_files']),
+            'html_files': len(html_files)}
+
+
+def run_benchmark(sizes=('2k', '10k', '100k'), repeat=3, data_dir=None, seed=0, render_max_rows=RENDER_MAX_ROWS):
+    """
+    Benchmark the pipeline stages on synthetic exports.
+
+    Args:
+        sizes: Names from SIZES
+        repeat: Runs per size; the fastest time per stage is kept
+        data_dir: Directory for the synthetic exports (default: a
+            'benchmark_data' directory in the system temp directory)
+        seed: Seed of the synthetic exports
+        render_max_rows: Render the PDF and HTML reports (in the first
+            run) for sizes with up to this many donor rows
+
+    Returns:
+        Dictionary with 'created', 'python', 'platform' and 'sizes':
+        {size: {'donor_rows', 'output_rows', 'fundraisers', 'stages':
+        {stage: seconds}, 'per_fundraiser': {'pdf_render', 'html_render'}}}
+    """
+    from synthetic_export import plan_export
+
+    data_dir = data_dir or os.path.join(tempfile.gettempdir(), 'benchmark_data')
+    results = {}
+    for size in sizes:
+        input_file = synthetic_file(size, data_dir, seed)
+        fundraisers, weeks, donors = SIZES[size]
+        runs = []
+        for index in range(repeat):
+            work_dir = tempfile.mkdtemp(prefix=f'benchmark_{size}_')
+            try:
+                runs.append(run_once(input_file, work_dir, render=index == 0 and donors <= render_max_rows))
+            finally:
+                shutil.rmtree(work_dir, ignore_errors=True)
+        stages = {stage: round(min(run['stages'][stage] for run in runs if stage in run['stages']), 4)
+                  for stage in runs[0]['stages']}
+        reports = {'pdf_render': runs[0]['pdf_files'], 'html_render': runs[0]['html_files']}
+        results[size] = {
+            'donor_rows': int(plan_export(fundraisers, weeks, donors, seed=seed)['counts'].sum()),
+            'output_rows': runs[0]['rows'],
+            'fundraisers': fundraisers,
+            'stages': stages,
+            'per_fundraiser': {stage: round(stages[stage] / reports[stage], 5)
+                               for stage in reports if stage in stages and reports[stage]},
+        }
+    return {
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'repeat': repeat,
+        'sizes': results,
+    }
+
+
+def compare(results, baseline, threshold=DEFAULT_THRESHOLD, min_seconds=DEFAULT_MIN_SECONDS):
+    """
+    Stage times of results against a baseline.
+
+    Args:
+        results: run_benchmark result
+        baseline: Earlier run_benchmark result
+        threshold: Allowed slowdown as a fraction (0.25 = 25% slower)
+        min_seconds: Slowdowns below this many seconds never count
+
+    Returns:
+        List of dicts with 'size', 'stage', 'baseline', 'seconds', 'change'
+        (fraction) and 'regression', for the stages found in both
+    """
+    rows = []
+    for size, result in results['sizes'].items():
+        before = baseline.get('sizes', {}).get(size)
+        if before is None:
+            continue
+        for stage, seconds in result['stages'].items():
+            if stage not in before['stages']:
+                continue
+            reference = before['stages'][stage]
+            change = (seconds - reference) / reference if reference else 0.0
+            rows.append({
+                'size': size,
+                'stage': stage,
+                'baseline': reference,
+                'seconds': seconds,
+                'change': round(change, 3),
+                'regression': change > threshold and seconds - reference > min_seconds,
+            })
+    return rows
+
+
+def format_results(results, comparison=None):
+    """Table lines of a run_benchmark result, with the baseline comparison when given."""
+    changes = {(row['size'], row['stage']): row for row in comparison or []}
+    lines = []
+    for size, result in results['sizes'].items():
+        lines.append(f"{size}: {result['donor_rows']:,} donor rows, {result['fundraisers']} fundraisers")
+        for stage, seconds in result['stages'].items():
+            line = f"  {stage:<20} {seconds:>9.3f} s"
+            if stage in result['per_fundraiser']:
+                line += f"  ({result['per_fundraiser'][stage] * 1000:.1f} ms per fundraiser)"
+            row = changes.get((size, stage))
+            if row:
+                line += f"  {row['change']:+.0%} vs {row['baseline']:.3f} s"
+                if row['regression']:
+                    line += "  REGRESSION"
+            lines.append(line)
+    return lines
+
+
+if __name__ == "__main__":
+    import argparse
+    import sys
+
+    parser = argparse.ArgumentParser(description='Benchmark the pipeline stages on synthetic exports')
+    parser.add_argument('--sizes', nargs='+', default=['2k', '10k', '100k'], choices=list(SIZES),
+                        help='Export sizes to run (default: 2k 10k 100k)')
+    parser.add_argument('--repeat', type=int, default=3,
+                        help='Runs per size, keeping the fastest time per stage (default: 3)')
+    parser.add_argument('--seed', type=int, default=0, help='Seed of the synthetic exports (default: 0)')
+    parser.add_argument('--data-dir', help='Directory for the synthetic exports (default: system temp directory)')
+    parser.add_argument('--render-max-rows', type=int, default=RENDER_MAX_ROWS,
+                        help=f'Render PDF and HTML reports for sizes up to this many donor rows; '
+                             f'0 skips rendering (default: {RENDER_MAX_ROWS})')
+    parser.add_argument('--output', '-o', help='Write the results to this JSON file')
+    parser.add_argument('--baseline', help='Compare against this earlier results JSON file')
+    parser.add_argument('--save-baseline', help='Also write the results to this baseline JSON file')
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help=f'Allowed slowdown per stage as a fraction (default: {DEFAULT_THRESHOLD})')
+    parser.add_argument('--min-seconds', type=float, default=DEFAULT_MIN_SECONDS,
+                        help=f'Ignore slowdowns below this many seconds (default: {DEFAULT_MIN_SECONDS})')
+
+    args = parser.parse_args()
+
+    results = run_benchmark(args.sizes, args.repeat, args.data_dir, args.seed, args.render_max_rows)
+    comparison = None
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            comparison = compare(results, json.load(f), args.threshold, args.min_seconds)
+        results['comparison'] = comparison
+
+    print("\n".join(format_results(results, comparison)))
+    for path in (args.output, args.save_baseline):
+        if path:
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump(results, f, indent=2)
+            print(f"Wrote {path}")
+
+    regressions = [row for row in comparison or [] if row['regression']]
+    if regressions:
+        print(f"\n{len(regressions)} stage(s) regressed by more than {args.threshold:.0%}:")
+        for row in regressions:
+            print(f"  {row['size']} {row['stage']}: {row['baseline']:.3f} s -> {row['seconds']:.3f} s "
+                  f"({row['change']:+.0%})")
+        sys.exit(1)
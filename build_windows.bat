@@ -43,9 +43,13 @@ echo Building with PyInstaller...
 pyinstaller --onefile --windowed ^
     --name "Realisierungsdatenvisualizer" ^
     --add-data "realisierungsdaten.html;." ^
+    --add-data "rules.json;." ^
     --hidden-import=tkinterdnd2 ^
     --hidden-import=pandas ^
     --hidden-import=numpy ^
+    --hidden-import=pipeline ^
+    --hidden-import=results_view ^
+    --splash "logo.png" ^
     --distpath=dist ^
     --workpath=build ^
     csv_formatter_gui.py
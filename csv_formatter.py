@@ -1,9 +1,25 @@
 import pandas as pd
 import numpy as np
 from collections import defaultdict
+import logging
 import os
 import sys
-from pdf_generator import generate_all_pdf_files
+from rules import load_rules
+from weeks import parse_week_keys, parse_created_dates
+from logs import add_logging_arguments, configure_from_args
+
+logger = logging.getLogger(__name__)
+
+EXPORT_ENCODINGS = ['utf-8-sig', 'utf-8', 'cp1252', 'iso-8859-1']
+
+# Export columns the formatter works with; the rest are not loaded
+EXPORT_COLUMNS = ['Billing group', 'Fundraiser ID', 'Fundraiser Name', 'Calendar week', 'Public RefID',
+                  'Age', 'Interval', 'Time Created', 'status_agency', 'Amount Yearly']
+
+# Repeated strings of the working frame, kept as categoricals with sorted
+# categories so sorting and grouping run on the integer codes
+CATEGORY_COLUMNS = ['Fundraiser ID', 'Fundraiser Name', 'Calendar week', 'Billing group',
+                    'Interval', 'status_agency', 'Time Created']
 
 def get_resource_path(relative_path):
     """Get absolute path to resource, works for dev and PyInstaller bundle"""
@@ -16,117 +32,63 @@ def get_resource_path(relative_path):
 
     return os.path.join(base_path, relative_path)
 
-def calculate_points(age, interval, amount_yearly):
+def calculate_points(age, interval, amount_yearly, rules=None, week_key=None):
     """
     Calculate points based on age, donation interval, and yearly amount.
-    Rules:
+    Rules (see rules.json):
     - Spenderin unter 25 Jahren pauschal 0,5 Punkte
     - Spenderin unter 30 Jahren: monatlich 0,5 Punkte, sonst pauschal 1 Punkt
     - Spenderin ab 30 reguläre Punktevergabe nach Tabelle
-    - Spenderin über 40 Jahre: +1 extra Punkt
+    - Spenderin ab 41 Jahren: +1 extra Punkt
 
     Point table:
     Jahresbeitrag | Jährlich | Halbjährlich | Monatlich
+    Unter 120 €  |    1     |     0,5      |    0,5
     Ab 120 €     |    2     |     1,5      |     1
     Ab 180 €     |    3     |     2,5      |    1,5
     Ab 240 €     |    4     |      3       |     2
     Ab 360 €     |    5     |      4       |     3
     """
-    age = int(age)
-    amount = float(amount_yearly)
-
-    # Under 25: always 0.5 points
-    if age < 25:
-        return 0.5
-
-    # Under 30 but 25+: monthly = 0.5, others = 1
-    if age < 30:
-        return 0.5 if interval.lower() == 'monthly' else 1.0
-
-    # 30+ follow the point table
-    base_points = 0
-    interval_lower = interval.lower()
-
-    if amount >= 360:
-        if 'yearly' in interval_lower or 'jährlich' in interval_lower:
-            base_points = 5
-        elif 'half' in interval_lower or 'halbjährlich' in interval_lower:
-            base_points = 4
-        else:  # monthly/monatlich
-            base_points = 3
-    elif amount >= 240:
-        if 'yearly' in interval_lower or 'jährlich' in interval_lower:
-            base_points = 4
-        elif 'half' in interval_lower or 'halbjährlich' in interval_lower:
-            base_points = 3
-        else:  # monthly/monatlich
-            base_points = 2
-    elif amount >= 180:
-        if 'yearly' in interval_lower or 'jährlich' in interval_lower:
-            base_points = 3
-        elif 'half' in interval_lower or 'halbjährlich' in interval_lower:
-            base_points = 2.5
-        else:  # monthly/monatlich
-            base_points = 1.5
-    elif amount >= 120:
-        if 'yearly' in interval_lower or 'jährlich' in interval_lower:
-            base_points = 2
-        elif 'half' in interval_lower or 'halbjährlich' in interval_lower:
-            base_points = 1.5
-        else:  # monthly/monatlich
-            base_points = 1
-    else:
-        # Less than 120€ - minimum points based on interval
-        if 'yearly' in interval_lower or 'jährlich' in interval_lower:
-            base_points = 1
-        elif 'half' in interval_lower or 'halbjährlich' in interval_lower:
-            base_points = 0.5
-        else:  # monthly/monatlich
-            base_points = 0.5
-
-    # Over 40 (not 40+): +1 extra point
-    if age > 40:
-        base_points += 1
-
-    return base_points
-
-def calculate_bonus_eligibility(fundraiser_data):
+    if rules is None:
+        rules = load_rules()
+    return rules.donor_points(age, interval, amount_yearly, week_key)
+
+def calculate_bonus_eligibility(fundraiser_data, rules=None, week_key=None):
     """
     Calculate if fundraiser is eligible for bonus based on 70% approved rule.
     Only count cancellation and active/billable donors for that person.
     """
-    # Filter for cancellation and active/billable status only
-    relevant_donors = fundraiser_data[
-        fundraiser_data['status_agency'].isin(['cancelled', 'active', 'billable', 'approved', 'conditionally approved', 'failed'])
-    ]
-    
-    total_donors = len(relevant_donors)
-    # Count both 'approved' and 'conditionally approved' as approved
-    approved_donors = len(relevant_donors[
-        relevant_donors['status_agency'].isin(['approved', 'conditionally approved'])
-    ])
-    
-    if total_donors == 0:
-        return 'not-eligible'
-    
-    approval_rate = approved_donors / total_donors
-    return 'eligible' if approval_rate >= 0.7 else 'not-eligible'
+    if rules is None:
+        rules = load_rules()
+    return rules.eligibility_status(fundraiser_data['status_agency'], week_key)
 
-def format_csv(input_file, output_file, generate_pdf=True, pdf_output_dir=None):
+def read_export(input_file):
     """
-    Main function to reformat the CSV according to specifications and optionally generate PDF files.
+    Read an agency export and return one cleaned row per donor.
+
+    Drops subtotal/total rows and rows without a Public RefID, forward-fills
+    the fundraiser columns and adds the integer (year, week) 'week_key'
+    column that all grouping and sorting by week uses. Only EXPORT_COLUMNS
+    are loaded, and the frame is compacted (see compact_frame).
 
     Args:
-        input_file: Path to input CSV file
-        output_file: Path to output CSV file
-        generate_pdf: Whether to generate PDF files for each fundraiser
-        pdf_output_dir: Custom directory for PDF output (optional)
+        input_file: Path to the agency CSV export
 
     Returns:
-        dict: Summary of processing results
+        pandas DataFrame with one row per donor
     """
-    # Read CSV, skipping the first 2 header rows
-    df = pd.read_csv(input_file, sep=';', encoding='utf-8-sig', skiprows=2)
+    # Read CSV, skipping the first 2 header rows; exports saved by Excel on
+    # Windows are not always UTF-8
+    df = None
+    for encoding in EXPORT_ENCODINGS:
+        try:
+            df = pd.read_csv(input_file, sep=';', encoding=encoding, skiprows=2,
+                             usecols=lambda column: column.strip() in EXPORT_COLUMNS)
+            break
+        except UnicodeDecodeError:
+            continue
+    if df is None:
+        raise ValueError(f"Could not read {input_file} with any supported encoding")
     
     # Clean column names
     df.columns = df.columns.str.strip()
@@ -147,145 +109,165 @@ def format_csv(input_file, output_file, generate_pdf=True, pdf_output_dir=None):
     # Preserve original formatting for Fundraiser ID (keep leading zeros)
     df['Fundraiser ID'] = df['Fundraiser ID'].astype(str).str.replace('.0', '').str.zfill(5)
     
-    # Extract calendar week number for sorting
-    df['KW_num'] = df['Calendar week'].str.extract(r'(\d+)').fillna(0).astype(int)
-    
-    # Calculate points for each donor
-    df['points'] = df.apply(lambda row: calculate_points(
-        row['Age'], row['Interval'], row['Amount Yearly']
-    ), axis=1)
-    
-    # Group by fundraiser to calculate bonus eligibility
-    fundraiser_bonus = {}
-    for fundraiser_id in df['Fundraiser ID'].unique():
-        if pd.notna(fundraiser_id):
-            fundraiser_data = df[df['Fundraiser ID'] == fundraiser_id]
-            fundraiser_bonus[fundraiser_id] = calculate_bonus_eligibility(fundraiser_data)
-    
-    # Add bonus status to dataframe
-    df['bonus_status'] = df['Fundraiser ID'].map(fundraiser_bonus)
-    
-    # Sort by KW number, then by Fundraiser Name alphabetically
-    df_sorted = df.sort_values(['KW_num', 'Fundraiser Name', 'Billing group'])
-    
-    # Select only required columns (removed billing group)
-    required_columns = [
-        'Fundraiser ID', 'Fundraiser Name', 'Calendar week',
-        'Public RefID', 'Age', 'Interval', 'Amount Yearly', 'status_agency',
-        'points', 'bonus_status'
-    ]
-    
-    # Create output dataframe with subtotals
-    final_rows = []
-    
-    # Process data grouped by KW and Fundraiser
-    for kw_num in sorted(df_sorted['KW_num'].dropna().unique()):
-        if kw_num == 0:
-            continue
-            
-        # Fix calendar week formatting for weeks 1-12
-        if kw_num <= 12:
-            kw_str = f"KW{int(kw_num)}"
-            # Match calendar week data properly for weeks 1-12
-            kw_data = df_sorted[
-                (df_sorted['Calendar week'].str.contains(f'KW{int(kw_num)}', na=False)) |
-                (df_sorted['Calendar week'].str.contains(f'{int(kw_num)}/2025', na=False))
-            ]
-        else:
-            kw_str = f"{int(kw_num)}/2025"
-            kw_data = df_sorted[df_sorted['Calendar week'] == kw_str]
-        
-        for fundraiser_name in sorted(kw_data['Fundraiser Name'].dropna().unique()):
-            fundraiser_data = kw_data[kw_data['Fundraiser Name'] == fundraiser_name]
-            
-            # Add all individual entries for this fundraiser
-            for i, (_, row) in enumerate(fundraiser_data.iterrows()):
-                row_dict = row[required_columns].to_dict()
-                
-                # Don't show bonus_status on individual rows anymore
-                row_dict['bonus_status'] = ''
-                    
-                final_rows.append(row_dict)
-            
-            # Add subtotal row for this fundraiser
-            # Exclude cancelled donors from total points calculation
-            non_cancelled_data = fundraiser_data[fundraiser_data['status_agency'] != 'cancelled']
-            total_points = non_cancelled_data['points'].sum()
-            bonus_status = fundraiser_data['bonus_status'].iloc[0]
-            
-            subtotal_row = {
-                'Fundraiser ID': '',
-                'Fundraiser Name': '',
-                'Calendar week': '',
-                'Public RefID': '',
-                'Age': '',
-                'Interval': '',
-                'Amount Yearly': '',
-                'status_agency': '',
-                'points': f"Total: {total_points}",
-                'bonus_status': bonus_status
-            }
-            final_rows.append(subtotal_row)
-    
-    # Create final dataframe
-    final_df = pd.DataFrame(final_rows)
-    
-    # Save to CSV with original styling
-    import datetime
-    current_date = datetime.datetime.now().strftime("%Y-%m-%d")
-    
-    # Create header rows like the original
-    header_lines = [
-        f"WoVi_CW_Formatted_{current_date};" + ";" * (len(required_columns) - 1),
-        ";" * len(required_columns)
-    ]
-    
-    # Write the file with custom headers
-    with open(output_file, 'w', encoding='utf-8-sig', newline='') as f:
-        # Write header lines
-        for line in header_lines:
-            f.write(line + '\n')
-        
-        # Write column headers
-        f.write(';'.join(required_columns) + '\n')
-        
-        # Write data
-        for _, row in final_df.iterrows():
-            row_values = []
-            for col in required_columns:
-                value = row[col]
-                if pd.isna(value) or value == '':
-                    row_values.append('')
-                else:
-                    # Format numeric values properly
-                    if col == 'points' and isinstance(value, (int, float)) and not str(value).startswith('Total:'):
-                        row_values.append(str(value).replace('.', ','))  # Use comma as decimal separator
-                    else:
-                        row_values.append(str(value))
-            f.write(';'.join(row_values) + '\n')
-    
-    print(f"CSV formatted successfully! Output saved to: {output_file}")
-    print(f"Total rows processed: {len(final_df)}")
-    print(f"Added subtotal rows for each fundraiser per calendar week")
+    # Parse each calendar week once into a (year, week) key; weeks without
+    # a year ("KW5") take it from the donor's creation date
+    created = df['Time Created'] if 'Time Created' in df.columns else None
+    df['week_key'] = parse_week_keys(df['Calendar week'], created=created)
 
-    # Generate PDF files if requested
-    pdf_files = []
-    if generate_pdf:
-        try:
-            print("\nGenerating PDF files for each fundraiser...")
-            pdf_files = generate_all_pdf_files(output_file, pdf_output_dir)
-            if pdf_files:
-                pdf_dir = os.path.dirname(pdf_files[0])
-                print(f"Generated {len(pdf_files)} PDF files in '{pdf_dir}' directory")
-            else:
-                print("No PDF files were generated")
-        except Exception as e:
-            print(f"Error generating PDF files: {e}")
+    return compact_frame(df)
+
+def read_exports(input_files):
+    """
+    Read one export, or several overlapping ones as one.
 
+    Each file gets read_export's cleaning; the rows are then concatenated
+    and a Public RefID that appears in several files is kept once: the row
+    with the latest 'Time Created' wins, and on equal or unparseable dates
+    the one from the later file (a re-export carries the newer status).
+
+    Args:
+        input_files: Path of an export, or a list of paths
+
+    Returns:
+        pandas DataFrame with one row per donor, as read_export
+    """
+    if isinstance(input_files, str):
+        return read_export(input_files)
+    if len(input_files) == 1:
+        return read_export(input_files[0])
+
+    frames = [read_export(input_file) for input_file in input_files]
+    # Keys per file: numeric RefIDs in one file and text in another still match
+    keys = pd.concat([public_refids(frame['Public RefID']) for frame in frames], ignore_index=True)
+    created = pd.concat([_created_dates(frame) for frame in frames], ignore_index=True)
+    file_index = np.repeat(np.arange(len(frames)), [len(frame) for frame in frames])
+    df = pd.concat(frames, ignore_index=True)
+
+    # Latest wins: sort so the winner of every RefID comes last, keep it, then
+    # restore the export order
+    order = pd.DataFrame({'key': keys, 'created': created, 'file': file_index, 'position': np.arange(len(df))})
+    order = order.sort_values(['key', 'created', 'file', 'position'], na_position='first', kind='stable')
+    keep = np.sort(order.drop_duplicates('key', keep='last')['position'].to_numpy())
+    logger.info("Merged %d exports: %d rows, %d duplicate Public RefIDs dropped", len(frames), len(df), len(df) - len(keep))
+
+    # Categoricals with different categories per file concatenate to objects
+    return compact_frame(df.iloc[keep].reset_index(drop=True))
+
+def _created_dates(df):
+    """'Time Created' as datetimes (NaT where the column or a date is missing)."""
+    if 'Time Created' not in df.columns:
+        return pd.Series(pd.NaT, index=range(len(df)), dtype='datetime64[ns]')
+    return parse_created_dates(df['Time Created'])
+
+def compact_frame(df):
+    """
+    Convert the working frame to compact dtypes.
+
+    String columns become categoricals with sorted categories, Age becomes a
+    nullable int16 and Amount Yearly float32. Sorting by a categorical then
+    sorts its integer codes, which gives the same order as the strings.
+
+    Args:
+        df: Donor rows with the export's object columns
+
+    Returns:
+        The same frame with compact dtypes
+    """
+    for column in CATEGORY_COLUMNS:
+        if column in df.columns:
+            df[column] = df[column].astype('category')
+    df['Age'] = pd.to_numeric(df['Age'], errors='coerce').round().astype('Int16')
+    df['Amount Yearly'] = pd.to_numeric(df['Amount Yearly'], errors='coerce').astype(np.float32)
+    return df
+
+def public_refids(values):
+    """
+    Public RefIDs as text keys.
+
+    pandas reads all-numeric RefID columns as floats; those come back as
+    '330000248', not '330000248.0', so keys match across exports.
+    """
+    values = pd.Series(values)
+    if pd.api.types.is_numeric_dtype(values):
+        return values.round().astype('int64').astype(str)
+    return values.astype(str).str.strip()
+
+def output_frame(df, columns):
+    """
+    Copy of the given columns with the values the formatted CSV is written with.
+
+    Ages are written as floats as before, and float32 amounts go through their
+    shortest representation so 1.08 is not written as 1.0800000190734863.
+    """
+    output = df[columns].copy()
+    if 'Age' in output.columns:
+        output['Age'] = output['Age'].astype(float)
+    if 'Amount Yearly' in output.columns:
+        output['Amount Yearly'] = output['Amount Yearly'].astype(str).astype(float)
+    return output
+
+def memory_report(input_file):
+    """
+    Compare the memory of plain pandas frames with the compact working frame.
+
+    Args:
+        input_file: Path to the agency CSV export
+
+    Returns:
+        dict with 'rows', 'plain_bytes' (whole export, default dtypes),
+        'plain_working_bytes' (working columns, default dtypes),
+        'compact_bytes' and 'ratio' (plain working / compact)
+    """
+    plain = pd.read_csv(input_file, sep=';', encoding='utf-8-sig', skiprows=2)
+    plain.columns = plain.columns.str.strip()
+    compact = read_export(input_file)
+
+    # Same rows and columns as the working frame, with pandas' default dtypes
+    plain_working = plain.loc[compact.index, [c for c in compact.columns if c in plain.columns]]
+    plain_working = plain_working.assign(week_key=compact['week_key'].astype(np.int64))
+
+    plain_bytes = int(plain.memory_usage(deep=True).sum())
+    plain_working_bytes = int(plain_working.memory_usage(deep=True).sum())
+    compact_bytes = int(compact.memory_usage(deep=True).sum())
     return {
-        "csv_rows": len(final_df),
-        "pdf_files": pdf_files,
-        "csv_path": output_file
+        "rows": len(compact),
+        "plain_bytes": plain_bytes,
+        "plain_working_bytes": plain_working_bytes,
+        "compact_bytes": compact_bytes,
+        "ratio": plain_working_bytes / compact_bytes if compact_bytes else 0.0
+    }
+
+def format_csv(input_file, output_file, generate_pdf=True, pdf_output_dir=None, rules_file=None, progress=None):
+    """
+    Main function to reformat the CSV according to specifications and optionally generate PDF files.
+
+    This is pipeline.process_export without payouts and team leader bonuses:
+    donor rows with points and a subtotal row per fundraiser and week.
+
+    Args:
+        input_file: Path to input CSV file, or a list of overlapping exports
+            to merge (see read_exports)
+        output_file: Path to output CSV file
+        generate_pdf: Whether to generate PDF files for each fundraiser
+        pdf_output_dir: Custom directory for PDF output (optional)
+        rules_file: Path to a rules JSON file (optional, defaults to rules.json)
+        progress: Optional progress.Progress for stage updates and cancellation
+
+    Returns:
+        dict: Summary of processing results
+    """
+    # Imported here: pipeline imports this module
+    from pipeline import process_export
+    rules = load_rules(rules_file)
+    result = process_export(input_file, output_file, pdf_output_dir, progress=progress, rules=rules,
+                            generate_pdf=generate_pdf, include_payouts=False)
+    logger.info("CSV formatted: %d rows with subtotals per fundraiser and week written to %s",
+                result['rows'], output_file)
+    return {
+        "csv_rows": result['rows'],
+        "pdf_files": result['pdf_files'],
+        "csv_path": output_file,
+        "rules_version": result['rules_version']
     }
 
 if __name__ == "__main__":
@@ -295,30 +277,78 @@ if __name__ == "__main__":
     parser.add_argument('input_file', help='Input CSV file path')
     parser.add_argument('output_file', nargs='?', default=None,
                        help='Output CSV file path (optional, defaults to input_formatted.csv)')
+    parser.add_argument('--merge', nargs='+', dest='merge_files', default=[], metavar='FILE',
+                       help='Further exports to process together with the input as one; '
+                            'donors in several files are counted once (by Public RefID)')
     parser.add_argument('--pdf-dir', '-p', dest='pdf_output_dir',
                        help='Custom directory for PDF output')
     parser.add_argument('--no-pdf', action='store_true',
                        help='Skip PDF generation')
+    parser.add_argument('--no-payouts', action='store_true',
+                       help='Only format the export and score points, without payouts and team leader bonuses')
+    parser.add_argument('--memory-report', action='store_true',
+                       help='Only print the memory of the compact working frame vs plain pandas')
+    # Imported here: pipeline imports this module
+    from pipeline import PipelineConfig, run, add_config_arguments, config_options
+    from assignments import MissingWorkingDays
+    from instrument import RunReport, add_report_arguments, format_report, report_path
+    add_config_arguments(parser)
+    add_report_arguments(parser)
+    add_logging_arguments(parser)
 
     args = parser.parse_args()
+    configure_from_args(args)
+
+    if args.memory_report:
+        report = memory_report(args.input_file)
+        print(f"Rows: {report['rows']}")
+        print(f"Whole export, default dtypes: {report['plain_bytes'] / 1024 / 1024:.2f} MB")
+        print(f"Working columns, default dtypes: {report['plain_working_bytes'] / 1024 / 1024:.2f} MB")
+        print(f"Compact working frame: {report['compact_bytes'] / 1024 / 1024:.2f} MB")
+        print(f"Reduction: {report['ratio']:.1f}x")
+        sys.exit(0)
+
+    input_files = [args.input_file] + args.merge_files if args.merge_files else args.input_file
 
     # If no output file specified, generate one based on input file
     if args.output_file is None:
         input_dir = os.path.dirname(os.path.abspath(args.input_file))
         input_name = os.path.splitext(os.path.basename(args.input_file))[0]
-        args.output_file = os.path.join(input_dir, f"{input_name}_formatted.csv")
+        suffix = "_merged_formatted.csv" if args.merge_files else "_formatted.csv"
+        args.output_file = os.path.join(input_dir, f"{input_name}{suffix}")
 
-    result = format_csv(
-        args.input_file,
-        args.output_file,
-        generate_pdf=not args.no_pdf,
-        pdf_output_dir=args.pdf_output_dir
-    )
+    try:
+        with RunReport(trace_memory=args.trace_memory, profile=args.profile) as report:
+            if args.no_payouts:
+                result = format_csv(
+                    input_files,
+                    args.output_file,
+                    generate_pdf=not args.no_pdf,
+                    pdf_output_dir=args.pdf_output_dir,
+                    rules_file=args.rules_file
+                )
+            else:
+                # Payouts and team leader bonuses need working days: from saved
+                # assignments, a timesheet or --default-days
+                config = PipelineConfig(input_files, args.output_file, args.pdf_output_dir, not args.no_pdf,
+                                        **config_options(args))
+                result = run(config)
+                result['csv_rows'], result['csv_path'] = result['rows'], result['output_file']
+    except MissingWorkingDays as e:
+        parser.exit(1, f"{parser.prog}: {e}. Pass --default-days N for payouts, "
+                       f"or --no-payouts for only the formatted export with points\n")
 
-    print(f"\nProcessing complete!")
+    print("\nProcessing complete!")
     print(f"CSV rows processed: {result['csv_rows']}")
     print(f"Output CSV: {result['csv_path']}")
+    print(f"Rules version: {result['rules_version']}")
     if result['pdf_files']:
         print(f"PDF files generated: {len(result['pdf_files'])}")
         pdf_dir = os.path.dirname(result['pdf_files'][0])
-        print(f"PDF directory: {pdf_dir}")
\ No newline at end of file
+        print(f"PDF directory: {pdf_dir}")
+
+    report_files = report.write(report_path(result['csv_path']))
+    print(f"\nRun report ({report.wall_s:.2f} s): {report_files[0]}")
+    print("\n".join(format_report(report)))
+    for profile_file in report_files[1:]:
+        print(f"Profile: {profile_file}")
@@ -1,14 +1,38 @@
 import tkinter as tk
 from tkinter import ttk, messagebox, filedialog
-import pandas as pd
-import numpy as np
-from collections import defaultdict
-import datetime
+import collections
+import importlib
+import logging
 import threading
+import multiprocessing
 import os
 import platform
 import sys
-import tempfile
+# Only light modules at load time so the window appears at once; pandas,
+# numpy and ReportLab are imported in the background by preload_modules
+from logs import configure, default_log_path, debug_modules_from_env
+from progress import format_update
+from worker import MSG_TL_REQUEST
+from jobs import JobQueue, DONE, FAILED, CANCELLED, QUEUED, format_summary
+
+# Named explicitly since this module usually runs as __main__
+logger = logging.getLogger('csv_formatter_gui')
+
+# Imported by preload_modules while the user picks a file
+PRELOAD_MODULES = ['numpy', 'pandas', 'reportlab.platypus', 'pipeline', 'timesheet', 'results_view']
+
+def load_rules(path=None):
+    """rules.load_rules, imported on first use since it pulls in pandas."""
+    from rules import load_rules as load
+    return load(path)
+
+def preload_modules():
+    """Import the processing modules ahead of their first use (run in a daemon thread)."""
+    for name in PRELOAD_MODULES:
+        try:
+            importlib.import_module(name)
+        except ImportError as e:
+            logger.warning("Could not preload %s: %s", name, e)
 
 def get_resource_path(relative_path):
     """Get absolute path to resource, works for dev and PyInstaller bundle"""
@@ -28,13 +52,113 @@ try:
 except ImportError:
     # Fallback for systems without tkinterdnd2
     DND_AVAILABLE = False
-    print("Warning: Drag and drop functionality not available")
+    logger.warning("Drag and drop functionality not available")
     # Create dummy classes for build compatibility
     class TkinterDnD:
         class Tk(tk.Tk):
             pass
     DND_FILES = None
 
+# How often the Tk main loop checks for worker messages (ms)
+UI_POLL_MS = 50
+
+# Status rows shown at most for a batch of files; more scroll
+JOB_LIST_ROWS = 5
+
+# How often the watched folder is scanned (ms)
+WATCH_POLL_MS = 2000
+
+# Rows the team member list draws; longer lists scroll through the same widgets
+MEMBER_LIST_ROWS = 16
+
+class VirtualCheckList:
+    """
+    Scrollable list of header and checkbox rows drawn with a fixed pool of widgets.
+
+    Only MEMBER_LIST_ROWS rows exist as widgets; scrolling and set_items()
+    relabel them instead of creating a Checkbutton per entry. Items are
+    (key, text) tuples, with key None for header rows. Check state is kept
+    by the caller and read through is_checked(key) / set_checked(key, value).
+    """
+
+    def __init__(self, parent, colors, is_checked, set_checked, rows=MEMBER_LIST_ROWS):
+        self.is_checked = is_checked
+        self.set_checked = set_checked
+        self.items = []
+        self.first = 0
+
+        self.frame = tk.Frame(parent, bg=colors['bg_secondary'])
+        self.scrollbar = ttk.Scrollbar(self.frame, orient="vertical", command=self.yview)
+        self.scrollbar.pack(side="right", fill="y")
+        body = tk.Frame(self.frame, bg=colors['bg_secondary'])
+        body.pack(side="left", fill="both", expand=True)
+
+        self.slots = []
+        for index in range(rows):
+            var = tk.BooleanVar()
+            header = tk.Label(body, font=("Helvetica", 10, "bold"), anchor="w",
+                              bg=colors['bg_secondary'], fg=colors['fg'])
+            check = ttk.Checkbutton(body, variable=var, command=lambda i=index: self._on_toggle(i))
+            header.grid(row=index, column=0, sticky="w", padx=5, pady=(6, 2))
+            check.grid(row=index, column=0, sticky="w", padx=15, pady=2)
+            header.grid_remove()
+            check.grid_remove()
+            self.slots.append((header, check, var))
+
+        for widget in [body] + [widget for header, check, _ in self.slots for widget in (header, check)]:
+            widget.bind("<MouseWheel>", self._on_wheel)
+            widget.bind("<Button-4>", self._on_wheel)
+            widget.bind("<Button-5>", self._on_wheel)
+
+    def set_items(self, items):
+        self.items = list(items)
+        self._scroll_to(self.first)
+
+    def yview(self, *args):
+        """Scrollbar command ('moveto', fraction) or ('scroll', n, 'units'/'pages')."""
+        if args[0] == "moveto":
+            self._scroll_to(round(float(args[1]) * len(self.items)))
+        elif args[0] == "scroll":
+            step = int(args[1]) * (len(self.slots) if args[2] == "pages" else 1)
+            self._scroll_to(self.first + step)
+
+    def _on_wheel(self, event):
+        up = event.num == 4 or getattr(event, "delta", 0) > 0
+        self._scroll_to(self.first + (-3 if up else 3))
+        return "break"
+
+    def _scroll_to(self, first):
+        self.first = max(0, min(first, len(self.items) - len(self.slots)))
+        self._draw()
+
+    def _draw(self):
+        for index, (header, check, var) in enumerate(self.slots):
+            position = self.first + index
+            if position >= len(self.items):
+                header.grid_remove()
+                check.grid_remove()
+                continue
+            key, text = self.items[position]
+            if key is None:
+                check.grid_remove()
+                header.config(text=text)
+                header.grid()
+            else:
+                header.grid_remove()
+                check.config(text=text)
+                var.set(self.is_checked(key))
+                check.grid()
+
+        total = len(self.items)
+        if total:
+            self.scrollbar.set(self.first / total, min(self.first + len(self.slots), total) / total)
+        else:
+            self.scrollbar.set(0, 1)
+
+    def _on_toggle(self, index):
+        key, _ = self.items[self.first + index]
+        self.set_checked(key, self.slots[index][2].get())
+
 class CSVFormatterApp:
     def __init__(self):
         # Initialize root window with or without drag-and-drop support
@@ -61,11 +185,35 @@ class CSVFormatterApp:
         self._center_window()
 
         self.input_file = None
+        self.input_files = []  # All selected exports; input_file is the first
+        self.merge_files = tk.BooleanVar(value=False)  # Process several exports as one
         self.output_dir = None
         self.weekly_team_leaders = {}  # Store TL selections per week: {week: {tl_name: working_days}}
         self.weekly_team_assignments = {}  # Store team assignments per week: {week: {tl_name: [team_member_names]}}
         self.fundraiser_working_days = {}  # Store working days for all fundraisers per week
+
+        self.jobs = None  # JobQueue of the current run
+        self.tl_requests = collections.deque()  # (job, request) waiting for the TL dialog
+        self.tl_dialog_open = False
+        self.stored_assignments = None  # Saved assignments, loaded once per run
+        self.batch_weeks = set()  # ISO weeks confirmed in the TL dialog during this run
+        self.cancel_requested = False
+        self.show_job_list = False  # Status rows for batches and watched folders
+        self.watcher = None  # watch.FolderWatcher while a folder is watched
+        self.last_result = None  # Result of the last finished run, for the results window
+        self.last_result_name = None
+
         self.setup_ui()
+        self.root.after(UI_POLL_MS, self._poll)
+
+        # The window is ready: close the splash screen of bundles built with
+        # PyInstaller's --splash, then load the heavy modules in the background
+        try:
+            import pyi_splash
+            pyi_splash.close()
+        except ImportError:
+            pass
+        threading.Thread(target=preload_modules, daemon=True).start()
     
     def _setup_platform_specific(self):
         """Setup platform-specific configurations."""
@@ -186,6 +334,10 @@ class CSVFormatterApp:
             self.browse_output_btn.configure(bg=self.colors['button'], fg=self.colors['button_text'])
         if hasattr(self, 'clear_output_btn'):
             self.clear_output_btn.configure(bg=self.colors['warning'], fg=self.colors['button_text'])
+        if hasattr(self, 'results_btn'):
+            self.results_btn.configure(bg=self.colors['button'], fg=self.colors['button_text'])
+        if hasattr(self, 'watch_btn'):
+            self.watch_btn.configure(bg=self.colors['button'], fg=self.colors['button_text'])
 
         # Update entries
         if hasattr(self, 'output_entry'):
@@ -198,7 +350,15 @@ class CSVFormatterApp:
 
         dark_mode_checkbox = ttk.Checkbutton(toggle_frame, text="Dark Mode",
                                            variable=self.dark_mode)
-        dark_mode_checkbox.pack()
+        dark_mode_checkbox.pack(side="right")
+
+        self.watch_btn = tk.Button(toggle_frame, text="Watch Folder...",
+                                  font=("Helvetica", 10),
+                                  bg=self.colors['button'], fg=self.colors['button_text'],
+                                  padx=10, pady=2,
+                                  command=self.toggle_watch,
+                                  cursor="hand2")
+        self.watch_btn.pack(side="right", padx=(0, 15))
 
         # Main title
         self.title_label = tk.Label(self.root, text="Realisierungsdatenvisualizer",
@@ -240,6 +400,24 @@ class CSVFormatterApp:
                                        bg=self.colors['bg'], fg=self.colors['fg_secondary'])
         self.file_info_label.pack(pady=(10, 10))
 
+        # Shown when several files are selected
+        self.merge_checkbox = ttk.Checkbutton(self.root, text="Merge into one report (donors in several files count once)",
+                                              variable=self.merge_files)
+
+        # Status row per file of a batch (shown while processing several files)
+        self.job_list_frame = tk.Frame(self.root, bg=self.colors['bg'])
+        self.job_list = ttk.Treeview(self.job_list_frame, columns=("file", "status"), show="headings",
+                                     height=JOB_LIST_ROWS, selectmode="browse")
+        self.job_list.heading("file", text="File")
+        self.job_list.heading("status", text="Status")
+        self.job_list.column("file", width=200, anchor="w")
+        self.job_list.column("status", width=320, anchor="w")
+        job_scrollbar = ttk.Scrollbar(self.job_list_frame, orient="vertical", command=self.job_list.yview)
+        self.job_list.configure(yscrollcommand=job_scrollbar.set)
+        job_scrollbar.pack(side="right", fill="y")
+        self.job_list.pack(side="left", fill="x", expand=True)
+        self.job_list.bind("<Double-1>", self.show_job_results)
+
         # Output directory selection
         self.output_frame = tk.Frame(self.root, bg=self.colors['bg'])
         self.output_frame.pack(pady=(0, 20), padx=40, fill="x")
@@ -277,10 +455,10 @@ class CSVFormatterApp:
                                          cursor="hand2")
         self.clear_output_btn.pack(side="right", padx=(0, 5))
         
-        # Progress bar (initially hidden)
+        # Progress bar (initially hidden), 0-100 over the whole run
         self.progress_var = tk.DoubleVar()
-        self.progress_bar = ttk.Progressbar(self.root, mode='indeterminate', 
-                                           length=400)
+        self.progress_bar = ttk.Progressbar(self.root, mode='determinate', maximum=100,
+                                           variable=self.progress_var, length=400)
         
         # Status label
         self.status_label = tk.Label(self.root, text="Ready to process files",
@@ -298,6 +476,22 @@ class CSVFormatterApp:
                                     state="disabled")
         self.process_btn.pack(pady=20)
 
+        # Cancel button (shown while processing)
+        self.cancel_btn = tk.Button(self.root, text="Cancel",
+                                   font=("Helvetica", 11),
+                                   bg="#95a5a6", fg="white",
+                                   padx=20, pady=5,
+                                   command=self.cancel_processing,
+                                   cursor="hand2")
+
+        # View Results button (shown once a run has finished)
+        self.results_btn = tk.Button(self.root, text="View Results",
+                                    font=("Helvetica", 11),
+                                    bg=self.colors['button'], fg=self.colors['button_text'],
+                                    padx=20, pady=5,
+                                    command=self.show_results,
+                                    cursor="hand2")
+
         # Footer
         self.footer_label = tk.Label(self.root, text="© 2025 Changing Waves",
                          font=("Helvetica", 9),
@@ -307,28 +501,46 @@ class CSVFormatterApp:
     def on_drop(self, event):
         files = self.root.tk.splitlist(event.data)
         if files:
-            file_path = files[0]
-            if file_path.lower().endswith('.csv'):
-                self.set_input_file(file_path)
+            csv_files = [file_path for file_path in files if file_path.lower().endswith('.csv')]
+            if csv_files:
+                self.set_input_files(csv_files)
             else:
                 messagebox.showerror("Invalid File", "Please select a CSV file.")
     
     def browse_file(self, event=None):
-        file_path = filedialog.askopenfilename(
-            title="Select CSV File",
+        file_paths = filedialog.askopenfilenames(
+            title="Select CSV Files",
             filetypes=[("CSV files", "*.csv"), ("All files", "*.*")]
         )
-        if file_path:
-            self.set_input_file(file_path)
+        if file_paths:
+            self.set_input_files(self.root.tk.splitlist(file_paths))
     
     def set_input_file(self, file_path):
-        self.input_file = file_path
-        filename = os.path.basename(file_path)
-        self.file_info_label.config(text=f"Selected: {filename}", fg=self.colors['success'])
-        self.drop_label.config(text=f"✓ {filename}\n\nClick to select a different file",
-                              fg=self.colors['success'])
+        self.set_input_files([file_path])
+
+    def set_input_files(self, file_paths):
+        """Select one or more exports; several are processed as a batch."""
+        if self.jobs is not None and self.jobs.active():
+            return
+        self.input_files = list(file_paths)
+        self.input_file = self.input_files[0]
+        self.job_list_frame.pack_forget()
+        self.merge_checkbox.pack_forget()
+        if len(self.input_files) == 1:
+            filename = os.path.basename(self.input_file)
+            self.file_info_label.config(text=f"Selected: {filename}", fg=self.colors['success'])
+            self.drop_label.config(text=f"✓ {filename}\n\nClick to select a different file",
+                                  fg=self.colors['success'])
+            self.status_label.config(text="File ready for processing", fg=self.colors['success'])
+        else:
+            names = [os.path.basename(file_path) for file_path in self.input_files]
+            listed = "\n".join(names[:3]) + (f"\n... and {len(names) - 3} more" if len(names) > 3 else "")
+            self.file_info_label.config(text=f"Selected: {len(names)} files", fg=self.colors['success'])
+            self.drop_label.config(text=f"✓ {listed}\n\nClick to select different files",
+                                  fg=self.colors['success'])
+            self.status_label.config(text=f"{len(names)} files ready for processing", fg=self.colors['success'])
+            self.merge_checkbox.pack(pady=(0, 10), after=self.file_info_label)
         self.process_btn.config(state="normal", bg=self.colors['success'])
-        self.status_label.config(text="File ready for processing", fg=self.colors['success'])
 
     def browse_output_dir(self):
         directory = filedialog.askdirectory(
@@ -342,59 +554,342 @@ class CSVFormatterApp:
         self.output_dir = None
         self.output_dir_var.set("pdf_output (default)")
     
+    def _poll(self):
+        """Handle worker process messages from the Tk main loop."""
+        try:
+            if self.jobs is not None and self.jobs.active():
+                self._poll_jobs()
+        finally:
+            self.root.after(UI_POLL_MS, self._poll)
+
     def show_processing(self):
+        self.progress_var.set(0)
         self.progress_bar.pack(pady=(0, 10))
-        self.progress_bar.start(10)
         self.process_btn.config(state="disabled", bg="#95a5a6", text="Processing...")
+        self.cancel_btn.config(state="normal")
+        self.cancel_btn.pack(pady=(0, 10), before=self.process_btn)
+        self.results_btn.pack_forget()
         self.status_label.config(text="Processing CSV file...", fg="#f39c12")
-        self.root.update()
     
     def hide_processing(self):
-        self.progress_bar.stop()
         self.progress_bar.pack_forget()
+        self.cancel_btn.pack_forget()
         self.process_btn.config(state="normal", bg="#27ae60", text="Process CSV")
-        self.root.update()
     
     def process_file(self):
-        if not self.input_file:
+        if not self.input_files:
             messagebox.showerror("No File", "Please select a CSV file first.")
             return
-        
-        # Run processing in separate thread
-        thread = threading.Thread(target=self.run_processing)
-        thread.daemon = True
-        thread.start()
-    
-    def run_processing(self):
+        if self.jobs is not None and self.jobs.active():
+            return
+
+        # Each file is processed in a separate process so the UI stays responsive
+        batch = len(self.input_files) > 1
+        if batch and self.merge_files.get():
+            # One run over all files, with one CSV and one set of PDFs
+            if not self.start_job_queue():
+                return
+            self.add_job(list(self.input_files), *self.output_paths(self.input_files))
+        else:
+            if not self.start_job_queue(show_job_list=batch):
+                return
+            for input_file in self.input_files:
+                self.add_job(input_file, *self.output_paths(input_file, batch))
+        self._poll_jobs()
+
+    def start_job_queue(self, show_job_list=False):
+        """
+        Start a new run with an empty JobQueue.
+
+        The rules are loaded once here and sent to every job's worker.
+
+        Returns:
+            False if the rules could not be loaded
+        """
         try:
-            self.root.after(0, self.show_processing)
+            rules = load_rules()
+        except (OSError, ValueError) as e:
+            messagebox.showerror("Rules Error", f"Could not load the payout rules:\n\n{e}")
+            return False
+
+        self.jobs = JobQueue(rules=rules)
+        self.tl_requests.clear()
+        self.stored_assignments = None
+        self.batch_weeks = set()
+        self.cancel_requested = False
+        self.show_job_list = show_job_list
+        self.job_list.delete(*self.job_list.get_children())
+        self.show_processing()
+        return True
+
+    def add_job(self, input_file, output_file, pdf_output_dir=None, tag=None):
+        job = self.jobs.add(input_file, output_file, pdf_output_dir, tag)
+        if self.show_job_list:
+            self.job_list.insert("", "end", iid=str(job.id), values=(job.name, "Queued"))
+            self.job_list.configure(height=min(len(self.jobs.jobs), JOB_LIST_ROWS))
+            self.job_list_frame.pack(pady=(0, 10), padx=40, fill="x", after=self.file_info_label)
+            self.job_list.see(str(job.id))
+        return job
+
+    def output_paths(self, input_file=None, batch=False):
+        """
+        Formatted CSV path and PDF output directory for an input file.
+
+        Args:
+            input_file: Export to process (default: the selected file), or a
+                list of exports merged into one run (named after the first)
+            batch: Part of several files processed together; each then gets
+                its own PDF subdirectory named after the export, so
+                fundraisers appearing in several exports do not overwrite
+                each other's reports
+
+        Returns:
+            Tuple of (output CSV path, PDF directory or None for the default)
+        """
+        input_file = input_file or self.input_file
+        merged = not isinstance(input_file, str)
+        if merged:
+            input_file = input_file[0]
+        # Get output filename (Windows-safe path handling)
+        input_dir = os.path.dirname(input_file)
+        input_name = os.path.splitext(os.path.basename(input_file))[0]
+        suffix = "_merged_formatted.csv" if merged else "_formatted.csv"
+        output_file = os.path.normpath(os.path.join(input_dir, f"{input_name}{suffix}"))
+
+        # Determine PDF output directory
+        pdf_output_dir = None
+        if self.output_dir:
+            pdf_output_dir = self.output_dir
+        else:
+            # Use directory name from entry field if it's not the default
+            dir_name = self.output_dir_var.get().strip()
+            if dir_name and dir_name != "pdf_output (default)":
+                pdf_output_dir = os.path.join(input_dir, dir_name)
+
+        if batch:
+            pdf_output_dir = os.path.join(pdf_output_dir or os.path.join(input_dir, "pdf_output"), input_name)
+
+        return output_file, pdf_output_dir
+
+    def cancel_processing(self):
+        if self.jobs is not None and self.jobs.active():
+            self.cancel_requested = True
+            self.cancel_btn.config(state="disabled")
+            self.status_label.config(text="Cancelling...", fg="#f39c12")
+            self.jobs.cancel()
+            self.show_job_rows(self.jobs.jobs)
+
+    def _poll_jobs(self):
+        """Handle messages from the job workers on the Tk main thread."""
+        changed = []
+        for job, message, payload in self.jobs.poll():
+            if message == MSG_TL_REQUEST:
+                self.tl_requests.append((job, payload))
+            elif job.finished() and job.tag is not None:
+                # Recorded also when watching has stopped in the meantime
+                watcher, path, digest = job.tag
+                if job.state == DONE:
+                    watcher.mark_processed(path, digest, job.result)
+                else:
+                    watcher.mark_failed(path, digest)
+            if job not in changed:
+                changed.append(job)
+        # Jobs started by poll() show as running from their first message on
+        self.show_job_rows(changed)
+        self._next_tl_request()
+
+        if self.jobs.active():
+            self.progress_var.set(self.jobs.fraction() * 100)
+            if not self.cancel_requested:
+                self.status_label.config(text=self.jobs_status_text(), fg="#f39c12")
+        else:
+            self.jobs_finished()
+
+    def jobs_status_text(self):
+        jobs = self.jobs.jobs
+        if len(jobs) == 1 and not self.show_job_list:
+            update = jobs[0].update
+            return format_update(update) if update else "Processing CSV file..."
+        finished = sum(job.finished() for job in jobs)
+        return f"Processed {finished} of {len(jobs)} files ({len(self.jobs.running())} running)"
+
+    def show_job_rows(self, jobs):
+        """Refresh the status rows of a batch."""
+        if not self.show_job_list:
+            return
+        for job in jobs:
+            self.job_list.set(str(job.id), "status", self.job_status_text(job))
+
+    def job_status_text(self, job):
+        if job.state == QUEUED:
+            return "Queued"
+        if job.state == DONE:
+            return f"✓ {job.result['rows']} rows, {len(job.result['pdf_files'])} PDF files"
+        if job.state == FAILED:
+            return f"✗ {job.error}"
+        if job.state == CANCELLED:
+            return "Cancelled"
+        if self.jobs.cancelling(job):
+            return "Cancelling..."
+        return format_update(job.update) if job.update else "Starting..."
+
+    def _next_tl_request(self):
+        """Answer the next job waiting for team leaders; one dialog at a time."""
+        while self.tl_requests and not self.tl_dialog_open:
+            job, (fundraisers_by_week, week_keys, fundraiser_ids) = self.tl_requests.popleft()
+            if job.finished():
+                continue
+
+            selection = self.batch_selection(fundraisers_by_week, week_keys)
+            if selection is None and job.tag is not None:
+                selection = self.saved_selection(fundraisers_by_week, week_keys)
+            if selection is not None:
+                self.jobs.send_selection(job, selection)
+                continue
 
-            # Get output filename (Windows-safe path handling)
-            input_dir = os.path.dirname(self.input_file)
-            input_name = os.path.splitext(os.path.basename(self.input_file))[0]
-            output_file = os.path.normpath(os.path.join(input_dir, f"{input_name}_formatted.csv"))
+            def on_close(confirmed, job=job, week_keys=week_keys):
+                from weeks import format_iso_week
+                self.tl_dialog_open = False
+                self.jobs.send_selection(job, self.tl_selection() if confirmed else None)
+                if confirmed:
+                    self.batch_weeks.update(format_iso_week(key) for key in week_keys.values())
+
+            self.tl_dialog_open = True
+            if self.show_job_list:
+                self.status_label.config(text=f"Team leaders for {job.name}", fg="#f39c12")
+            self.open_tl_dialog(fundraisers_by_week, week_keys, on_close, fundraiser_ids)
+
+    def batch_selection(self, fundraisers_by_week, week_keys):
+        """
+        Selection confirmed earlier in this batch, if it covers a request completely.
 
-            # Determine PDF output directory
-            pdf_output_dir = None
-            if self.output_dir:
-                pdf_output_dir = self.output_dir
+        Exports of one batch often share weeks and fundraisers; a later job
+        whose weeks were all confirmed for an earlier one, with the same
+        fundraisers, reuses that answer instead of asking again.
+        """
+        from assignments import prefill_selection
+        from weeks import format_iso_week
+
+        if not self.batch_weeks or not all(format_iso_week(key) in self.batch_weeks for key in week_keys.values()):
+            return None
+        selection, diff = prefill_selection(fundraisers_by_week, week_keys, self.load_stored_assignments())
+        if any(change['added'] or change['removed'] for change in diff.values()):
+            return None
+        return selection
+
+    def saved_selection(self, fundraisers_by_week, week_keys):
+        """Saved assignments for a request, if they have working days for every fundraiser."""
+        from assignments import prefill_selection, missing_working_days
+
+        selection, _ = prefill_selection(fundraisers_by_week, week_keys, self.load_stored_assignments())
+        if missing_working_days(fundraisers_by_week, selection):
+            return None
+        return selection
+
+    def load_stored_assignments(self):
+        """Saved assignments, read once per run and kept up to date as dialogs are confirmed."""
+        from assignments import load_store
+
+        if self.stored_assignments is None:
+            try:
+                self.stored_assignments = load_store()
+            except (OSError, ValueError) as e:
+                logger.warning("Could not read saved assignments: %s", e)
+                self.stored_assignments = {}
+        return self.stored_assignments
+
+    def jobs_finished(self):
+        """All jobs of the run have ended: report the outcome."""
+        jobs = self.jobs.jobs
+        self.show_job_rows(jobs)
+        if len(jobs) == 1 and not self.show_job_list:
+            job = jobs[0]
+            if job.state == DONE:
+                self.processing_complete(job.result, job.config.output_file, job.name)
+            elif job.state == FAILED:
+                self.processing_error(job.error)
             else:
-                # Use directory name from entry field if it's not the default
-                dir_name = self.output_dir_var.get().strip()
-                if dir_name and dir_name != "pdf_output (default)":
-                    pdf_output_dir = os.path.join(input_dir, dir_name)
+                self.processing_cancelled()
+            return
 
-            # Process the file
-            result = self.format_csv(self.input_file, output_file, pdf_output_dir)
+        self.hide_processing()
+        summary = self.jobs.summary()
+        if summary['done']:
+            self.last_result = summary['done'][-1].result
+            self.last_result_name = summary['done'][-1].name
+            if self.last_result.get('preview'):
+                self.results_btn.pack(pady=(0, 10), after=self.process_btn)
+        color = "#27ae60" if len(summary['done']) == len(jobs) else self.colors['warning']
+        self.status_label.config(text=f"✓ Processed {len(summary['done'])} of {len(jobs)} files, "
+                                      f"{summary['rows']} rows", fg=color)
+        if self.watcher is not None:
+            # Unattended: the status rows and label are the report
+            self.status_label.config(text=self.watch_status_text(summary), fg=color)
+        elif summary['failed']:
+            messagebox.showwarning("Batch Complete", format_summary(summary))
+        else:
+            messagebox.showinfo("Batch Complete", format_summary(summary))
+
+    def toggle_watch(self):
+        """Start watching a folder for new exports, or stop watching."""
+        if self.watcher is not None:
+            self.watcher = None
+            self.watch_btn.config(text="Watch Folder...")
+            if self.jobs is None or not self.jobs.active():
+                self.status_label.config(text="Stopped watching", fg=self.colors['fg_secondary'])
+            return
 
-            self.root.after(0, lambda: self.processing_complete(result, output_file))
+        directory = filedialog.askdirectory(title="Select Folder to Watch for New Exports")
+        if not directory:
+            return
+        from watch import FolderWatcher
+        try:
+            # Output goes to the chosen output directory, or 'processed' inside the folder
+            self.watcher = FolderWatcher(directory, self.output_dir)
+        except (OSError, ValueError) as e:
+            messagebox.showerror("Watch Folder", f"Could not watch {directory}:\n\n{e}")
+            return
+        self.watch_btn.config(text="Stop Watching")
+        self.status_label.config(text=self.watch_status_text(), fg=self.colors['success'])
+        self._poll_watch()
+
+    def _poll_watch(self):
+        """Queue exports that appeared in the watched folder; reschedules itself while watching."""
+        watcher = self.watcher
+        if watcher is None:
+            return
+        ready = watcher.ready_files()
+        if ready:
+            if (self.jobs is None or not self.jobs.active()) and not self.start_job_queue(show_job_list=True):
+                for path, digest in ready:
+                    watcher.mark_failed(path, digest)
+                self.toggle_watch()
+                return
+            for path, digest in ready:
+                self.add_job(path, *watcher.output_paths(path, digest), tag=(watcher, path, digest))
+        self.root.after(WATCH_POLL_MS, self._poll_watch)
+
+    def watch_status_text(self, summary=None):
+        text = f"Watching {os.path.basename(self.watcher.directory)}"
+        if summary is not None:
+            text += f": processed {len(summary['done'])} of {len(self.jobs.jobs)} new files"
+        return text
+
+    def show_job_results(self, event=None):
+        """Open the results window for the batch job double-clicked in the status rows."""
+        selected = self.job_list.selection()
+        if not selected or self.jobs is None:
+            return
+        job = self.jobs.jobs[int(selected[0])]
+        if job.state == DONE and job.result.get('preview'):
+            self.open_results_window(job.result['preview'], job.name)
 
-        except Exception as e:
-            error_message = str(e)
-            self.root.after(0, lambda: self.processing_error(error_message))
-    
-    def processing_complete(self, result, output_file):
+    def processing_complete(self, result, output_file, name=None):
         self.hide_processing()
+        self.last_result = result
+        self.last_result_name = name or os.path.basename(self.input_file or output_file)
+        if result.get('preview'):
+            self.results_btn.pack(pady=(0, 10), after=self.process_btn)
         self.status_label.config(text=f"✓ Processing complete! {result['rows']} rows processed", 
                                 fg="#27ae60")
         
@@ -411,69 +906,70 @@ class CSVFormatterApp:
 
         messagebox.showinfo("Success", success_msg)
     
+    def show_results(self):
+        """Open the results window for the last finished run."""
+        self.open_results_window(self.last_result['preview'], self.last_result_name)
+
+    def open_results_window(self, preview, name=None):
+        # Imported on first use; it needs numpy, which the GUI loads in the background
+        from results_view import ResultsWindow
+        ResultsWindow(self.root, preview, self.colors, f"Results - {name}" if name else "Results")
+
+    def processing_cancelled(self):
+        self.hide_processing()
+        self.status_label.config(text="Processing cancelled", fg=self.colors['fg_secondary'])
+
     def processing_error(self, error_msg):
         self.hide_processing()
         self.status_label.config(text="❌ Processing failed", fg=self.colors['error'])
         messagebox.showerror("Error", f"An error occurred while processing:\n\n{error_msg}")
 
-    def update_team_assignments_ui(self, week, fundraiser, tl_checkboxes, team_assignments, all_fundraisers, assignment_frame):
-        """Update the team assignment UI when TL selection changes."""
-        # Clear existing assignment UI
-        for widget in team_assignments[week]["frame"].winfo_children():
-            widget.destroy()
-
-        # Get current TLs for this week
-        current_tls = []
-        for person, checkbox_var in tl_checkboxes[week].items():
-            if checkbox_var.get():
-                current_tls.append(person)
-
-        # Initialize assignments for new TLs
-        if "assignments" not in team_assignments[week]:
-            team_assignments[week]["assignments"] = {}
-
-        for tl in current_tls:
-            if tl not in team_assignments[week]["assignments"]:
-                team_assignments[week]["assignments"][tl] = {}
-
-        # Remove assignments for non-TLs
-        tls_to_remove = []
-        for tl in team_assignments[week]["assignments"].keys():
-            if tl not in current_tls:
-                tls_to_remove.append(tl)
-        for tl in tls_to_remove:
-            del team_assignments[week]["assignments"][tl]
-
-        # Create UI for each TL's team selection
-        for tl in current_tls:
-            # TL section
-            tl_frame = tk.LabelFrame(team_assignments[week]["frame"],
-                                   text=f"Team for {tl}",
-                                   font=("Helvetica", 10, "bold"),
-                                   bg=self.colors['bg_secondary'],
-                                   fg=self.colors['fg'])
-            tl_frame.pack(fill="x", padx=5, pady=5)
-
-            # Team member checkboxes
-            for person in sorted(all_fundraisers[week]):
-                if person != tl:  # Don't include TL in their own team selection
-                    if person not in team_assignments[week]["assignments"][tl]:
-                        team_assignments[week]["assignments"][tl][person] = tk.BooleanVar()
-
-                    member_checkbox = ttk.Checkbutton(tl_frame,
-                                                    text=person,
-                                                    variable=team_assignments[week]["assignments"][tl][person])
-                    member_checkbox.pack(anchor="w", padx=10, pady=2)
-
-    def show_weekly_tl_selection_dialog(self, fundraisers_by_week):
+    def open_tl_dialog(self, fundraisers_by_week, week_keys, on_close, fundraiser_ids=None):
         """
-        Show dialog to select team leaders per calendar week and assign team members.
+        Show the TL dialog prefilled from saved assignments, and save them on confirm.
 
         Args:
-            fundraisers_by_week: Dict of {week: [fundraiser_names]}
+            fundraisers_by_week: Dict of {week: [fundraiser_names]} in calendar order
+            week_keys: Dict of {week: week key}
+            on_close: Callback taking the confirmed flag
+            fundraiser_ids: Optional {fundraiser name: Fundraiser ID} for timesheet imports
+        """
+        from assignments import prefill_selection, store_selection, merge_selection
 
-        Returns:
-            True if user confirmed selections, False if cancelled
+        initial, roster_diff = prefill_selection(fundraisers_by_week, week_keys, self.load_stored_assignments())
+
+        def on_dialog_close(confirmed):
+            if confirmed:
+                merge_selection(self.stored_assignments, self.tl_selection(), week_keys)
+                try:
+                    store_selection(self.tl_selection(), week_keys)
+                except OSError as e:
+                    logger.warning("Could not save assignments: %s", e)
+            on_close(confirmed)
+
+        self.show_weekly_tl_selection_dialog(fundraisers_by_week, on_dialog_close, initial, roster_diff,
+                                             week_keys, fundraiser_ids)
+
+    def show_weekly_tl_selection_dialog(self, fundraisers_by_week, on_close, initial=None, roster_diff=None,
+                                        week_keys=None, fundraiser_ids=None):
+        """
+        Show dialog to select team leaders per calendar week and assign team members.
+
+        Must run on the Tk main thread. The dialog does not block: on_close is
+        called with True if the user confirmed the selections (stored on self)
+        or False if cancelled.
+
+        Selections live in plain dictionaries; a week's tab widgets are only
+        built when the tab is first selected, so unvisited weeks keep their
+        initial values (saved ones, otherwise not TL and 6 working days).
+
+        Args:
+            fundraisers_by_week: Dict of {week: [fundraiser_names]} in calendar order
+            on_close: Callback taking the confirmed flag
+            initial: Optional selection dict to prefill (see assignments.prefill_selection)
+            roster_diff: Optional {week: {'stored', 'added', 'removed'}} shown per week
+            week_keys: Optional {week: week key}; enables importing a timesheet
+            fundraiser_ids: Optional {fundraiser name: Fundraiser ID} for timesheet imports
         """
         dialog = tk.Toplevel(self.root)
         dialog.title("Weekly Team Leader Selection & Team Assignment")
@@ -501,20 +997,52 @@ class CSVFormatterApp:
                                justify="center")
         instructions.pack(pady=(0, 20))
 
+        roster_diff = roster_diff or {}
+        prefilled = sum(1 for change in roster_diff.values() if change['stored'])
+        if prefilled:
+            prefill_label = tk.Label(dialog,
+                                     text=f"Prefilled from saved assignments for {prefilled} of {len(fundraisers_by_week)} weeks",
+                                     font=("Helvetica", 10),
+                                     bg=self.colors['bg'], fg=self.colors['success'])
+            prefill_label.pack(pady=(0, 10))
+
         # Create notebook for weeks
         notebook = ttk.Notebook(dialog)
         notebook.pack(fill="both", expand=True, padx=20, pady=(0, 20))
 
-        # Store all variables
-        weekly_tl_checkboxes = {}
-        weekly_working_days = {}
-        weekly_team_assignments = {}  # {week: {tl_name: [team_member_names]}}
-
-        # Create tab for each week
-        for week in sorted(fundraisers_by_week.keys()):
-            # Create frame for this week
-            week_frame = ttk.Frame(notebook)
-            notebook.add(week_frame, text=f"{week}")
+        # Selections per week, independent of whether the tab was built
+        sorted_fundraisers = {week: sorted(names) for week, names in fundraisers_by_week.items()}
+        initial = initial or {'team_leaders': {}, 'team_assignments': {}, 'working_days': {}}
+        weekly_tl_flags = {week: {name: name in initial['team_leaders'].get(week, {}) for name in names}
+                           for week, names in sorted_fundraisers.items()}
+        weekly_working_days = {week: {name: f"{initial['working_days'].get(week, {}).get(name, 6):g}"  # Default to 6 days
+                                      for name in names}
+                               for week, names in sorted_fundraisers.items()}
+        weekly_team_members = {week: {tl: set(initial['team_assignments'].get(week, {}).get(tl, []))
+                                      for tl, is_tl in weekly_tl_flags[week].items() if is_tl}
+                               for week in sorted_fundraisers}  # {week: {tl_name: set of member names}}
+
+        def member_rows(week):
+            """Rows of the team member list: a header per TL, then everyone else in the week."""
+            rows = []
+            for tl in sorted_fundraisers[week]:
+                if weekly_tl_flags[week][tl]:
+                    rows.append((None, f"Team for {tl}"))
+                    rows.extend(((tl, person), person) for person in sorted_fundraisers[week] if person != tl)
+            return rows
+
+        def build_week_tab(week, week_frame):
+            # Roster changes since the assignments were saved
+            change = roster_diff.get(week)
+            if change and change['stored'] and (change['added'] or change['removed']):
+                diff_text = []
+                if change['added']:
+                    diff_text.append("New since last time: " + ", ".join(change['added']))
+                if change['removed']:
+                    diff_text.append("No longer in export: " + ", ".join(change['removed']))
+                tk.Label(week_frame, text="\n".join(diff_text), font=("Helvetica", 10),
+                         bg=self.colors['bg'], fg=self.colors['warning'],
+                         wraplength=900, justify="left").pack(anchor="w", padx=10, pady=(10, 0))
 
             # Main container
             main_container = tk.Frame(week_frame, bg=self.colors['bg_secondary'])
@@ -546,21 +1074,52 @@ class CSVFormatterApp:
             tl_canvas.pack(side="left", fill="both", expand=True)
             tl_scrollbar.pack(side="right", fill="y")
 
-            # Initialize week data
-            weekly_tl_checkboxes[week] = {}
-            weekly_working_days[week] = {}
-            weekly_team_assignments[week] = {}
+            # Right side - Team assignments
+            right_frame = tk.Frame(main_container, bg=self.colors['bg_secondary'])
+            right_frame.pack(side="right", fill="both", expand=True)
+
+            # Team assignment title
+            team_title = tk.Label(right_frame, text="Team Assignments",
+                                 font=("Helvetica", 12, "bold"),
+                                 bg=self.colors['bg_secondary'], fg=self.colors['fg'])
+            team_title.pack(pady=(0, 10))
+
+            # Team member list, redrawn from the selections instead of rebuilt
+            def set_member(key, checked):
+                tl, person = key
+                members = weekly_team_members[week][tl]
+                if checked:
+                    members.add(person)
+                else:
+                    members.discard(person)
+
+            member_list = VirtualCheckList(right_frame, self.colors,
+                                           is_checked=lambda key: key[1] in weekly_team_members[week][key[0]],
+                                           set_checked=set_member)
+            member_list.frame.pack(fill="both", expand=True)
+            member_list.set_items(member_rows(week))
+
+            def on_tl_toggled(fundraiser, var):
+                is_tl = var.get()
+                weekly_tl_flags[week][fundraiser] = is_tl
+                if is_tl:
+                    weekly_team_members[week].setdefault(fundraiser, set())
+                else:
+                    weekly_team_members[week].pop(fundraiser, None)
+                member_list.set_items(member_rows(week))
+
+            def on_days_changed(fundraiser, var):
+                weekly_working_days[week][fundraiser] = var.get()
 
             # Team leader selection rows
-            for fundraiser in sorted(fundraisers_by_week[week]):
+            for fundraiser in sorted_fundraisers[week]:
                 tl_row_frame = tk.Frame(tl_scrollable_frame, bg=self.colors['entry'], relief="solid", bd=1)
                 tl_row_frame.pack(fill="x", padx=5, pady=2)
 
                 # TL checkbox
-                weekly_tl_checkboxes[week][fundraiser] = tk.BooleanVar()
-                tl_checkbox = ttk.Checkbutton(tl_row_frame, text="TL",
-                                            variable=weekly_tl_checkboxes[week][fundraiser],
-                                            command=lambda f=fundraiser, w=week: dialog.on_tl_selection_changed(w, f, weekly_tl_checkboxes, weekly_team_assignments, fundraisers_by_week, team_assignment_frame))
+                tl_var = tk.BooleanVar(value=weekly_tl_flags[week][fundraiser])
+                tl_checkbox = ttk.Checkbutton(tl_row_frame, text="TL", variable=tl_var,
+                                            command=lambda f=fundraiser, v=tl_var: on_tl_toggled(f, v))
                 tl_checkbox.pack(side="left", padx=5)
 
                 # Fundraiser name
@@ -571,10 +1130,10 @@ class CSVFormatterApp:
                 name_label.pack(side="left", padx=(0, 10))
 
                 # Working days entry
-                weekly_working_days[week][fundraiser] = tk.StringVar()
-                weekly_working_days[week][fundraiser].set("6")  # Default to 6 days
+                days_var = tk.StringVar(value=weekly_working_days[week][fundraiser])
+                days_var.trace_add("write", lambda *args, f=fundraiser, v=days_var: on_days_changed(f, v))
                 days_entry = tk.Entry(tl_row_frame,
-                                    textvariable=weekly_working_days[week][fundraiser],
+                                    textvariable=days_var,
                                     font=("Helvetica", 9), width=8,
                                     bg=self.colors['entry'], fg=self.colors['entry_text'])
                 days_entry.pack(side="right", padx=5)
@@ -582,39 +1141,31 @@ class CSVFormatterApp:
                 tk.Label(tl_row_frame, text="Days:", font=("Helvetica", 9),
                         bg=self.colors['entry'], fg=self.colors['fg']).pack(side="right", padx=(0, 5))
 
-            # Right side - Team assignments
-            right_frame = tk.Frame(main_container, bg=self.colors['bg_secondary'])
-            right_frame.pack(side="right", fill="both", expand=True)
-
-            # Team assignment title
-            team_title = tk.Label(right_frame, text="Team Assignments",
-                                 font=("Helvetica", 12, "bold"),
-                                 bg=self.colors['bg_secondary'], fg=self.colors['fg'])
-            team_title.pack(pady=(0, 10))
-
-            # Team assignment frame (will be populated dynamically)
-            team_assignment_frame = tk.Frame(right_frame, bg=self.colors['bg_secondary'])
-            team_assignment_frame.pack(fill="both", expand=True)
-
-            # Store reference to the team assignment frame for updates
-            weekly_team_assignments[week] = {"frame": team_assignment_frame, "assignments": {}}
-
-        # Add helper method for TL selection changes
-        def on_tl_selection_changed(week, fundraiser, tl_checkboxes, team_assignments, all_fundraisers, assignment_frame):
-            self.update_team_assignments_ui(week, fundraiser, tl_checkboxes, team_assignments, all_fundraisers, assignment_frame)
+        # One empty tab per week; its content is built on first selection
+        week_tabs = {}
+        built_weeks = set()
+        for week in fundraisers_by_week:
+            week_frame = ttk.Frame(notebook)
+            notebook.add(week_frame, text=f"{week}")
+            week_tabs[str(week_frame)] = (week, week_frame)
 
-        # Store the helper function in dialog for access
-        dialog.on_tl_selection_changed = on_tl_selection_changed
+        def on_tab_changed(event=None):
+            selected = notebook.select()
+            if selected in week_tabs:
+                week, week_frame = week_tabs[selected]
+                if week not in built_weeks:
+                    built_weeks.add(week)
+                    build_week_tab(week, week_frame)
 
-        # Result storage
-        result = {"confirmed": False}
+        notebook.bind("<<NotebookTabChanged>>", on_tab_changed)
+        on_tab_changed()
 
         def on_confirm():
             # Validate all inputs
-            for week, fundraisers_vars in weekly_working_days.items():
-                for fundraiser, days_var in fundraisers_vars.items():
+            for week, fundraisers_days in weekly_working_days.items():
+                for fundraiser, days_text in fundraisers_days.items():
                     try:
-                        days = float(days_var.get())
+                        days = float(days_text)
                         if days <= 0:
                             messagebox.showerror("Invalid Input",
                                                f"Working days for {fundraiser} in {week} must be greater than 0")
@@ -635,33 +1186,74 @@ class CSVFormatterApp:
                 self.fundraiser_working_days[week] = {}
 
                 for fundraiser in fundraisers_by_week[week]:
-                    is_tl = weekly_tl_checkboxes[week][fundraiser].get()
-                    working_days = float(weekly_working_days[week][fundraiser].get())
+                    is_tl = weekly_tl_flags[week][fundraiser]
+                    working_days = float(weekly_working_days[week][fundraiser])
 
                     if is_tl:
                         self.weekly_team_leaders[week][fundraiser] = working_days
                         # Get team assignments for this TL
-                        if fundraiser in weekly_team_assignments[week]["assignments"]:
-                            team_members = []
-                            for member, var in weekly_team_assignments[week]["assignments"][fundraiser].items():
-                                if var.get():
-                                    team_members.append(member)
-                            self.weekly_team_assignments[week][fundraiser] = team_members
-                            print(f"DEBUG: TL {fundraiser} in {week} assigned team: {team_members}")
+                        members = weekly_team_members[week].get(fundraiser, set())
+                        team_members = [person for person in sorted_fundraisers[week] if person in members]
+                        self.weekly_team_assignments[week][fundraiser] = team_members
+                        logger.debug("TL %s in %s assigned team: %s", fundraiser, week, team_members)
 
                     self.fundraiser_working_days[week][fundraiser] = working_days
 
-            result["confirmed"] = True
             dialog.destroy()
+            on_close(True)
 
         def on_cancel():
-            result["confirmed"] = False
             dialog.destroy()
+            on_close(False)
+
+        def on_import_timesheet():
+            path = filedialog.askopenfilename(parent=dialog, title="Select Timesheet",
+                                              filetypes=[("Timesheets", "*.csv *.xlsx"), ("All files", "*.*")])
+            if not path:
+                return
+            from timesheet import read_timesheet, match_timesheet, format_report
+            try:
+                imported, report = match_timesheet(read_timesheet(path), fundraisers_by_week, week_keys,
+                                                   fundraiser_ids)
+            except (OSError, ValueError, KeyError) as e:
+                messagebox.showerror("Import Failed", f"Could not import the timesheet:\n\n{e}", parent=dialog)
+                return
+
+            # Replace the selections of every week the timesheet covers
+            for week, names in sorted_fundraisers.items():
+                if week not in imported['working_days'] and week not in imported['team_leaders']:
+                    continue
+                weekly_working_days[week].update({name: f"{days:g}"
+                                                  for name, days in imported['working_days'].get(week, {}).items()})
+                leaders = imported['team_leaders'].get(week, {})
+                weekly_tl_flags[week] = {name: name in leaders for name in names}
+                weekly_team_members[week] = {tl: set(imported['team_assignments'].get(week, {}).get(tl, []))
+                                             for tl in leaders}
+
+            # Rebuild the tabs already shown from the new selections
+            for week, week_frame in week_tabs.values():
+                if week in built_weeks:
+                    for child in week_frame.winfo_children():
+                        child.destroy()
+            built_weeks.clear()
+            on_tab_changed()
+
+            lines = format_report(report)
+            if lines:
+                messagebox.showwarning("Timesheet Imported", "\n\n".join(lines), parent=dialog)
 
         # Buttons
         button_frame = tk.Frame(dialog, bg="#f0f0f0")
         button_frame.pack(side="bottom", pady=20)
 
+        if week_keys:
+            import_btn = tk.Button(button_frame, text="Import Timesheet...",
+                                   font=("Helvetica", 12),
+                                   bg=self.colors['button'], fg=self.colors['button_text'],
+                                   padx=20, pady=8,
+                                   command=on_import_timesheet)
+            import_btn.pack(side="left", padx=(0, 30))
+
         cancel_btn = tk.Button(button_frame, text="Cancel",
                               font=("Helvetica", 12),
                               bg="#95a5a6", fg="white",
@@ -676,702 +1268,24 @@ class CSVFormatterApp:
                                command=on_confirm)
         confirm_btn.pack(side="right")
 
-        # Wait for dialog to close
-        dialog.wait_window()
-
-        return result["confirmed"]
-
-    def calculate_regular_fundraiser_payout(self, points, working_days, bonus_eligible=True):
-        """
-        Calculate payout for regular fundraiser based on points and working days.
-
-        Args:
-            points: Total points earned
-            working_days: Number of days worked
-            bonus_eligible: Whether the fundraiser is eligible for bonus (default: True)
-
-        Returns:
-            Dictionary with payout details
-        """
-        if working_days <= 0:
-            return {"daily_average": 0, "payout": 0, "rate": 0, "bracket": "keine Arbeitstage"}
-
-        daily_average = points / working_days
-
-        # If not eligible for bonus, set payout and rate to zero
-        if not bonus_eligible:
-            return {
-                "daily_average": daily_average,
-                "payout": 0,
-                "rate": 0,
-                "bracket": "nicht gewährt"
-            }
-
-        # Payment rates based on daily average
-        if daily_average < 2:
-            rate = 3.95
-            bracket = "unter 2er"
-        elif daily_average < 3:
-            rate = 10
-            bracket = "2er"
-        elif daily_average < 5:
-            rate = 15
-            bracket = "3er"
-        elif daily_average < 7:
-            rate = 20
-            bracket = "5er"
-        else:
-            rate = 30
-            bracket = "7er+"
-
-        payout = points * rate
+        # Closing the window counts as cancel
+        dialog.protocol("WM_DELETE_WINDOW", on_cancel)
 
+    def tl_selection(self):
+        """The last confirmed TL dialog input as a selection dict (see assignments.empty_selection)."""
         return {
-            "daily_average": daily_average,
-            "payout": payout,
-            "rate": rate,
-            "bracket": bracket
+            "team_leaders": self.weekly_team_leaders,
+            "team_assignments": self.weekly_team_assignments,
+            "working_days": self.fundraiser_working_days,
         }
 
-    def calculate_team_leader_bonus(self, team_data, tl_working_days):
-        """
-        Calculate team leader bonus based on team performance.
-
-        Args:
-            team_data: Dictionary with fundraiser data for the team
-            tl_working_days: Team leader's working days
-
-        Returns:
-            Dictionary with bonus details
-        """
-        # Initialize default return structure
-        default_return = {
-            "bonus": 0,
-            "team_average": 0,
-            "rate": 0,
-            "bracket": "kein Bonus",
-            "team_size": len(team_data) if team_data else 0,
-            "team_points": 0
-        }
-
-        if not team_data or len(team_data) < 3:  # Minimum 3 total (TL + 2 team members)
-            default_return["bracket"] = ""
-            return default_return
-
-        # Calculate team total points (including TL)
-        team_points = 0
-        team_working_days = 0
-
-        for fundraiser, data in team_data.items():
-            team_points += data["points"]
-            team_working_days += data["working_days"]
-
-        if team_working_days <= 0:
-            default_return["bracket"] = "keine Arbeitstage"
-            return default_return
-
-        team_average = team_points / team_working_days
-
-        # Bonus rates based on team average
-        if team_average < 2:
-            rate = 0.50
-            bracket = "unter 2er"
-        elif team_average < 3:
-            rate = 1.00
-            bracket = "2er"
-        elif team_average < 5:
-            rate = 2.50
-            bracket = "3er"
-        else:
-            rate = 4.50
-            bracket = "5er+"
-
-        bonus = team_points * rate
-
-        return {
-            "bonus": bonus,
-            "team_average": team_average,
-            "rate": rate,
-            "bracket": bracket,
-            "team_size": len(team_data),
-            "team_points": team_points
-        }
-
-    def calculate_team_leader_milestones(self, team_size):
-        """
-        Calculate milestone bonuses for team leaders based on team size.
-
-        Args:
-            team_size: Number of people in the team
-
-        Returns:
-            Dictionary with milestone bonus amounts
-        """
-        if team_size < 4:
-            communication_coach = 5
-            communication_office = 5
-            external_presence = 5
-            material_responsibility = 5
-        elif team_size < 6:
-            communication_coach = 20
-            communication_office = 20
-            external_presence = 20
-            material_responsibility = 20
-        else:
-            communication_coach = 30
-            communication_office = 30
-            external_presence = 30
-            material_responsibility = 30
-
-        return {
-            "communication_coach": communication_coach,
-            "communication_office": communication_office,
-            "external_presence": external_presence,
-            "material_responsibility": material_responsibility,
-            "total_possible": communication_coach + communication_office + external_presence + material_responsibility,
-            "team_size_bracket": f"{team_size} persons"
-        }
-
-    # CSV Processing Logic (from original script)
-    def calculate_points(self, age, interval, amount_yearly):
-        age = int(age)
-        amount = float(amount_yearly)
-        
-        if age < 25:
-            return 0.5
-        
-        if age < 30:
-            return 0.5 if interval.lower() == 'monthly' else 1.0
-        
-        base_points = 0
-        if amount >= 360:
-            if interval.lower() == 'yearly':
-                base_points = 5
-            elif 'half' in interval.lower():
-                base_points = 4
-            else:
-                base_points = 3
-        elif amount >= 240:
-            if interval.lower() == 'yearly':
-                base_points = 4
-            elif 'half' in interval.lower():
-                base_points = 3
-            else:
-                base_points = 2
-        elif amount >= 180:
-            if interval.lower() == 'yearly':
-                base_points = 3
-            elif 'half' in interval.lower():
-                base_points = 2.5
-            else:
-                base_points = 1.5
-        elif amount >= 120:
-            if interval.lower() == 'yearly':
-                base_points = 2
-            elif 'half' in interval.lower():
-                base_points = 1.5
-            else:
-                base_points = 1
-        else:
-            base_points = 1
-        
-        if age >= 40:
-            base_points += 1
-        
-        return base_points
-
-    def calculate_points_vectorized(self, age_series, interval_series, amount_series):
-        """
-        Vectorized version of calculate_points for better performance.
-        """
-        # Convert to numpy arrays for faster processing
-        ages = pd.to_numeric(age_series, errors='coerce').fillna(0).astype(int)
-        amounts = pd.to_numeric(amount_series, errors='coerce').fillna(0)
-        intervals = interval_series.fillna('').astype(str).str.lower()
-
-        # Initialize points array
-        points = np.zeros(len(ages))
-
-        # Age < 25: 0.5 points
-        mask_young = ages < 25
-        points[mask_young] = 0.5
-
-        # Age 25-29: 0.5 for monthly, 1.0 for others
-        mask_25_29 = (ages >= 25) & (ages < 30)
-        points[mask_25_29 & (intervals == 'monthly')] = 0.5
-        points[mask_25_29 & (intervals != 'monthly')] = 1.0
-
-        # Age >= 30: calculate based on amount and interval
-        mask_30_plus = ages >= 30
-
-        if mask_30_plus.any():
-            ages_30 = ages[mask_30_plus]
-            amounts_30 = amounts[mask_30_plus]
-            intervals_30 = intervals[mask_30_plus]
-            points_30 = np.zeros(len(ages_30))
-
-            # Amount >= 360
-            mask_360 = amounts_30 >= 360
-            points_30[mask_360 & (intervals_30 == 'yearly')] = 5
-            points_30[mask_360 & intervals_30.str.contains('half', na=False)] = 4
-            points_30[mask_360 & ~(intervals_30 == 'yearly') & ~intervals_30.str.contains('half', na=False)] = 3
-
-            # Amount 240-359
-            mask_240 = (amounts_30 >= 240) & (amounts_30 < 360)
-            points_30[mask_240 & (intervals_30 == 'yearly')] = 4
-            points_30[mask_240 & intervals_30.str.contains('half', na=False)] = 3
-            points_30[mask_240 & ~(intervals_30 == 'yearly') & ~intervals_30.str.contains('half', na=False)] = 2
-
-            # Amount 180-239
-            mask_180 = (amounts_30 >= 180) & (amounts_30 < 240)
-            points_30[mask_180 & (intervals_30 == 'yearly')] = 3
-            points_30[mask_180 & intervals_30.str.contains('half', na=False)] = 2.5
-            points_30[mask_180 & ~(intervals_30 == 'yearly') & ~intervals_30.str.contains('half', na=False)] = 1.5
-
-            # Amount 120-179
-            mask_120 = (amounts_30 >= 120) & (amounts_30 < 180)
-            points_30[mask_120 & (intervals_30 == 'yearly')] = 2
-            points_30[mask_120 & intervals_30.str.contains('half', na=False)] = 1.5
-            points_30[mask_120 & ~(intervals_30 == 'yearly') & ~intervals_30.str.contains('half', na=False)] = 1
-
-            # Amount < 120
-            mask_below_120 = amounts_30 < 120
-            points_30[mask_below_120] = 1
-
-            # Age >= 40 bonus
-            mask_40_plus = ages_30 >= 40
-            points_30[mask_40_plus] += 1
-
-            points[mask_30_plus] = points_30
-
-        return points
-
-    def calculate_bonus_eligibility(self, fundraiser_data):
-        # Filter for cancellation and active/billable status only
-        relevant_donors = fundraiser_data[
-            fundraiser_data['status_agency'].isin(['cancelled', 'active', 'billable', 'approved', 'conditionally approved', 'failed'])
-        ]
-        
-        total_donors = len(relevant_donors)
-        # Count both 'approved' and 'conditionally approved' as approved
-        approved_donors = len(relevant_donors[
-            relevant_donors['status_agency'].isin(['approved', 'conditionally approved'])
-        ])
-        
-        if total_donors == 0:
-            return 'not-eligible'
-        
-        approval_rate = approved_donors / total_donors
-        return 'eligible' if approval_rate >= 0.7 else 'not-eligible'
-    
-    def format_csv(self, input_file, output_file, pdf_output_dir=None):
-        # Handle file path encoding issues on Windows and other platforms
-        encodings = ['utf-8-sig', 'utf-8', 'cp1252', 'iso-8859-1', 'latin1']
-        df = None
-
-        for encoding in encodings:
-            try:
-                # Read CSV, skipping the first 2 header rows
-                df = pd.read_csv(input_file, sep=';', encoding=encoding, skiprows=2)
-                print(f"Successfully read file with {encoding} encoding")
-                break
-            except UnicodeDecodeError:
-                continue
-            except Exception as e:
-                if encoding == encodings[-1]:  # Last encoding attempt
-                    raise Exception(f"Could not read file with any supported encoding. Error: {e}")
-                continue
-
-        if df is None:
-            raise Exception("Could not read the CSV file with any supported encoding")
-
-        # Extract fundraisers by calendar week for TL selection
-        df_temp = df.copy()
-        df_temp.columns = df_temp.columns.str.strip()
-        df_temp = df_temp[~df_temp['Fundraiser Name'].str.contains('Subtotal|Total', case=False, na=False)]
-        df_temp['Fundraiser Name'] = df_temp['Fundraiser Name'].ffill()
-        df_temp['Calendar week'] = df_temp['Calendar week'].ffill()
-
-        # Group fundraisers by calendar week using vectorized operations
-        valid_data = df_temp[df_temp['Fundraiser Name'].notna() & df_temp['Calendar week'].notna()]
-        fundraisers_by_week = valid_data.groupby('Calendar week')['Fundraiser Name'].apply(set).to_dict()
-
-        # Convert sets to lists for dialog
-        for week in fundraisers_by_week:
-            fundraisers_by_week[week] = list(fundraisers_by_week[week])
-
-        # Show weekly TL selection dialog synchronously
-        result = []
-        def show_dialog():
-            result.append(self.show_weekly_tl_selection_dialog(fundraisers_by_week))
-
-        self.root.after_idle(show_dialog)
-
-        # Wait for dialog to complete
-        while not result:
-            self.root.update()
-
-        if not result[0]:
-            raise Exception("Team Leader selection was cancelled")
-
-        print(f"Weekly Team Leaders: {self.weekly_team_leaders}")
-        print(f"Weekly Team Assignments: {self.weekly_team_assignments}")
-        print(f"Weekly working days: {self.fundraiser_working_days}")
-
-        # Debug: Check if team leaders appear in multiple weeks
-        all_tls = set()
-        for week, tls in self.weekly_team_leaders.items():
-            all_tls.update(tls.keys())
-        print(f"All team leaders across all weeks: {all_tls}")
-        for tl in all_tls:
-            weeks_for_tl = [week for week, tls in self.weekly_team_leaders.items() if tl in tls]
-            print(f"TL {tl} is assigned to weeks: {weeks_for_tl}")
-
-        # Debug: print unique calendar weeks in the data
-        print(f"Calendar weeks in data: {sorted(df['Calendar week'].dropna().unique())}")
-        
-        # Clean column names
-        df.columns = df.columns.str.strip()
-        
-        # Filter out subtotal and total rows
-        df = df[~df['Fundraiser Name'].str.contains('Subtotal|Total', case=False, na=False)]
-        
-        # Filter out rows where Public RefID is NaN or empty
-        df = df[df['Public RefID'].notna()]
-        df = df[df['Public RefID'] != '']
-        
-        # Forward fill fundraiser information
-        df['Fundraiser ID'] = df['Fundraiser ID'].ffill()
-        df['Fundraiser Name'] = df['Fundraiser Name'].ffill()
-        df['Calendar week'] = df['Calendar week'].ffill()
-        df['Billing group'] = df['Billing group'].ffill()
-        
-        # Preserve original formatting for Fundraiser ID
-        df['Fundraiser ID'] = df['Fundraiser ID'].astype(str).str.replace('.0', '').str.zfill(5)
-        
-        # Extract calendar week number for sorting
-        df['KW_num'] = df['Calendar week'].str.extract(r'(\d+)').fillna(0).astype(int)
-        
-        # Calculate points for each donor using vectorized operations
-        df['points'] = self.calculate_points_vectorized(df['Age'], df['Interval'], df['Amount Yearly'])
-        
-        # Group by fundraiser to calculate bonus eligibility
-        fundraiser_bonus = {}
-        unique_ids = df['Fundraiser ID'].dropna().unique()
-        print(f"Processing bonus eligibility for {len(unique_ids)} fundraisers...")
-
-        for i, fundraiser_id in enumerate(unique_ids):
-            if i % 10 == 0:  # Update progress every 10 fundraisers
-                print(f"Processing fundraiser {i+1}/{len(unique_ids)}")
-            fundraiser_data = df[df['Fundraiser ID'] == fundraiser_id]
-            fundraiser_bonus[fundraiser_id] = self.calculate_bonus_eligibility(fundraiser_data)
-        
-        # Add bonus status to dataframe
-        df['bonus_status'] = df['Fundraiser ID'].map(fundraiser_bonus)
-        
-        # Sort data
-        df_sorted = df.sort_values(['KW_num', 'Fundraiser Name', 'Billing group'])
-        
-        # Select only required columns
-        required_columns = [
-            'Fundraiser ID', 'Fundraiser Name', 'Calendar week',
-            'Public RefID', 'Age', 'Interval', 'Amount Yearly', 'status_agency',
-            'points', 'bonus_status'
-        ]
-        
-        # Calculate payment data for all fundraisers per week
-        weekly_fundraiser_payments = {}
-        weekly_team_leader_bonuses = {}
-
-        # Process each week separately
-        for week in sorted(df_sorted['Calendar week'].dropna().unique()):
-            if pd.isna(week) or week == '':
-                continue
-
-            week_data = df_sorted[df_sorted['Calendar week'] == week]
-
-            # Skip if no working days data for this week
-            if week not in self.fundraiser_working_days:
-                print(f"Warning: No working days data for week {week}")
-                continue
-
-            weekly_fundraiser_payments[week] = {}
-            team_data_for_week = {}
-
-            # Calculate individual fundraiser payouts for this week
-            for fundraiser_name in week_data['Fundraiser Name'].dropna().unique():
-                if pd.notna(fundraiser_name) and fundraiser_name in self.fundraiser_working_days[week]:
-                    fundraiser_week_data = week_data[week_data['Fundraiser Name'] == fundraiser_name]
-                    non_cancelled_data = fundraiser_week_data[fundraiser_week_data['status_agency'] != 'cancelled']
-                    week_points = non_cancelled_data['points'].sum()
-                    working_days = self.fundraiser_working_days[week][fundraiser_name]
-
-                    # Check bonus eligibility for this fundraiser for this specific week
-                    fundraiser_data = week_data[week_data['Fundraiser Name'] == fundraiser_name]
-                    bonus_status = self.calculate_bonus_eligibility(fundraiser_data)
-                    is_eligible = bonus_status == 'eligible'
-
-                    # Calculate regular payout
-                    payout_info = self.calculate_regular_fundraiser_payout(week_points, working_days, is_eligible)
-
-                    # Debug: check payout_info structure
-                    if not payout_info or 'bracket' not in payout_info:
-                        print(f"Warning: Invalid payout_info for {fundraiser_name} in {week}: {payout_info}")
-
-                    weekly_fundraiser_payments[week][fundraiser_name] = {
-                        "points": week_points,
-                        "working_days": working_days,
-                        "payout": payout_info
-                    }
-
-                    team_data_for_week[fundraiser_name] = {
-                        "points": week_points,
-                        "working_days": working_days
-                    }
-
-            # Calculate team leader bonuses for this week
-            if week in self.weekly_team_leaders and self.weekly_team_leaders[week]:
-                print(f"Processing TL bonuses for {week}: TLs = {list(self.weekly_team_leaders[week].keys())}")
-                weekly_team_leader_bonuses[week] = {}
-
-                for tl_name, tl_working_days in self.weekly_team_leaders[week].items():
-                    if tl_name in team_data_for_week:
-                        # Get specific team members for this TL
-                        tl_team_data = {tl_name: team_data_for_week[tl_name]}  # Include TL in their team
-
-                        # Add selected team members for this TL
-                        if week in self.weekly_team_assignments and tl_name in self.weekly_team_assignments[week]:
-                            for team_member in self.weekly_team_assignments[week][tl_name]:
-                                if team_member in team_data_for_week:
-                                    tl_team_data[team_member] = team_data_for_week[team_member]
-                        else:
-                            # If no specific team assignments, include all other fundraisers as team members (backward compatibility)
-                            print(f"No specific team assignments for TL {tl_name} in {week}, using all fundraisers")
-                            for fundraiser_name, fundraiser_data in team_data_for_week.items():
-                                if fundraiser_name != tl_name:  # Don't duplicate the TL
-                                    tl_team_data[fundraiser_name] = fundraiser_data
-
-                        # Calculate team bonus only for selected team members
-                        team_bonus_info = self.calculate_team_leader_bonus(tl_team_data, tl_working_days)
-                        milestone_info = self.calculate_team_leader_milestones(len(tl_team_data))
-
-                        # Debug: check team bonus structure
-                        if not team_bonus_info or 'bracket' not in team_bonus_info:
-                            print(f"Warning: Invalid team_bonus_info for {tl_name} in {week}: {team_bonus_info}")
-
-                        print(f"TL {tl_name} team in {week}: {list(tl_team_data.keys())} (size: {len(tl_team_data)})")
-
-                        # Get team member names for this TL
-                        team_member_names = list(tl_team_data.keys())
-
-                        weekly_team_leader_bonuses[week][tl_name] = {
-                            "team_bonus": team_bonus_info,
-                            "milestones": milestone_info,
-                            "team_members": team_member_names
-                        }
-
-        # Create output dataframe with subtotals and payment info
-        final_rows = []
-
-        # Process data grouped by KW and Fundraiser
-        unique_weeks = sorted(df_sorted['KW_num'].dropna().unique())
-        print(f"Processing {len(unique_weeks)} calendar weeks...")
-
-        for week_idx, kw_num in enumerate(unique_weeks):
-            if kw_num == 0:
-                continue
-
-            print(f"Processing week {week_idx+1}/{len(unique_weeks)}: KW{int(kw_num)}")
-
-            # Fix calendar week formatting for weeks 1-12
-            if kw_num <= 12:
-                kw_str = f"KW{int(kw_num)}"
-                # Match calendar week data properly for weeks 1-12
-                kw_data = df_sorted[
-                    (df_sorted['Calendar week'].str.contains(f'KW{int(kw_num)}', na=False)) |
-                    (df_sorted['Calendar week'].str.contains(f'{int(kw_num)}/2025', na=False))
-                ]
-            else:
-                kw_str = f"{int(kw_num)}/2025"
-                kw_data = df_sorted[df_sorted['Calendar week'] == kw_str]
-
-            for fundraiser_name in sorted(kw_data['Fundraiser Name'].dropna().unique()):
-                fundraiser_data = kw_data[kw_data['Fundraiser Name'] == fundraiser_name]
-
-                # Add all individual entries using vectorized operations
-                fundraiser_dicts = fundraiser_data[required_columns].to_dict('records')
-                for row_dict in fundraiser_dicts:
-                    row_dict['bonus_status'] = ''
-                    final_rows.append(row_dict)
-
-                # Add subtotal row
-                # Exclude cancelled donors from total points calculation
-                non_cancelled_data = fundraiser_data[fundraiser_data['status_agency'] != 'cancelled']
-                total_points = non_cancelled_data['points'].sum()
-                bonus_status = fundraiser_data['bonus_status'].iloc[0]
-
-                subtotal_row = {
-                    'Fundraiser ID': '',
-                    'Fundraiser Name': '',
-                    'Calendar week': '',
-                    'Public RefID': '',
-                    'Age': '',
-                    'Interval': '',
-                    'Amount Yearly': '',
-                    'status_agency': '',
-                    'points': f"Total: {total_points}",
-                    'bonus_status': bonus_status
-                }
-                final_rows.append(subtotal_row)
-
-                # Add payment info for this fundraiser if we have weekly data
-                # Use the original calendar week from the data, not kw_str
-                original_week = fundraiser_data['Calendar week'].iloc[0]
-                if original_week in weekly_fundraiser_payments and fundraiser_name in weekly_fundraiser_payments[original_week]:
-                    payment_info = weekly_fundraiser_payments[original_week][fundraiser_name]
-
-                    # Debug: check if payment_info has the expected structure
-                    if 'payout' in payment_info and payment_info['payout']:
-                        payout_data = payment_info['payout']
-                        payout_row = {
-                            'Fundraiser ID': '',
-                            'Fundraiser Name': '',
-                            'Calendar week': '',
-                            'Public RefID': f"Payout ({payout_data.get('bracket', 'unknown')} avg)",
-                            'Age': '',
-                            'Interval': f"{payment_info.get('working_days', 0)} days",
-                            'Amount Yearly': f"€{payout_data.get('payout', 0):.2f}",
-                            'status_agency': f"Rate: €{payout_data.get('rate', 0)}",
-                            'points': f"Avg: {payout_data.get('daily_average', 0):.2f}",
-                            'bonus_status': ''
-                        }
-                        final_rows.append(payout_row)
-                    else:
-                        print(f"Warning: Invalid payment_info structure for {fundraiser_name} in {original_week}: {payment_info}")
-
-        # Add weekly team leader bonus summary at the end
-        if weekly_team_leader_bonuses:
-            print(f"Final weekly_team_leader_bonuses keys: {list(weekly_team_leader_bonuses.keys())}")
-            for week, bonuses in weekly_team_leader_bonuses.items():
-                print(f"Week {week} has TL bonuses for: {list(bonuses.keys())}")
-            final_rows.append({col: '' for col in required_columns})  # Empty separator row
-
-            final_rows.append({
-                'Fundraiser ID': '',
-                'Fundraiser Name': 'TEAMLEITER BONI (NACH WOCHE)',
-                'Calendar week': '',
-                'Public RefID': '',
-                'Age': '',
-                'Interval': '',
-                'Amount Yearly': '',
-                'status_agency': '',
-                'points': '',
-                'bonus_status': ''
-            })
-
-            for week in sorted(weekly_team_leader_bonuses.keys()):
-                # Week header
-                final_rows.append({
-                    'Fundraiser ID': '',
-                    'Fundraiser Name': f"--- {week} ---",
-                    'Calendar week': '',
-                    'Public RefID': '',
-                    'Age': '',
-                    'Interval': '',
-                    'Amount Yearly': '',
-                    'status_agency': '',
-                    'points': '',
-                    'bonus_status': ''
-                })
-
-                for tl_name, bonus_info in weekly_team_leader_bonuses[week].items():
-                    team_bonus = bonus_info['team_bonus']
-                    milestones = bonus_info['milestones']
-                    team_members = bonus_info.get('team_members', [])
-
-                    # Create team member names string (limit length for CSV)
-                    team_names_str = ", ".join(team_members[:3])  # Show max 3 names
-                    if len(team_members) > 3:
-                        team_names_str += f" (+{len(team_members)-3} weitere)"
-
-                    # Team performance bonus
-                    final_rows.append({
-                        'Fundraiser ID': '',
-                        'Fundraiser Name': tl_name,
-                        'Calendar week': 'Team Bonus',
-                        'Public RefID': f"Team Ø: {team_bonus.get('team_average', 0):.2f}",
-                        'Age': team_names_str,
-                        'Interval': f"€{team_bonus.get('rate', 0)}/Punkt",
-                        'Amount Yearly': f"€{team_bonus.get('bonus', 0):.2f}",
-                        'status_agency': team_bonus.get('bracket', 'unbekannt'),
-                        'points': f"Gesamt: {team_bonus.get('team_points', 0):.1f} Pkt",
-                        'bonus_status': ''
-                    })
-
-                    # Milestone bonuses (potential)
-                    final_rows.append({
-                        'Fundraiser ID': '',
-                        'Fundraiser Name': '',
-                        'Calendar week': 'Meilensteine',
-                        'Public RefID': f"Max möglich: €{milestones.get('total_possible', 0)}",
-                        'Age': milestones.get('team_size_bracket', 'unbekannt'),
-                        'Interval': f"Coach: €{milestones.get('communication_coach', 0)}",
-                        'Amount Yearly': f"Büro: €{milestones.get('communication_office', 0)}",
-                        'status_agency': f"Extern: €{milestones.get('external_presence', 0)}",
-                        'points': f"Material: €{milestones.get('material_responsibility', 0)}",
-                        'bonus_status': ''
-                    })
-        
-        # Create final dataframe
-        final_df = pd.DataFrame(final_rows)
-        
-        # Save with custom headers
-        current_date = datetime.datetime.now().strftime("%Y-%m-%d")
-        header_lines = [
-            f"WoVi_CW_Formatted_{current_date};" + ";" * (len(required_columns) - 1),
-            ";" * len(required_columns)
-        ]
-        
-        with open(output_file, 'w', encoding='utf-8-sig', newline='') as f:
-            # Write headers
-            for line in header_lines:
-                f.write(line + '\n')
-            
-            # Write column headers
-            f.write(';'.join(required_columns) + '\n')
-            
-            # Write data using vectorized operations
-            # Pre-process numeric formatting
-            final_df_copy = final_df.copy()
-            for col in required_columns:
-                if col == 'points':
-                    # Format points column
-                    mask = (final_df_copy[col].notna() &
-                           pd.to_numeric(final_df_copy[col], errors='coerce').notna() &
-                           ~final_df_copy[col].astype(str).str.startswith('Total:'))
-                    final_df_copy.loc[mask, col] = final_df_copy.loc[mask, col].astype(str).str.replace('.', ',')
-
-                # Fill NaN and empty values
-                final_df_copy[col] = final_df_copy[col].fillna('').astype(str)
-
-            # Write all rows at once
-            for row_values in final_df_copy[required_columns].values:
-                f.write(';'.join(row_values) + '\n')
-        
-        # Generate PDF files
-        pdf_files = []
-        try:
-            from pdf_generator import generate_all_pdf_files
-            pdf_files = generate_all_pdf_files(output_file, pdf_output_dir)
-            print(f"Generated {len(pdf_files)} PDF files")
-        except Exception as e:
-            print(f"Error generating PDF files: {e}")
-
-        return {"rows": len(final_df), "pdf_files": pdf_files}
-    
     def run(self):
         self.root.mainloop()
 
 if __name__ == "__main__":
+    # Needed for the worker process in PyInstaller bundles
+    multiprocessing.freeze_support()
+    # Windowed builds have no console (sys.stderr is None): log to the file only
+    configure(log_file=default_log_path(), debug_modules=debug_modules_from_env(), console=sys.stderr is not None)
     app = CSVFormatterApp()
     app.run()
\ No newline at end of file
@@ -0,0 +1,470 @@
+"""
+Differential check of the point and eligibility implementations.
+
+Every implementation runs over the same donors and is compared with a
+plain-Python reading of rules.json (the reference), so a faster engine can
+replace a slower one once it matches everywhere. Inputs are a synthetic
+export (see synthetic_export.py) plus a grid of edge cases: ages around
+the flat and bonus limits (24/25, 29/30, 40/41), amounts just below each
+tier, German interval names and status spellings. Mismatches are reported
+per rule cell, e.g. (rule set, age 30-40, half-yearly, amount 120-180).
+
+    python equivalence.py --donors 100000 -o equivalence.json
+
+The exit status is 1 when any implementation differs from the reference.
+New implementations are added to POINT_ENGINES, STATUS_ENGINES or
+ELIGIBILITY_ENGINES.
+"""
+import math
+import os
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from csv_formatter import calculate_points, calculate_bonus_eligibility, read_export
+from rules import load_rules, normalize_status, decode_status
+from weeks import parse_iso_week
+
+# Edge cases crossed into the point grid
+GRID_AGES = [np.nan, 0, 17, 18, 24, 25, 29, 30, 39, 40, 40.5, 41, 42, 65, 99]
+GRID_INTERVALS = ['Monthly', 'Half-Yearly', 'Yearly', 'monatlich', 'halbjährlich', 'jährlich', 'Quarterly', '']
+GRID_AMOUNTS = [np.nan, 0, 60, 119.99, 120, 179.99, 180, 239.99, 240, 359.99, 360, 1200]
+
+# Status spellings checked one by one
+GRID_STATUSES = ['approved', 'Approved', ' approved ', 'conditionally-approved', 'Conditionally Approved',
+                 'conditionally_approved', 'conditionally approved', 'cancelled', 'CANCELLED', 'failed',
+                 'active', 'billable', 'pending', '']
+
+# Examples kept per mismatching cell
+EXAMPLES = 3
+
+
+# Reference: rules.json read directly, one donor at a time
+
+def _reference_set(rules, week_key):
+    """Rule set data valid for a week key (the most recent one for unknown weeks)."""
+    rule_sets = sorted(rules.rule_sets, key=lambda rule_set: rule_set.valid_from)
+    if week_key <= 0:
+        return rule_sets[-1]
+    for rule_set in rule_sets:
+        data = rule_set.data
+        starts = parse_iso_week(data['valid_from']) if data.get('valid_from') else 0
+        ends = parse_iso_week(data['valid_to']) if data.get('valid_to') else math.inf
+        if starts <= week_key <= ends:
+            return rule_set
+    raise ValueError(f"No rule set covers week {week_key}")
+
+
+def _reference_interval(rules, interval):
+    text = '' if interval is None or interval != interval else str(interval).lower()
+    for name, patterns in rules.data['intervals'].items():
+        if any(pattern.lower() in text for pattern in patterns):
+            return name
+    return rules.data.get('default_interval', list(rules.data['intervals'])[-1])
+
+
+def reference_points(rules, age, interval, amount, week_key=0):
+    """Points of one donor straight from the rule set's JSON."""
+    points = _reference_set(rules, week_key).data['points']
+    age = 0 if age is None or age != age else math.floor(age)
+    amount = 0 if amount is None or amount != amount else amount
+    interval = _reference_interval(rules, interval)
+
+    for flat in sorted(points.get('flat_by_age', []), key=lambda row: row['below_age']):
+        if age < flat['below_age']:
+            return float(flat[interval])
+    tier = [row for row in sorted(points['table'], key=lambda row: row['min_amount']) if amount >= row['min_amount']][-1]
+    bonus = sum(row['points'] for row in points.get('age_bonus', []) if age >= row['min_age'])
+    return float(tier[interval] + bonus)
+
+
+def reference_status(rules, status, week_key=0):
+    """(counted, approved, excluded) of one agency status."""
+    data = _reference_set(rules, week_key).data
+    status = normalize_status(status)
+    eligibility = data['eligibility']
+    return (status in {normalize_status(s) for s in eligibility.get('counted_statuses', [])},
+            status in {normalize_status(s) for s in eligibility.get('approved_statuses', [])},
+            status in {normalize_status(s) for s in data['points'].get('excluded_statuses', [])})
+
+
+def reference_eligible(rules, statuses, week_key=0):
+    """70% rule for one group of statuses."""
+    flags = [reference_status(rules, status, week_key) for status in statuses]
+    counted = sum(flag[0] for flag in flags)
+    approved = sum(flag[1] for flag in flags)
+    rate = _reference_set(rules, week_key).data['eligibility']['min_approval_rate']
+    return counted > 0 and approved / counted >= rate
+
+
+# Implementations: (rules, frame) -> one value per row or group
+
+def _points_reference(rules, donors):
+    return np.array([reference_points(rules, age, interval, amount, week_key) for age, interval, amount, week_key
+                     in zip(donors['Age'], donors['Interval'], donors['Amount Yearly'], donors['week_key'])])
+
+
+def _points_scalar(rules, donors):
+    return np.array([calculate_points(age, interval, amount, rules, week_key) for age, interval, amount, week_key
+                     in zip(donors['Age'], donors['Interval'], donors['Amount Yearly'], donors['week_key'])])
+
+
+def _points_rule_set(rules, donors):
+    points = np.zeros(len(donors))
+    sets = rules.rule_set_index(donors['week_key'])
+    for index in np.unique(sets):
+        rows = sets == index
+        part = donors[rows]
+        points[rows] = rules.rule_sets[index].points(part['Age'], part['Interval'], part['Amount Yearly'])
+    return points
+
+
+def _points_compiled(rules, donors):
+    return rules.points(donors['Age'], donors['Interval'], donors['Amount Yearly'], donors['week_key'])
+
+
+POINT_ENGINES = {
+    'reference': _points_reference,
+    'calculate_points': _points_scalar,
+    'rule_set': _points_rule_set,
+    'compiled': _points_compiled,
+}
+
+
+def _statuses_reference(rules, statuses):
+    return np.array([reference_status(rules, status, week_key)
+                     for status, week_key in zip(statuses['status_agency'], statuses['week_key'])], dtype=bool)
+
+
+def _statuses_rule_set(rules, statuses):
+    flags = np.zeros((len(statuses), 3), dtype=bool)
+    sets = rules.rule_set_index(statuses['week_key'])
+    for index in np.unique(sets):
+        rows = sets == index
+        flags[rows] = np.column_stack(rules.rule_sets[index].status_masks(statuses['status_agency'][rows]))
+    return flags
+
+
+def _statuses_compiled(rules, statuses):
+    return np.column_stack(decode_status(rules.status_codes(statuses['status_agency'], statuses['week_key'])))
+
+
+STATUS_ENGINES = {
+    'reference': _statuses_reference,
+    'rule_set': _statuses_rule_set,
+    'compiled': _statuses_compiled,
+}
+
+
+def _groups(donors):
+    return donors.groupby('group', sort=True)
+
+
+def _eligible_reference(rules, donors):
+    return np.array([reference_eligible(rules, list(group['status_agency']), int(group['week_key'].iloc[0]))
+                     for _, group in _groups(donors)])
+
+
+def _eligible_bonus_status(rules, donors):
+    # csv_formatter.calculate_bonus_eligibility, one group at a time
+    return np.array([calculate_bonus_eligibility(group, rules, int(group['week_key'].iloc[0])) == 'eligible'
+                     for _, group in _groups(donors)])
+
+
+def _eligible_reports(rules, donors):
+    # As the PDF and HTML generators do per fundraiser-week
+    eligible = []
+    for _, group in _groups(donors):
+        week_rules = rules.for_week(int(group['week_key'].iloc[0]))
+        counted, approved, _ = week_rules.status_masks(group['status_agency'])
+        eligible.append(bool(week_rules.eligible(counted.sum(), approved.sum())))
+    return np.array(eligible)
+
+
+def _eligible_compiled(rules, donors):
+    # As pipeline.process_export does: status codes, then group sums
+    counted, approved, _ = decode_status(rules.status_codes(donors['status_agency'], donors['week_key']))
+    groups = donors['group'].to_numpy()
+    size = groups.max() + 1
+    week_keys = pd.Series(donors['week_key'].to_numpy()).groupby(groups).first().reindex(range(size))
+    return rules.eligible(np.bincount(groups, counted, size), np.bincount(groups, approved, size),
+                          week_keys.to_numpy())
+
+
+ELIGIBILITY_ENGINES = {
+    'reference': _eligible_reference,
+    'calculate_bonus_eligibility': _eligible_bonus_status,
+    'report_generators': _eligible_reports,
+    'compiled': _eligible_compiled,
+}
+
+
+# Inputs
+
+def _week_keys(rules):
+    """One week key inside each rule set."""
+    keys = []
+    for rule_set in rules.rule_sets:
+        data = rule_set.data
+        keys.append(parse_iso_week(data['valid_from']) if data.get('valid_from') else parse_iso_week('2025-W18'))
+    return keys
+
+
+def point_grid(rules):
+    """Donor frame crossing the edge-case ages, intervals and amounts for every rule set."""
+    index = pd.MultiIndex.from_product([GRID_AGES, GRID_INTERVALS, GRID_AMOUNTS, _week_keys(rules)],
+                                       names=['Age', 'Interval', 'Amount Yearly', 'week_key'])
+    return index.to_frame(index=False)
+
+
+def status_grid(rules, statuses=()):
+    """Every grid and given status once per rule set."""
+    values = list(dict.fromkeys(GRID_STATUSES + [str(status) for status in statuses]))
+    index = pd.MultiIndex.from_product([values, _week_keys(rules)], names=['status_agency', 'week_key'])
+    return index.to_frame(index=False)
+
+
+def eligibility_grid(rules, max_donors=20):
+    """
+    Groups of up to max_donors donors at every approval count, per rule set.
+
+    Approved donors alternate between 'approved' and 'conditionally-approved',
+    the others between 'cancelled' and 'failed'; one group has no counted
+    status at all.
+    """
+    rows = []
+    group = 0
+    for week_key in _week_keys(rules):
+        for size in range(1, max_donors + 1):
+            for approved in range(size + 1):
+                statuses = [('approved', 'conditionally-approved')[i % 2] for i in range(approved)]
+                statuses += [('cancelled', 'failed')[i % 2] for i in range(size - approved)]
+                rows.extend((group, status, week_key) for status in statuses)
+                group += 1
+        rows.extend((group, status, week_key) for status in ('pending', ''))
+        group += 1
+    return pd.DataFrame(rows, columns=['group', 'status_agency', 'week_key'])
+
+
+def synthetic_donors(donors, seed=0):
+    """Donor rows of a synthetic export read through read_export."""
+    from synthetic_export import generate_export
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        path = os.path.join(work_dir, 'synthetic.csv')
+        generate_export(path, fundraisers=max(donors // 30, 1), weeks=5, donors=donors, seed=seed)
+        df = read_export(path)
+    frame = pd.DataFrame({
+        'Age': df['Age'].astype(float).to_numpy(),
+        'Interval': df['Interval'].astype(str).to_numpy(dtype=object),
+        'Amount Yearly': df['Amount Yearly'].astype(float).to_numpy(),
+        'status_agency': df['status_agency'].astype(str).to_numpy(dtype=object),
+        'week_key': df['week_key'].to_numpy(),
+    })
+    # One group per fundraiser-week, as the reports and payouts use
+    frame['group'] = df.groupby(['week_key', 'Fundraiser Name'], observed=True).ngroup().to_numpy()
+    return frame
+
+
+# Comparison
+
+def _point_cells(rules, donors):
+    """Rule cell label of each donor: rule set, age band, interval, amount tier."""
+    labels = []
+    cache = {}
+    for age, interval, amount, week_key in zip(donors['Age'], donors['Interval'], donors['Amount Yearly'],
+                                                donors['week_key']):
+        rule_set = _reference_set(rules, week_key)
+        points = rule_set.data['points']
+        if rule_set.id not in cache:
+            age_edges = sorted({row['below_age'] for row in points.get('flat_by_age', [])} |
+                               {row['min_age'] for row in points.get('age_bonus', [])})
+            amount_edges = sorted(row['min_amount'] for row in points['table'])
+            cache[rule_set.id] = (age_edges, amount_edges)
+        age_edges, amount_edges = cache[rule_set.id]
+        age = 0 if age != age else math.floor(age)
+        amount = 0 if amount != amount else amount
+        band = sum(age >= edge for edge in age_edges)
+        low = age_edges[band - 1] if band else 0
+        age_label = f"age {low}+" if band == len(age_edges) else f"age {low}-{age_edges[band] - 1}"
+        tier = sum(amount >= edge for edge in amount_edges) - 1
+        amount_label = (f"amount {amount_edges[tier]}+" if tier == len(amount_edges) - 1
+                        else f"amount {amount_edges[tier]}-{amount_edges[tier + 1]}")
+        labels.append((rule_set.id, age_label, _reference_interval(rules, interval), amount_label))
+    return labels
+
+
+def _eligibility_cells(rules, donors):
+    """Cell of each group: rule set and approval rate against the threshold."""
+    cells = []
+    for _, group in _groups(donors):
+        week_key = int(group['week_key'].iloc[0])
+        rule_set = _reference_set(rules, week_key)
+        flags = [reference_status(rules, status, week_key) for status in group['status_agency']]
+        counted = sum(flag[0] for flag in flags)
+        approved = sum(flag[1] for flag in flags)
+        threshold = rule_set.data['eligibility']['min_approval_rate']
+        if not counted:
+            cell = "no counted donors"
+        elif approved / counted < threshold:
+            cell = "below threshold"
+        elif approved / counted == threshold:
+            cell = "at threshold"
+        else:
+            cell = "above threshold"
+        cells.append((rule_set.id, cell))
+    return cells
+
+
+def _compare(engines, rules, frame, cells, describe, reference='reference'):
+    """Run every engine on frame, time it and count mismatches per cell against the reference."""
+    results = {}
+    outputs = {}
+    for name, engine in engines.items():
+        start = time.perf_counter()
+        outputs[name] = np.asarray(engine(rules, frame))
+        seconds = time.perf_counter() - start
+        results[name] = {'seconds': round(seconds, 4),
+                         'items_per_second': round(len(outputs[name]) / seconds) if seconds else None}
+
+    expected = outputs[reference]
+    cell_rows = {}
+    for name, values in outputs.items():
+        if name == reference:
+            continue
+        differs = values != expected
+        if differs.ndim > 1:
+            differs = differs.any(axis=1)
+        results[name]['mismatches'] = int(differs.sum())
+        for position in np.flatnonzero(differs):
+            cell = cell_rows.setdefault(cells[position], {'cell': list(cells[position]), 'mismatches': {}, 'examples': []})
+            cell['mismatches'][name] = cell['mismatches'].get(name, 0) + 1
+            if len(cell['examples']) < EXAMPLES:
+                cell['examples'].append(dict(describe(position), engine=name,
+                                             expected=_plain(expected[position]), got=_plain(values[position])))
+
+    counts = pd.Series([str(cell) for cell in cells]).value_counts()
+    mismatching = sorted(cell_rows.values(), key=lambda cell: -sum(cell['mismatches'].values()))
+    for cell in mismatching:
+        cell['items'] = int(counts[str(tuple(cell['cell']))])
+    return {'items': len(expected), 'cells': len(counts), 'engines': results, 'mismatching_cells': mismatching}
+
+
+def _plain(value):
+    if isinstance(value, np.ndarray):
+        return [_plain(item) for item in value]
+    return value.item() if isinstance(value, np.generic) else value
+
+
+def _row(frame, columns):
+    def describe(position):
+        return {column: _plain(frame[column].iloc[position]) for column in columns}
+    return describe
+
+
+def check_points(rules, donors):
+    """Point implementations compared per (rule set, age band, interval, amount tier) cell."""
+    return _compare(POINT_ENGINES, rules, donors, _point_cells(rules, donors),
+                    _row(donors, ['Age', 'Interval', 'Amount Yearly', 'week_key']))
+
+
+def check_statuses(rules, statuses):
+    """Status classifications (counted, approved, excluded) compared per raw status."""
+    cells = [(str(status),) for status in statuses['status_agency']]
+    return _compare(STATUS_ENGINES, rules, statuses, cells, _row(statuses, ['status_agency', 'week_key']))
+
+
+def check_eligibility(rules, donors):
+    """70% rule implementations compared per (rule set, approval rate vs threshold) cell."""
+    groups = donors.groupby('group', sort=True)
+    first = groups.head(1).set_index('group').sort_index()
+    summary = pd.DataFrame({'group': first.index, 'week_key': first['week_key'].to_numpy(),
+                            'donors': groups.size().to_numpy(),
+                            'statuses': groups['status_agency'].agg(lambda s: ', '.join(sorted(set(s)))).to_numpy()})
+    return _compare(ELIGIBILITY_ENGINES, rules, donors, _eligibility_cells(rules, donors),
+                    _row(summary, ['group', 'week_key', 'donors', 'statuses']))
+
+
+def run_checks(rules=None, donors=100_000, seed=0):
+    """
+    Compare all implementations on a synthetic export plus the edge-case grids.
+
+    Args:
+        rules: CompiledRules (default: the bundled rules.json)
+        donors: Approximate donor rows of the synthetic export
+        seed: Seed of the synthetic export
+
+    Returns:
+        Dictionary with 'points', 'statuses' and 'eligibility' results
+        (items, cells, per-engine seconds and mismatches, mismatching cells
+        with examples) and 'mismatches' (total over all checks)
+    """
+    rules = rules or load_rules()
+    synthetic = synthetic_donors(donors, seed) if donors else None
+    point_donors = point_grid(rules)
+    groups = eligibility_grid(rules)
+    if synthetic is not None:
+        point_donors = pd.concat([point_donors, synthetic[point_donors.columns]], ignore_index=True)
+        groups = pd.concat([groups, synthetic[groups.columns].assign(group=synthetic['group'] + groups['group'].max() + 1)],
+                           ignore_index=True)
+    statuses = status_grid(rules, groups['status_agency'].unique())
+
+    results = {
+        'rules_version': rules.version,
+        'points': check_points(rules, point_donors),
+        'statuses': check_statuses(rules, statuses),
+        'eligibility': check_eligibility(rules, groups),
+    }
+    results['mismatches'] = sum(engine.get('mismatches', 0) for check in ('points', 'statuses', 'eligibility')
+                                for engine in results[check]['engines'].values())
+    return results
+
+
+def format_checks(results, limit=10):
+    """Readable summary lines of a run_checks result."""
+    lines = []
+    for check in ('points', 'statuses', 'eligibility'):
+        result = results[check]
+        lines.append(f"{check}: {result['items']:,} items in {result['cells']} rule cells")
+        for name, engine in result['engines'].items():
+            line = f"  {name:<28} {engine['seconds']:>8.3f} s"
+            if engine['items_per_second']:
+                line += f"  {engine['items_per_second']:>12,}/s"
+            if 'mismatches' in engine:
+                line += f"  {engine['mismatches']} mismatches" if engine['mismatches'] else "  matches reference"
+            lines.append(line)
+        for cell in result['mismatching_cells'][:limit]:
+            counts = ", ".join(f"{name} {count}" for name, count in cell['mismatches'].items())
+            lines.append(f"    ✗ {' | '.join(map(str, cell['cell']))} ({cell['items']} items): {counts}")
+            for example in cell['examples'][:1]:
+                lines.append(f"      e.g. {example}")
+        if len(result['mismatching_cells']) > limit:
+            lines.append(f"    ... and {len(result['mismatching_cells']) - limit} more cells")
+    return lines
+
+
+if __name__ == "__main__":
+    import argparse
+    import json
+    import sys
+
+    parser = argparse.ArgumentParser(description='Compare the point and eligibility implementations')
+    parser.add_argument('--donors', type=int, default=100_000,
+                        help='Approximate donor rows of the synthetic export (default: 100000, 0 for the grids only)')
+    parser.add_argument('--seed', type=int, default=0, help='Seed of the synthetic export (default: 0)')
+    parser.add_argument('--rules', dest='rules_file', help='Rules JSON file (defaults to the bundled rules.json)')
+    parser.add_argument('--output', '-o', help='Write the full results to this JSON file')
+
+    args = parser.parse_args()
+
+    results = run_checks(load_rules(args.rules_file), args.donors, args.seed)
+    print("\n".join(format_checks(results)))
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2, ensure_ascii=False, default=str)
+        print(f"\nWrote {args.output}")
+    if results['mismatches']:
+        print(f"\n{results['mismatches']} mismatches against the reference")
+        sys.exit(1)
@@ -0,0 +1,148 @@
+"""
+Compare two exports: which donors are new, removed or changed status, and
+what that does to points, eligibility and payouts per fundraiser-week.
+
+Both exports go through read_export and are joined on Public RefID. Weekly
+results are computed for each side with the same rules and working days
+(saved assignments, or --default-days), so every difference comes from the
+donor rows.
+
+    python export_diff.py export_june.csv export_july.csv --default-days 5 -o weeks.csv
+"""
+import numpy as np
+
+from csv_formatter import read_export
+from ledger import donor_rows, score, aggregate_weeks, pay_weeks, working_days_lookup
+from rules import load_rules
+from weeks import format_iso_week
+
+# Per fundraiser-week columns compared between the exports
+WEEK_VALUES = ['donors', 'points', 'counted', 'approved', 'eligible', 'payout']
+
+
+def diff_exports(old_file, new_file, rules=None, assignments_file=None, default_days=None):
+    """
+    Donor and fundraiser-week differences between two exports.
+
+    Args:
+        old_file: Earlier export
+        new_file: Later export
+        rules: CompiledRules (default: the bundled rules.json)
+        assignments_file: Saved assignments with the working days
+            (default: the store the GUI saves to)
+        default_days: Working days for fundraisers without saved ones;
+            payouts are not compared for weeks without any
+
+    Returns:
+        Dictionary with
+        'donors': DataFrame of new, removed and changed donors ('change' is
+            'new', 'removed', 'status' or 'moved' for a new week,
+            fundraiser, age, interval or amount) with old and new week,
+            fundraiser, status and the points counted towards the week,
+        'weeks': DataFrame of fundraiser-weeks whose results differ, with
+            '<value>_old', '<value>_new' and '<value>_delta' for WEEK_VALUES,
+        'counts': {'new', 'removed', 'status', 'moved', 'unchanged'}
+    """
+    rules = rules or load_rules()
+    old, new = (score(donor_rows(read_export(path)), rules) for path in (old_file, new_file))
+
+    for donors in (old, new):
+        # Points the donor adds to their week (none when excluded, e.g. cancelled)
+        donors['counted_points'] = np.where(donors['excluded'] > 0, 0, donors['points'])
+    columns = ['refid', 'week_key', 'fundraiser', 'status', 'counted_points', 'row_hash']
+    joined = old[columns].merge(new[columns], on='refid', how='outer', suffixes=('_old', '_new'), indicator=True)
+    both = joined['_merge'] == 'both'
+    status_changed = both & (joined['status_old'] != joined['status_new'])
+    moved = both & ~status_changed & (joined['row_hash_old'] != joined['row_hash_new'])
+    change = np.select([joined['_merge'] == 'right_only', joined['_merge'] == 'left_only', status_changed, moved],
+                       ['new', 'removed', 'status', 'moved'], default='')
+    donors = joined.assign(change=change)[change != ''].drop(columns=['row_hash_old', 'row_hash_new', '_merge'])
+    donors = donors.rename(columns={'counted_points_old': 'points_old', 'counted_points_new': 'points_new'})
+    donors['points_delta'] = donors['points_new'].fillna(0) - donors['points_old'].fillna(0)
+    for column in ('week_key_old', 'week_key_new'):
+        donors[column] = donors[column].astype('Int64')
+    donors = donors[['change', 'refid', 'week_key_old', 'fundraiser_old', 'status_old', 'points_old',
+                     'week_key_new', 'fundraiser_new', 'status_new', 'points_new', 'points_delta']]
+
+    working_days = working_days_lookup(assignments_file, default_days)
+    old_weeks = pay_weeks(aggregate_weeks(old), rules, working_days)
+    new_weeks = pay_weeks(aggregate_weeks(new), rules, working_days)
+    columns = ['week_key', 'fundraiser', 'working_days'] + WEEK_VALUES
+    weeks = old_weeks[columns].merge(new_weeks[columns], on=['week_key', 'fundraiser'], how='outer',
+                                     suffixes=('_old', '_new'), indicator=True)
+    # Both sides use the same working days, so a week is paid on both or neither
+    paid = weeks['working_days_old'].fillna(weeks['working_days_new']).notna()
+    missing = {'old': weeks['_merge'] == 'right_only', 'new': weeks['_merge'] == 'left_only'}
+    differs = np.zeros(len(weeks), dtype=bool)
+    for value in WEEK_VALUES:
+        for side in ('old', 'new'):
+            # A fundraiser-week missing on one side counts as zero there: no
+            # donors, not eligible and, where working days are known, 0 € payout
+            fill = missing[side] & paid if value == 'payout' else missing[side]
+            weeks[f'{value}_{side}'] = weeks[f'{value}_{side}'].mask(fill, 0)
+        before, after = weeks[f'{value}_old'], weeks[f'{value}_new']
+        weeks[f'{value}_delta'] = after - before
+        differs |= ~np.isclose(before, after, equal_nan=True)
+    weeks = weeks[differs].drop(columns=['working_days_old', 'working_days_new', '_merge']).reset_index(drop=True)
+
+    counts = {kind: int((change == kind).sum()) for kind in ('new', 'removed', 'status', 'moved')}
+    counts['unchanged'] = int(both.sum()) - counts['status'] - counts['moved']
+    return {'donors': donors.reset_index(drop=True), 'weeks': weeks, 'counts': counts}
+
+
+def format_diff(result, limit=20):
+    """Readable summary lines of a diff_exports result."""
+    counts = result['counts']
+    lines = [f"Donors: {counts['new']} new, {counts['removed']} removed, {counts['status']} status changed, "
+             f"{counts['moved']} otherwise changed, {counts['unchanged']} unchanged"]
+
+    transitions = result['donors'][result['donors']['change'] == 'status'] \
+        .groupby(['status_old', 'status_new']).size().sort_values(ascending=False)
+    for (before, after), count in transitions.head(limit).items():
+        lines.append(f"  {before} → {after}: {count}")
+
+    weeks = result['weeks']
+    if weeks.empty:
+        lines.append("No fundraiser-week results changed")
+        return lines
+    lines.append(f"\nFundraiser-weeks with changed results: {len(weeks)} "
+                 f"(points {weeks['points_delta'].sum():+g}, payout {np.nansum(weeks['payout_delta']):+.2f} €)")
+    for row in weeks.reindex(weeks['payout_delta'].abs().sort_values(ascending=False).index).head(limit).itertuples():
+        eligibility = ""
+        if row.eligible_old != row.eligible_new:
+            eligibility = ", no longer eligible" if row.eligible_old == 1 else ", now eligible"
+        payout = "" if np.isnan(row.payout_delta) else f", payout {row.payout_delta:+.2f} €"
+        lines.append(f"  {format_iso_week(row.week_key)} {row.fundraiser}: points {row.points_delta:+g}"
+                     f"{eligibility}{payout}")
+    if len(weeks) > limit:
+        lines.append(f"  ... and {len(weeks) - limit} more")
+    return lines
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Compare two exports by Public RefID')
+    parser.add_argument('old_file', help='Earlier export CSV')
+    parser.add_argument('new_file', help='Later export CSV')
+    parser.add_argument('--rules', dest='rules_file',
+                        help='Rules JSON file (defaults to the bundled rules.json)')
+    parser.add_argument('--assignments', dest='assignments_file',
+                        help='Saved assignments file (defaults to the one the GUI saves to)')
+    parser.add_argument('--default-days', type=float,
+                        help='Working days for fundraisers without saved ones (default: payouts not compared)')
+    parser.add_argument('--output', '-o', help='Write the changed fundraiser-weeks to this CSV')
+    parser.add_argument('--donors', help='Write the new, removed and changed donors to this CSV')
+
+    args = parser.parse_args()
+
+    result = diff_exports(args.old_file, args.new_file, load_rules(args.rules_file), args.assignments_file,
+                          args.default_days)
+    print("\n".join(format_diff(result)))
+    if args.output:
+        weeks = result['weeks'].assign(week=lambda frame: frame['week_key'].map(format_iso_week))
+        weeks.to_csv(args.output, sep=';', index=False, encoding='utf-8-sig')
+        print(f"\nWrote {len(weeks)} fundraiser-weeks to {args.output}")
+    if args.donors:
+        result['donors'].to_csv(args.donors, sep=';', index=False, encoding='utf-8-sig')
+        print(f"Wrote {len(result['donors'])} donors to {args.donors}")
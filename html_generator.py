@@ -1,9 +1,17 @@
+import logging
 import pandas as pd
 import os
 from datetime import datetime
 import re
+from rules import load_rules
+from progress import Progress
+from instrument import instrumented, count
+from weeks import parse_week_keys, resolve_week_keys, iso_month, MONTH_NAMES
 
-def generate_html_for_fundraiser(fundraiser_data, template_path, output_dir):
+logger = logging.getLogger(__name__)
+
+@instrumented('html_document')
+def generate_html_for_fundraiser(fundraiser_data, template_path, output_dir, rules=None):
     """
     Generate HTML file for a specific fundraiser using the template.
 
@@ -11,7 +19,11 @@ def generate_html_for_fundraiser(fundraiser_data, template_path, output_dir):
         fundraiser_data: DataFrame containing data for one fundraiser
         template_path: Path to the HTML template file
         output_dir: Directory to save the generated HTML files
+        rules: CompiledRules used for eligibility (defaults to rules.json)
     """
+    if rules is None:
+        rules = load_rules()
+
     # Read the template
     with open(template_path, 'r', encoding='utf-8') as f:
         template_content = f.read()
@@ -23,42 +35,19 @@ def generate_html_for_fundraiser(fundraiser_data, template_path, output_dir):
         fundraiser_id = fundraiser_id.replace('.0', '').zfill(5)
     fundraiser_name = fundraiser_data['Fundraiser Name'].iloc[0]
 
-    # Determine month and year from calendar weeks
-    calendar_weeks = fundraiser_data['Calendar week'].dropna().unique()
-    year = "2025"  # Default year based on data
-
-    # Extract month from calendar weeks (approximation)
-    month_mapping = {
-        range(1, 5): "Januar",
-        range(5, 9): "Februar",
-        range(9, 14): "März",
-        range(14, 18): "April",
-        range(18, 23): "Mai",
-        range(23, 27): "Juni",
-        range(27, 31): "Juli",
-        range(31, 35): "August",
-        range(35, 40): "September",
-        range(40, 44): "Oktober",
-        range(44, 48): "November",
-        range(48, 53): "Dezember"
-    }
-
-    # Get first week number to determine month
-    first_week = None
-    for week in calendar_weeks:
-        if '/' in str(week):
-            week_num = int(str(week).split('/')[0])
-        else:
-            week_num = int(re.findall(r'\d+', str(week))[0])
-        if first_week is None or week_num < first_week:
-            first_week = week_num
-
-    month = "Mai"  # Default
-    if first_week:
-        for week_range, month_name in month_mapping.items():
-            if first_week in week_range:
-                month = month_name
-                break
+    # (year, week) keys are parsed once for the whole file by generate_all_html_files
+    if 'week_key' not in fundraiser_data.columns:
+        fundraiser_data = fundraiser_data.assign(week_key=parse_week_keys(fundraiser_data['Calendar week']))
+    donor_weeks = fundraiser_data['week_key'][fundraiser_data['week_key'] > 0]
+
+    # Month and year of the first week, by the ISO calendar (a week belongs
+    # to the month containing its Thursday)
+    if not donor_weeks.empty:
+        first_year, first_month = iso_month(donor_weeks.min())
+    else:
+        first_year, first_month = datetime.now().year, datetime.now().month
+    year = str(first_year)
+    month = MONTH_NAMES[first_month - 1]
 
     # Fill in the basic info fields
     template_content = template_content.replace('placeholder="Charlotte Lui"', f'value="{fundraiser_name}"')
@@ -68,15 +57,19 @@ def generate_html_for_fundraiser(fundraiser_data, template_path, output_dir):
 
     # Group data by calendar week, separating regular data from payment info
     weeks_data = {}
+    week_rule_sets = {}
     payment_info = []
     tl_bonus_info = []
 
+    # Donor rows by (year, week) in calendar order, labelled as in the export
+    for week_key, week_data in fundraiser_data[fundraiser_data['week_key'] > 0].groupby('week_key', sort=True):
+        week = week_data['Calendar week'].iloc[0]
+        weeks_data[week] = [row for _, row in week_data.iterrows() if pd.notna(row['Public RefID'])]
+        week_rule_sets[week] = rules.for_week(week_key)
+
     for _, row in fundraiser_data.iterrows():
-        if pd.notna(row['Calendar week']) and pd.notna(row['Public RefID']):
-            week = row['Calendar week']
-            if week not in weeks_data:
-                weeks_data[week] = []
-            weeks_data[week].append(row)
+        if row['week_key'] > 0:
+            continue
         elif pd.notna(row['Public RefID']) and str(row['Public RefID']).startswith('Payout'):
             # This is payment information
             payment_info.append(row)
@@ -92,10 +85,13 @@ def generate_html_for_fundraiser(fundraiser_data, template_path, output_dir):
     week_index = 0
 
     for week, week_rows in weeks_data.items():
+        week_rules = week_rule_sets[week]
+        counted, approved, excluded = week_rules.status_masks([row['status_agency'] for row in week_rows])
+
         # Calculate total points for this week (excluding cancelled)
         total_points = 0
-        for row in week_rows:
-            if row['status_agency'] != 'cancelled':
+        for row, is_excluded in zip(week_rows, excluded):
+            if not is_excluded:
                 try:
                     points_val = float(str(row['points']).replace(',', '.'))
                     total_points += points_val
@@ -103,9 +99,7 @@ def generate_html_for_fundraiser(fundraiser_data, template_path, output_dir):
                     continue
 
         # Determine bonus status
-        approved_count = sum(1 for row in week_rows if row['status_agency'] in ['approved', 'conditionally-approved'])
-        total_count = len([row for row in week_rows if row['status_agency'] in ['approved', 'conditionally-approved', 'cancelled']])
-        bonus_eligible = "ja" if total_count > 0 and (approved_count / total_count) >= 0.7 else "nein"
+        bonus_eligible = "ja" if week_rules.eligible(counted.sum(), approved.sum()) else "nein"
 
         # Generate rows HTML for this week
         rows_html = ""
@@ -310,7 +304,8 @@ def generate_html_for_fundraiser(fundraiser_data, template_path, output_dir):
             }
         </style>
     '''
-    new_content = new_content.replace('</head>', readonly_css + '</head>')
+    rules_meta = f'    <meta name="rules-version" content="{rules.version}">\n'
+    new_content = new_content.replace('</head>', rules_meta + readonly_css + '</head>')
 
     # Create output filename (Windows-safe)
     safe_name = re.sub(r'[^\w\s-]', '', fundraiser_name).strip()
@@ -326,7 +321,8 @@ def generate_html_for_fundraiser(fundraiser_data, template_path, output_dir):
 
     return output_path
 
-def generate_all_html_files(csv_file_path, template_path, output_dir=None):
+def generate_all_html_files(csv_file_path, template_path, output_dir=None, rules=None, week_keys=None,
+                            progress=None):
     """
     Generate HTML files for all fundraisers from formatted CSV.
 
@@ -334,10 +330,18 @@ def generate_all_html_files(csv_file_path, template_path, output_dir=None):
         csv_file_path: Path to the formatted CSV file
         template_path: Path to the HTML template
         output_dir: Directory to save HTML files (defaults to html_output next to CSV file)
+        rules: CompiledRules used for eligibility (defaults to rules.json)
+        week_keys: {Calendar week: week key} resolved from the export (optional)
+        progress: Optional progress.Progress, advanced once per fundraiser
 
     Returns:
         List of generated HTML file paths
     """
+    if rules is None:
+        rules = load_rules()
+    progress = progress or Progress()
+    progress.plan(['render'])
+
     # If no output directory specified, create one next to the CSV file
     if output_dir is None:
         csv_dir = os.path.dirname(os.path.abspath(csv_file_path))
@@ -357,8 +361,13 @@ def generate_all_html_files(csv_file_path, template_path, output_dir=None):
     df = df[df['Public RefID'] != '']
     df = df[~df['Public RefID'].astype(str).str.contains('Total:', na=False)]
 
+    # Parse calendar weeks once for the whole file; summary rows get key 0
+    df['week_key'] = resolve_week_keys(df['Calendar week'], week_keys)
+
     # Get unique fundraisers
     fundraisers = df.groupby(['Fundraiser ID', 'Fundraiser Name'])
+    progress.start('render', len(fundraisers))
+    count(rows=len(df))
 
     generated_files = []
 
@@ -368,13 +377,17 @@ def generate_all_html_files(csv_file_path, template_path, output_dir=None):
                 output_path = generate_html_for_fundraiser(
                     fundraiser_data,
                     template_path,
-                    output_dir
+                    output_dir,
+                    rules=rules
                 )
                 generated_files.append(output_path)
-                print(f"Generated HTML for {fundraiser_name} ({fundraiser_id}): {output_path}")
+                logger.debug("Generated HTML for %s (%s): %s", fundraiser_name, fundraiser_id, output_path)
             except Exception as e:
-                print(f"Error generating HTML for {fundraiser_name}: {e}")
+                logger.error("Error generating HTML for %s: %s", fundraiser_name, e, exc_info=True)
+        progress.advance()
 
+    logger.info("Generated %d HTML files in %s", len(generated_files), output_dir)
+    count(reports=len(generated_files))
     return generated_files
 
 if __name__ == "__main__":
@@ -0,0 +1,289 @@
+"""
+Stage timing and memory instrumentation with a JSON run report.
+
+format_csv, pipeline.process_export and the report generators announce
+their stages through progress.Progress. While a RunReport is active, each
+of those stages is also measured: wall and CPU time, the process's peak
+RSS and, with trace_memory, the peak of Python allocations within the stage
+(tracemalloc, which slows allocation-heavy code). Code can record counts
+with count() and time parts of a stage with stage() or the instrumented()
+decorator; those parts are summed over calls under their stage. With
+profile, the hot stages also run under cProfile.
+
+    with RunReport(profile=True) as report:
+        format_csv('export.csv', 'out.csv')
+    report.write(report_path('out.csv'))
+
+Without an active report, stage(), count() and instrumented functions do
+nothing beyond one context variable lookup.
+"""
+import contextlib
+import contextvars
+import functools
+import json
+import os
+import sys
+import time
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# Stages run under cProfile with profile=True: where a run spends its time
+PROFILE_STAGES = ('payouts', 'csv', 'render')
+
+# Functions listed per profiled stage in the report
+PROFILE_TOP = 15
+
+_active = contextvars.ContextVar('run_report', default=None)
+
+
+def peak_rss_mb():
+    """Peak resident memory of the process so far in MB (None where unavailable)."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+
+def report_path(output_file):
+    """Run report path next to an output file: out.csv -> out_run.json."""
+    return os.path.splitext(output_file)[0] + '_run.json'
+
+
+class RunReport:
+    """
+    Measurements of one run's stages.
+
+    Stages follow each other: starting one ends the previous one, as with
+    Progress.start. stage() inside a running stage records a part of it
+    instead, keyed 'stage/part' and summed over calls.
+    """
+
+    def __init__(self, trace_memory=False, profile=False, profile_stages=PROFILE_STAGES):
+        """
+        Args:
+            trace_memory: Record the peak of Python allocations per stage (tracemalloc)
+            profile: Run profile_stages under cProfile
+            profile_stages: Stage names to profile
+        """
+        self.trace_memory = trace_memory
+        self.profile = profile
+        self.profile_stages = tuple(profile_stages)
+        self.stages = []
+        self.counts = {}
+        self.created = None
+        self.wall_s = None
+        self.cpu_s = None
+        self._current = None
+        self._parts = []
+        self._profilers = {}
+        self._started = None
+        self._token = None
+        self._own_tracing = False
+
+    def __enter__(self):
+        self._token = _active.set(self)
+        if self.trace_memory:
+            import tracemalloc
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                self._own_tracing = True
+        self.created = time.strftime('%Y-%m-%dT%H:%M:%S')
+        self._started = (time.perf_counter(), time.process_time())
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        self.end()
+        self.wall_s = round(time.perf_counter() - self._started[0], 4)
+        self.cpu_s = round(time.process_time() - self._started[1], 4)
+        if self._own_tracing:
+            import tracemalloc
+            tracemalloc.stop()
+            self._own_tracing = False
+        _active.reset(self._token)
+        return False
+
+    def begin(self, name):
+        """End the current stage and start the next one."""
+        self.end()
+        if self.trace_memory:
+            import tracemalloc
+            tracemalloc.reset_peak()
+        self._current = {'stage': name, 'wall': time.perf_counter(), 'cpu': time.process_time(),
+                         'counts': {}, 'parts': {}}
+        if self.profile and name in self.profile_stages:
+            import cProfile
+            # One profiler per stage name, so a stage that runs twice accumulates
+            self._profilers.setdefault(name, cProfile.Profile()).enable()
+
+    def end(self):
+        """End the current stage, if any."""
+        current, self._current = self._current, None
+        if current is None:
+            return
+        profiler = self._profilers.get(current['stage'])
+        if profiler is not None:
+            profiler.disable()
+        record = {
+            'stage': current['stage'],
+            'wall_s': round(time.perf_counter() - current['wall'], 4),
+            'cpu_s': round(time.process_time() - current['cpu'], 4),
+            'peak_rss_mb': peak_rss_mb(),
+        }
+        if self.trace_memory:
+            import tracemalloc
+            record['peak_traced_mb'] = round(tracemalloc.get_traced_memory()[1] / 1024 / 1024, 1)
+        record.update(current['counts'])
+        if current['parts']:
+            record['parts'] = {name: {key: round(value, 4) if isinstance(value, float) else value
+                                      for key, value in part.items()}
+                               for name, part in current['parts'].items()}
+        self.stages.append(record)
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        """Measure a block as a stage, or as a part of the running stage."""
+        if self._current is None:
+            self.begin(name)
+            try:
+                yield
+            finally:
+                self.end()
+            return
+
+        current = self._current
+        self._parts.append(name)
+        key = '/'.join(self._parts)
+        wall, cpu = time.perf_counter(), time.process_time()
+        try:
+            yield
+        finally:
+            self._parts.pop()
+            part = current['parts'].setdefault(key, {'calls': 0, 'wall_s': 0.0, 'cpu_s': 0.0})
+            part['calls'] += 1
+            part['wall_s'] += time.perf_counter() - wall
+            part['cpu_s'] += time.process_time() - cpu
+
+    def count(self, **counts):
+        """Record counts (rows, fundraisers, ...) for the running stage, or the run."""
+        (self._current['counts'] if self._current is not None else self.counts).update(counts)
+
+    def profile_top(self, name, limit=PROFILE_TOP):
+        """The functions of a profiled stage with the most cumulative time."""
+        import pstats
+
+        stats = pstats.Stats(self._profilers[name])
+        entries = sorted(stats.stats.items(), key=lambda item: item[1][3], reverse=True)[:limit]
+        return [{
+            'function': f"{function} ({os.path.basename(filename)}:{line})",
+            'calls': calls,
+            'own_s': round(own, 4),
+            'cumulative_s': round(cumulative, 4),
+        } for (filename, line, function), (_, calls, own, cumulative, _) in entries]
+
+    def to_dict(self):
+        return {
+            'created': self.created,
+            'wall_s': self.wall_s,
+            'cpu_s': self.cpu_s,
+            'peak_rss_mb': peak_rss_mb(),
+            'counts': self.counts,
+            'stages': self.stages,
+        }
+
+    def write(self, path):
+        """
+        Write the report as JSON, and each profiled stage's cProfile stats
+        next to it (<report>_<stage>.prof, readable with pstats or snakeviz).
+
+        Returns:
+            List of the written file paths, the report first
+        """
+        report = self.to_dict()
+        written = [path]
+        if self._profilers:
+            report['profiles'] = {}
+            base = os.path.splitext(path)[0]
+            for name, profiler in self._profilers.items():
+                profile_file = f"{base}_{name}.prof"
+                profiler.dump_stats(profile_file)
+                written.append(profile_file)
+                report['profiles'][name] = {'file': os.path.basename(profile_file), 'top': self.profile_top(name)}
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        return written
+
+
+def active_report():
+    """The RunReport active in this context, or None."""
+    return _active.get()
+
+
+def begin_stage(name):
+    """Start a stage of the active report (called by Progress.start)."""
+    report = _active.get()
+    if report is not None:
+        report.begin(name)
+
+
+def end_stage():
+    """End the active report's current stage (called by Progress.finish)."""
+    report = _active.get()
+    if report is not None:
+        report.end()
+
+
+def stage(name):
+    """Context manager measuring a block in the active report; does nothing without one."""
+    report = _active.get()
+    return report.stage(name) if report is not None else contextlib.nullcontext()
+
+
+def count(**counts):
+    """Record counts in the active report, if any."""
+    report = _active.get()
+    if report is not None:
+        report.count(**counts)
+
+
+def instrumented(name=None):
+    """Decorator measuring each call of a function as stage(name or the function's name)."""
+    def decorate(function):
+        label = name or function.__name__
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            report = _active.get()
+            if report is None:
+                return function(*args, **kwargs)
+            with report.stage(label):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def add_report_arguments(parser):
+    """Add the run report options to an argparse parser."""
+    parser.add_argument('--profile', action='store_true',
+                        help=f"Also write cProfile stats of the {', '.join(PROFILE_STAGES)} stages "
+                             f"next to the run report")
+    parser.add_argument('--trace-memory', action='store_true',
+                        help='Record the peak Python allocations per stage in the run report (slower)')
+
+
+def format_report(report):
+    """Summary lines of a RunReport."""
+    lines = []
+    for record in report.stages:
+        counts = ", ".join(f"{key} {value:,}" for key, value in record.items()
+                           if key not in ('stage', 'wall_s', 'cpu_s', 'peak_rss_mb', 'peak_traced_mb', 'parts'))
+        line = f"  {record['stage']:<12} {record['wall_s']:>8.3f} s wall {record['cpu_s']:>8.3f} s CPU"
+        if record['peak_rss_mb'] is not None:
+            line += f"  peak RSS {record['peak_rss_mb']:.0f} MB"
+        if 'peak_traced_mb' in record:
+            line += f"  traced {record['peak_traced_mb']:.1f} MB"
+        lines.append(line + (f"  ({counts})" if counts else ""))
+    return lines
@@ -0,0 +1,178 @@
+"""
+Queue of processing jobs for the GUI, run in worker processes.
+
+Several exports (one per campaign or region) can be dropped at once. Each
+becomes a Job; JobQueue starts a WorkerProcess for the next queued job
+whenever fewer than `limit` are running, and turns the workers' messages
+into job state the GUI shows as one status row per file.
+"""
+import os
+
+from worker import WorkerProcess, MSG_PROGRESS, MSG_TL_REQUEST, MSG_RESULT, MSG_ERROR, MSG_CANCELLED
+
+QUEUED = 'queued'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+CANCELLED = 'cancelled'
+
+
+def default_job_limit():
+    """Jobs to run at once: report rendering is CPU-bound, so half the cores, 1-3."""
+    return max(1, min(3, (os.cpu_count() or 2) // 2))
+
+
+class Job:
+    """One export to process and its current state."""
+
+    def __init__(self, job_id, config, tag=None):
+        self.id = job_id
+        self.config = config    # pipeline.PipelineConfig
+        self.tag = tag          # caller's data, e.g. the watch folder's content hash
+        self.state = QUEUED
+        self.update = None      # last progress.Progress update
+        self.result = None      # process_export result once DONE
+        self.error = None       # error message once FAILED
+        self.worker = None
+
+    @property
+    def name(self):
+        input_file = self.config.input_file
+        if isinstance(input_file, str):
+            return os.path.basename(input_file)
+        # Several exports merged into one run
+        return os.path.basename(input_file[0]) + (f" + {len(input_file) - 1} more" if len(input_file) > 1 else "")
+
+    def fraction(self):
+        """Share of this job that is done, 0-1."""
+        if self.state in (DONE, FAILED, CANCELLED):
+            return 1.0
+        return self.update['fraction'] if self.update else 0.0
+
+    def finished(self):
+        return self.state in (DONE, FAILED, CANCELLED)
+
+
+class JobQueue:
+    """
+    Jobs processed in WorkerProcesses, at most `limit` at a time.
+
+    The GUI calls poll() from its main loop; it starts queued jobs and
+    returns the worker messages as (job, message, payload) tuples. Rules are
+    loaded once by the caller and sent to every worker.
+    """
+
+    def __init__(self, limit=None, rules=None, worker_factory=WorkerProcess):
+        """
+        Args:
+            limit: Jobs running at once (default: default_job_limit())
+            rules: Optional CompiledRules shared by all jobs
+            worker_factory: Callable creating a worker (for tests)
+        """
+        self.limit = limit or default_job_limit()
+        self.rules = rules
+        self.worker_factory = worker_factory
+        self.jobs = []
+
+    def add(self, input_file, output_file, pdf_output_dir=None, tag=None):
+        """Queue a job; it starts on a later poll() once a slot is free."""
+        # Imported here: pipeline pulls in pandas, which the GUI loads in the background
+        from pipeline import PipelineConfig
+        config = PipelineConfig(input_file, output_file, pdf_output_dir, rules=self.rules)
+        job = Job(len(self.jobs), config, tag)
+        self.jobs.append(job)
+        return job
+
+    def running(self):
+        return [job for job in self.jobs if job.state == RUNNING]
+
+    def active(self):
+        """Whether any job is queued or running."""
+        return any(not job.finished() for job in self.jobs)
+
+    def fraction(self):
+        """Share of the whole queue that is done, 0-1."""
+        return sum(job.fraction() for job in self.jobs) / len(self.jobs) if self.jobs else 1.0
+
+    def poll(self):
+        """Start queued jobs up to the limit and collect worker messages (non-blocking)."""
+        self._start_queued()
+        events = []
+        for job in self.running():
+            for message, payload in job.worker.poll():
+                if message == MSG_PROGRESS:
+                    job.update = payload
+                elif message == MSG_RESULT:
+                    job.state, job.result = DONE, payload
+                elif message == MSG_ERROR:
+                    job.state, job.error = FAILED, payload
+                elif message == MSG_CANCELLED:
+                    job.state = CANCELLED
+                elif message != MSG_TL_REQUEST:
+                    continue
+                events.append((job, message, payload))
+            if job.finished():
+                job.worker = None
+        # Slots freed by finished jobs go to the next queued ones right away
+        self._start_queued()
+        return events
+
+    def send_selection(self, job, selection):
+        """Answer a job's 'tl_request'."""
+        if job.worker is not None:
+            job.worker.send_selection(selection)
+
+    def cancel(self, job=None):
+        """Cancel one job, or all unfinished ones; queued jobs are cancelled at once."""
+        for target in [job] if job is not None else self.jobs:
+            if target.state == QUEUED:
+                target.state = CANCELLED
+            elif target.state == RUNNING:
+                target.worker.cancel()
+
+    def cancelling(self, job):
+        return job.worker is not None and job.worker.cancel_deadline is not None
+
+    def summary(self):
+        """
+        Combined outcome of all jobs.
+
+        Returns:
+            Dictionary with 'done', 'failed' and 'cancelled' job lists,
+            'rows' and 'pdf_files' totals over the jobs that finished
+        """
+        done = [job for job in self.jobs if job.state == DONE]
+        return {
+            'done': done,
+            'failed': [job for job in self.jobs if job.state == FAILED],
+            'cancelled': [job for job in self.jobs if job.state == CANCELLED],
+            'rows': sum(job.result['rows'] for job in done),
+            'pdf_files': sum(len(job.result['pdf_files']) for job in done),
+        }
+
+    def _start_queued(self):
+        free = self.limit - len(self.running())
+        for job in self.jobs:
+            if free <= 0:
+                break
+            if job.state == QUEUED:
+                job.worker = self.worker_factory(job.config)
+                job.worker.start()
+                job.state = RUNNING
+                free -= 1
+
+
+def format_summary(summary):
+    """Message text for a JobQueue.summary()."""
+    lines = [f"Files processed: {len(summary['done'])}"]
+    for job in summary['done']:
+        lines.append(f"  ✓ {job.name}: {job.result['rows']} rows, {len(job.result['pdf_files'])} PDFs")
+    if summary['failed']:
+        lines.append(f"\nFailed: {len(summary['failed'])}")
+        lines.extend(f"  ✗ {job.name}: {job.error}" for job in summary['failed'])
+    if summary['cancelled']:
+        lines.append(f"\nCancelled: {len(summary['cancelled'])}")
+        lines.extend(f"  – {job.name}" for job in summary['cancelled'])
+    lines.append(f"\nTotal rows: {summary['rows']}")
+    lines.append(f"Total PDF files: {summary['pdf_files']}")
+    return "\n".join(lines)
@@ -0,0 +1,494 @@
+"""
+SQLite ledger of donor rows and fundraiser-week results across exports.
+
+Monthly exports overlap heavily with the previous month's weeks. Importing
+an export into the ledger stores each donor once by Public RefID; rows
+whose content did not change since an earlier import are skipped, and only
+the fundraiser-weeks touched by new or changed rows (or by changed saved
+working days) are aggregated and paid out again. Monthly, quarterly and
+yearly totals are then plain SQL over the stored weeks.
+
+    donors   one row per Public RefID: week, fundraiser, age, interval,
+             amount, status, points and status flags, plus a hash of the
+             export columns the points depend on
+    weeks    one row per (year, week, fundraiser): points, counted/approved
+             donors, eligibility, working days and payout
+    imports  one row per imported export
+
+Donors missing from a later export are kept: exports cover date ranges, so
+absence does not mean the donor was removed. When the rules change, every
+stored donor is scored again on the next import.
+
+    python ledger.py import export.csv --assignments assignments.json
+    python ledger.py totals --by month
+"""
+import datetime
+import os
+import sqlite3
+
+import numpy as np
+import pandas as pd
+
+from assignments import load_store
+from csv_formatter import read_export, public_refids
+from rules import load_rules, decode_status
+from weeks import format_iso_week, iso_month
+
+LEDGER_VERSION = 1
+
+# Periods totals() can group by, and the weeks column each one uses
+PERIODS = {'week': 'week_key', 'month': 'month', 'quarter': 'quarter', 'year': 'year'}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+CREATE TABLE IF NOT EXISTS donors (
+    refid TEXT PRIMARY KEY,
+    year INTEGER NOT NULL,
+    week INTEGER NOT NULL,
+    week_key INTEGER NOT NULL,
+    calendar_week TEXT,
+    fundraiser TEXT NOT NULL,
+    fundraiser_id TEXT,
+    age REAL,
+    interval TEXT,
+    amount REAL,
+    status TEXT,
+    points REAL,
+    counted INTEGER,
+    approved INTEGER,
+    excluded INTEGER,
+    row_hash INTEGER NOT NULL,
+    import_id INTEGER
+);
+CREATE INDEX IF NOT EXISTS donors_week_fundraiser ON donors (year, week, fundraiser);
+CREATE TABLE IF NOT EXISTS weeks (
+    year INTEGER NOT NULL,
+    week INTEGER NOT NULL,
+    fundraiser TEXT NOT NULL,
+    week_key INTEGER NOT NULL,
+    month INTEGER NOT NULL,
+    quarter INTEGER NOT NULL,
+    donors INTEGER,
+    points REAL,
+    counted INTEGER,
+    approved INTEGER,
+    eligible INTEGER,
+    working_days REAL,
+    daily_average REAL,
+    bracket TEXT,
+    rate REAL,
+    payout REAL,
+    PRIMARY KEY (year, week, fundraiser)
+);
+CREATE INDEX IF NOT EXISTS weeks_month ON weeks (month, fundraiser);
+CREATE INDEX IF NOT EXISTS weeks_quarter ON weeks (quarter, fundraiser);
+CREATE TABLE IF NOT EXISTS imports (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    file TEXT,
+    imported_at TEXT,
+    rows INTEGER,
+    changed INTEGER,
+    weeks INTEGER,
+    rules TEXT
+);
+"""
+
+# Donor columns an import writes, in order
+DONOR_COLUMNS = ['refid', 'year', 'week', 'week_key', 'calendar_week', 'fundraiser', 'fundraiser_id', 'age',
+                 'interval', 'amount', 'status', 'points', 'counted', 'approved', 'excluded', 'row_hash', 'import_id']
+
+WEEK_COLUMNS = ['year', 'week', 'fundraiser', 'week_key', 'month', 'quarter', 'donors', 'points', 'counted',
+                'approved', 'eligible', 'working_days', 'daily_average', 'bracket', 'rate', 'payout']
+
+# Export columns points and statuses depend on; a row is changed when any of them is
+HASHED_COLUMNS = ['week_key', 'calendar_week', 'fundraiser', 'fundraiser_id', 'age', 'interval', 'amount', 'status']
+
+
+def default_ledger_path():
+    """ledger.sqlite next to the saved assignments in the application data directory."""
+    base = os.environ.get('APPDATA') or os.path.join(os.path.expanduser('~'), '.config')
+    return os.path.join(base, 'Realisierungsdatenvisualizer', 'ledger.sqlite')
+
+
+def connect(path=None):
+    """Open (and create if needed) a ledger database."""
+    path = path or default_ledger_path()
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    connection = sqlite3.connect(path)
+    connection.execute("PRAGMA journal_mode=WAL")
+    connection.execute("PRAGMA synchronous=NORMAL")
+    connection.executescript(SCHEMA)
+    version = _meta(connection, 'version')
+    if version is None:
+        _set_meta(connection, 'version', LEDGER_VERSION)
+        connection.commit()
+    elif int(version) != LEDGER_VERSION:
+        raise ValueError(f"Ledger {path} has version {version}, expected {LEDGER_VERSION}")
+    return connection
+
+
+def donor_rows(df):
+    """
+    Ledger donor rows of a read_export frame.
+
+    Rows without a week are dropped; a Public RefID that appears more than
+    once keeps its last row.
+
+    Returns:
+        DataFrame with the export columns of DONOR_COLUMNS and 'row_hash'
+    """
+    df = df[df['week_key'] > 0]
+    rows = pd.DataFrame({
+        'refid': public_refids(df['Public RefID']).to_numpy(),
+        'week_key': df['week_key'].to_numpy(dtype=np.int64),
+        'calendar_week': _text(df['Calendar week']),
+        'fundraiser': _text(df['Fundraiser Name']),
+        'fundraiser_id': _text(df['Fundraiser ID']),
+        'age': df['Age'].astype(float).to_numpy(),
+        'interval': _text(df['Interval']),
+        'amount': _amounts(df['Amount Yearly']),
+        'status': _text(df['status_agency']),
+    })
+    rows = rows.drop_duplicates('refid', keep='last').reset_index(drop=True)
+    rows['year'] = rows['week_key'] // 100
+    rows['week'] = rows['week_key'] % 100
+    # SQLite integers are signed 64-bit
+    rows['row_hash'] = pd.util.hash_pandas_object(rows[HASHED_COLUMNS], index=False).to_numpy().view(np.int64)
+    return rows
+
+
+def score(rows, rules):
+    """Add points and the counted/approved/excluded flags to donor rows."""
+    ages = pd.Series(rows['age'].to_numpy(), dtype=float).astype('Int16')
+    rows['points'] = rules.points(ages, pd.Series(rows['interval'].to_numpy()),
+                                  pd.Series(rows['amount'].to_numpy(), dtype=np.float32), rows['week_key'].to_numpy())
+    counted, approved, excluded = decode_status(rules.status_codes(pd.Series(rows['status'].to_numpy()),
+                                                                   rows['week_key'].to_numpy()))
+    rows['counted'] = counted.astype(int)
+    rows['approved'] = approved.astype(int)
+    rows['excluded'] = excluded.astype(int)
+    return rows
+
+
+def import_export(connection, input_file, rules=None, assignments_file=None, default_days=None, parsed=None):
+    """
+    Add an export to the ledger.
+
+    Args:
+        connection: Ledger connection (see connect)
+        input_file: Agency CSV export
+        rules: CompiledRules (default: the bundled rules.json)
+        assignments_file: Saved assignments with the working days
+            (default: the store the GUI saves to)
+        default_days: Working days for fundraisers without saved ones;
+            their weeks get no payout when None
+        parsed: Optional read_export(input_file) frame
+
+    Returns:
+        Dictionary with 'rows' (donors in the export), 'changed' (new or
+        changed donors written), 'weeks' (fundraiser-weeks recomputed) and
+        'rescored' (whether the rules changed and every donor was scored again)
+    """
+    rules = rules or load_rules()
+    rows = donor_rows(read_export(input_file) if parsed is None else parsed)
+
+    # Stored hash and group of every incoming RefID, joined in SQLite
+    connection.execute("CREATE TEMP TABLE IF NOT EXISTS incoming (refid TEXT PRIMARY KEY)")
+    connection.execute("DELETE FROM incoming")
+    connection.executemany("INSERT INTO incoming VALUES (?)", zip(rows['refid']))
+    stored = pd.read_sql("SELECT d.refid, d.row_hash, d.week_key, d.fundraiser FROM donors d "
+                         "JOIN incoming i ON i.refid = d.refid", connection)
+    connection.execute("DELETE FROM incoming")
+
+    # Joined on both columns so the int64 hashes are compared exactly
+    unchanged = rows[['refid', 'row_hash']].merge(stored[['refid', 'row_hash']], how='left', indicator=True)
+    changed = rows[(unchanged['_merge'] == 'left_only').to_numpy()].copy()
+    moved_from = stored[stored['refid'].isin(changed['refid'])]
+
+    with connection:
+        cursor = connection.execute(
+            "INSERT INTO imports (file, imported_at, rows, changed, weeks, rules) VALUES (?, ?, ?, 0, 0, ?)",
+            (os.path.basename(input_file), datetime.datetime.now().isoformat(timespec='seconds'),
+             len(rows), rules.cache_key))
+        import_id = cursor.lastrowid
+
+        changed['import_id'] = import_id
+        changed = score(changed, rules)
+        connection.executemany(
+            f"INSERT INTO donors ({', '.join(DONOR_COLUMNS)}) VALUES ({', '.join('?' * len(DONOR_COLUMNS))}) "
+            f"ON CONFLICT (refid) DO UPDATE SET "
+            + ", ".join(f"{column} = excluded.{column}" for column in DONOR_COLUMNS[1:]),
+            _records(changed[DONOR_COLUMNS]))
+
+        rescored = _meta(connection, 'rules') not in (None, rules.cache_key)
+        if rescored:
+            _rescore_all(connection, rules)
+            groups = None
+        else:
+            groups = set(zip(changed['week_key'], changed['fundraiser']))
+            groups.update(zip(moved_from['week_key'], moved_from['fundraiser']))
+            groups.update(_working_day_changes(connection, assignments_file, default_days))
+        _set_meta(connection, 'rules', rules.cache_key)
+
+        weeks = recompute_weeks(connection, rules, groups, assignments_file, default_days)
+        connection.execute("UPDATE imports SET changed = ?, weeks = ? WHERE id = ?", (len(changed), weeks, import_id))
+
+    return {'rows': len(rows), 'changed': len(changed), 'weeks': weeks, 'rescored': rescored}
+
+
+def recompute_weeks(connection, rules, groups=None, assignments_file=None, default_days=None):
+    """
+    Aggregate and pay out fundraiser-weeks from the stored donors.
+
+    Args:
+        connection: Ledger connection
+        rules: CompiledRules
+        groups: Iterable of (week key, fundraiser name) to recompute, or
+            None for all
+        assignments_file: Saved assignments with the working days
+        default_days: Working days for fundraisers without saved ones
+
+    Returns:
+        Number of fundraiser-weeks recomputed
+    """
+    query = ("SELECT d.week_key, d.fundraiser, COUNT(*) AS donors, "
+             "SUM(CASE WHEN d.excluded THEN 0 ELSE d.points END) AS points, "
+             "SUM(d.counted) AS counted, SUM(d.approved) AS approved FROM donors d ")
+    if groups is not None:
+        groups = list(groups)
+        if not groups:
+            return 0
+        connection.execute("CREATE TEMP TABLE IF NOT EXISTS affected (week_key INTEGER, fundraiser TEXT)")
+        connection.execute("DELETE FROM affected")
+        connection.executemany("INSERT INTO affected VALUES (?, ?)", ((int(key), name) for key, name in groups))
+        query += "JOIN affected a ON a.week_key = d.week_key AND a.fundraiser = d.fundraiser "
+        # Groups a donor moved out of entirely are removed below
+        connection.execute("DELETE FROM weeks WHERE (week_key, fundraiser) IN (SELECT week_key, fundraiser FROM affected)")
+    else:
+        connection.execute("DELETE FROM weeks")
+    weekly = pd.read_sql(query + "GROUP BY d.week_key, d.fundraiser", connection)
+    if groups is not None:
+        connection.execute("DELETE FROM affected")
+    if weekly.empty:
+        return 0
+
+    week_keys = weekly['week_key'].to_numpy(dtype=np.int64)
+    weekly['year'] = week_keys // 100
+    weekly['week'] = week_keys % 100
+    periods = {key: iso_month(key) for key in np.unique(week_keys)}
+    weekly['month'] = [periods[key][0] * 100 + periods[key][1] for key in week_keys]
+    weekly['quarter'] = [periods[key][0] * 10 + (periods[key][1] - 1) // 3 + 1 for key in week_keys]
+    weekly = pay_weeks(weekly, rules, working_days_lookup(assignments_file, default_days))
+
+    connection.executemany(
+        f"INSERT INTO weeks ({', '.join(WEEK_COLUMNS)}) VALUES ({', '.join('?' * len(WEEK_COLUMNS))})",
+        _records(weekly[WEEK_COLUMNS]))
+    return len(weekly)
+
+
+def aggregate_weeks(donors):
+    """
+    Fundraiser-week totals of scored donor rows (see score), as the weeks table has them.
+
+    Returns:
+        DataFrame with 'week_key', 'fundraiser', 'donors', 'points' (without
+        excluded donors), 'counted' and 'approved'
+    """
+    return donors.assign(points=np.where(donors['excluded'] > 0, 0, donors['points'])).groupby(
+        ['week_key', 'fundraiser'], sort=True).agg(
+        donors=('refid', 'size'), points=('points', 'sum'), counted=('counted', 'sum'),
+        approved=('approved', 'sum')).reset_index()
+
+
+def pay_weeks(weekly, rules, working_days):
+    """
+    Add eligibility and payout to fundraiser-week totals.
+
+    Args:
+        weekly: DataFrame with 'week_key', 'fundraiser', 'points', 'counted'
+            and 'approved'
+        rules: CompiledRules
+        working_days: Callable (week key, fundraiser name) -> working days
+            or None (see working_days_lookup); weeks without get no payout
+
+    Returns:
+        weekly with 'eligible', 'working_days', 'daily_average', 'bracket',
+        'rate' and 'payout' added (NaN/None where unpaid)
+    """
+    week_keys = weekly['week_key'].to_numpy(dtype=np.int64)
+    weekly['eligible'] = rules.eligible(weekly['counted'], weekly['approved'], week_keys).astype(int)
+    weekly['working_days'] = pd.Series([working_days(key, name) for key, name in zip(week_keys, weekly['fundraiser'])],
+                                       index=weekly.index, dtype=float)
+    paid = weekly['working_days'].notna().to_numpy()
+    for column in ['daily_average', 'rate', 'payout']:
+        weekly[column] = np.nan
+    weekly['bracket'] = None
+    if paid.any():
+        payouts = rules.payouts(weekly.loc[paid, 'points'], weekly.loc[paid, 'working_days'].tolist(),
+                                weekly.loc[paid, 'eligible'].astype(bool), week_keys[paid])
+        for column in ['daily_average', 'rate', 'payout']:
+            weekly.loc[paid, column] = payouts[column]
+        weekly.loc[paid, 'bracket'] = payouts['bracket']
+    return weekly
+
+
+def working_days_lookup(assignments_file=None, default_days=None):
+    """Callable (week key, fundraiser name) -> working days from saved assignments, or default_days."""
+    store = load_store(assignments_file)
+
+    def working_days(key, name):
+        entry = store.get(format_iso_week(key))
+        days = entry['working_days'].get(name) if entry else None
+        return float(days) if days is not None else default_days
+    return working_days
+
+
+def totals(connection, by='month', start=None, end=None, fundraiser=None):
+    """
+    Points, donors and payouts summed per period and fundraiser.
+
+    Args:
+        connection: Ledger connection
+        by: 'week', 'month', 'quarter' or 'year'
+        start: Optional first period, in the period's notation (202518,
+            202505 for May 2025, 20252 for Q2 2025, 2025)
+        end: Optional last period
+        fundraiser: Optional fundraiser name
+
+    Returns:
+        DataFrame with 'period', 'fundraiser', 'weeks', 'donors', 'points',
+        'counted', 'approved', 'working_days' and 'payout'
+    """
+    if by not in PERIODS:
+        raise ValueError(f"Unknown period {by!r}, expected one of {', '.join(PERIODS)}")
+    column = PERIODS[by]
+    conditions, params = [], []
+    if start is not None:
+        conditions.append(f"{column} >= ?")
+        params.append(int(start))
+    if end is not None:
+        conditions.append(f"{column} <= ?")
+        params.append(int(end))
+    if fundraiser:
+        conditions.append("fundraiser = ?")
+        params.append(fundraiser)
+    where = f"WHERE {' AND '.join(conditions)} " if conditions else ""
+    return pd.read_sql(
+        f"SELECT {column} AS period, fundraiser, COUNT(*) AS weeks, SUM(donors) AS donors, SUM(points) AS points, "
+        f"SUM(counted) AS counted, SUM(approved) AS approved, SUM(working_days) AS working_days, "
+        f"SUM(payout) AS payout FROM weeks {where}GROUP BY {column}, fundraiser ORDER BY {column}, fundraiser",
+        connection, params=params)
+
+
+def _rescore_all(connection, rules):
+    """Score every stored donor with new rules."""
+    rows = pd.read_sql("SELECT refid, week_key, age, interval, amount, status FROM donors", connection)
+    if rows.empty:
+        return
+    rows = score(rows, rules)
+    connection.executemany(
+        "UPDATE donors SET points = ?, counted = ?, approved = ?, excluded = ? WHERE refid = ?",
+        _records(rows[['points', 'counted', 'approved', 'excluded', 'refid']]))
+
+
+def _working_day_changes(connection, assignments_file=None, default_days=None):
+    """Stored fundraiser-weeks whose saved working days changed since they were computed."""
+    working_days = working_days_lookup(assignments_file, default_days)
+    stored = connection.execute("SELECT week_key, fundraiser, working_days FROM weeks").fetchall()
+    return {(key, name) for key, name, days in stored if working_days(key, name) != days}
+
+
+def _text(column):
+    """Column as an object array of strings; categoricals convert each category once."""
+    if isinstance(column.dtype, pd.CategoricalDtype):
+        categories = np.asarray(column.cat.categories.astype(str), dtype=object)
+        return np.append(categories, 'nan')[column.cat.codes.to_numpy()]
+    return column.astype(str).to_numpy(dtype=object)
+
+
+def _amounts(column):
+    """float32 amounts as float64 through their shortest representation, as in the formatted CSV."""
+    values, inverse = np.unique(column.to_numpy(dtype=np.float32), return_inverse=True)
+    return values.astype(str).astype(float)[inverse]
+
+
+def _records(frame):
+    """Rows of a frame as plain Python values, NaN as NULL, for executemany."""
+    columns = []
+    for column in frame.columns:
+        values = frame[column].to_numpy(dtype=object)
+        values[pd.isna(frame[column]).to_numpy()] = None
+        columns.append([value.item() if isinstance(value, np.generic) else value for value in values])
+    return zip(*columns)
+
+
+def _meta(connection, key):
+    row = connection.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+    return row[0] if row else None
+
+
+def _set_meta(connection, key, value):
+    connection.execute("INSERT INTO meta (key, value) VALUES (?, ?) ON CONFLICT (key) DO UPDATE SET value = excluded.value",
+                       (key, str(value)))
+
+
+def format_period(by, period):
+    """Readable period label: '2025-W18', '2025-05', '2025-Q2' or '2025'."""
+    period = int(period)
+    if by == 'week':
+        return format_iso_week(period)
+    if by == 'month':
+        return f"{period // 100}-{period % 100:02d}"
+    if by == 'quarter':
+        return f"{period // 10}-Q{period % 10}"
+    return str(period)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Ledger of donors and fundraiser-week payouts across exports')
+    parser.add_argument('--ledger', dest='ledger_file',
+                        help='Ledger database (defaults to ledger.sqlite next to the saved assignments)')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    import_parser = commands.add_parser('import', help='Add exports to the ledger')
+    import_parser.add_argument('input_files', nargs='+', help='Agency CSV exports')
+    import_parser.add_argument('--rules', dest='rules_file',
+                               help='Rules JSON file (defaults to the bundled rules.json)')
+    import_parser.add_argument('--assignments', dest='assignments_file',
+                               help='Saved assignments file (defaults to the one the GUI saves to)')
+    import_parser.add_argument('--default-days', type=float,
+                               help='Working days for fundraisers without saved ones (default: no payout)')
+
+    totals_parser = commands.add_parser('totals', help='Sum fundraiser-weeks per period')
+    totals_parser.add_argument('--by', choices=list(PERIODS), default='month',
+                               help='Period to sum by (default: month)')
+    totals_parser.add_argument('--from', dest='start', type=int,
+                               help='First period, e.g. 202518, 202505, 20252 or 2025')
+    totals_parser.add_argument('--to', dest='end', type=int, help='Last period')
+    totals_parser.add_argument('--fundraiser', help='Only this fundraiser')
+    totals_parser.add_argument('--output', '-o', help='Write the totals to this CSV instead of printing them')
+
+    args = parser.parse_args()
+    connection = connect(args.ledger_file)
+
+    if args.command == 'import':
+        rules = load_rules(args.rules_file)
+        for input_file in args.input_files:
+            result = import_export(connection, input_file, rules, args.assignments_file, args.default_days)
+            note = " (rules changed, all donors scored again)" if result['rescored'] else ""
+            print(f"✓ {os.path.basename(input_file)}: {result['rows']} donors, {result['changed']} new or changed, "
+                  f"{result['weeks']} fundraiser-weeks recomputed{note}")
+    else:
+        result = totals(connection, args.by, args.start, args.end, args.fundraiser)
+        result['period'] = [format_period(args.by, period) for period in result['period']]
+        if args.output:
+            result.to_csv(args.output, sep=';', index=False, encoding='utf-8-sig')
+            print(f"Wrote {len(result)} rows to {args.output}")
+        else:
+            print(result.to_string(index=False))
+    connection.close()
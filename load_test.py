@@ -0,0 +1,160 @@
+"""
+Load test for service.py: submit many jobs at once and report the throughput.
+
+    python service.py --workers 4 &
+    python load_test.py export.csv --jobs 40 --concurrency 8 --default-days 5
+
+Each client thread uploads an export, polls its status until the job is
+done and downloads the formatted CSV, then starts the next job. The report
+shows jobs per minute and the latency from upload to download.
+"""
+import json
+import os
+import statistics
+import time
+import uuid
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+# Seconds between status requests for a running job
+POLL_INTERVAL_S = 0.2
+
+
+def encode_multipart(fields, files):
+    """(content type, body) of a multipart/form-data request; files maps field -> (file name, bytes)."""
+    boundary = uuid.uuid4().hex
+    parts = []
+    for name, value in fields.items():
+        parts.append(f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n{value}\r\n'
+                     .encode('utf-8'))
+    for name, (filename, data) in files.items():
+        parts.append(f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"; filename="{filename}"\r\n'
+                     f'Content-Type: application/octet-stream\r\n\r\n'.encode('utf-8') + data + b'\r\n')
+    parts.append(f'--{boundary}--\r\n'.encode('utf-8'))
+    return f'multipart/form-data; boundary={boundary}', b''.join(parts)
+
+
+def _request(url, data=None, content_type=None):
+    request = urllib.request.Request(url, data=data, headers={'Content-Type': content_type} if content_type else {})
+    with urllib.request.urlopen(request) as response:
+        return response.read()
+
+
+def run_job(url, name, data, assignments=None, default_days=None, generate_pdf=True):
+    """
+    Submit one job, wait for it and download its CSV.
+
+    Returns:
+        Dictionary with 'state', 'seconds' (upload to download), the job's
+        'processing_seconds' and 'cached_export', and 'error' if it failed
+    """
+    fields = {'pdf': '1' if generate_pdf else '0'}
+    if default_days is not None:
+        fields['default_days'] = str(default_days)
+    files = {'export': (name, data)}
+    if assignments is not None:
+        files['assignments'] = ('assignments.json', assignments)
+
+    start = time.perf_counter()
+    content_type, body = encode_multipart(fields, files)
+    status = json.loads(_request(f"{url}/jobs", body, content_type))
+    while status['state'] not in ('done', 'failed'):
+        time.sleep(POLL_INTERVAL_S)
+        status = json.loads(_request(f"{url}/jobs/{status['id']}"))
+    if status['state'] == 'done':
+        _request(url + status['csv'])
+    return {
+        'state': status['state'],
+        'seconds': time.perf_counter() - start,
+        'processing_seconds': status.get('processing_seconds'),
+        'cached_export': status.get('cached_export'),
+        'error': status.get('error'),
+    }
+
+
+def load_test(url, export_file, jobs=20, concurrency=4, assignments_file=None, default_days=None,
+              generate_pdf=True):
+    """
+    Run jobs against a running service.
+
+    Args:
+        url: Service base URL
+        export_file: Export to upload for every job
+        jobs: Jobs to run in total
+        concurrency: Jobs in flight at once
+        assignments_file: Optional assignments JSON to upload with each job
+        default_days: Working days for fundraisers without any
+        generate_pdf: Whether the jobs render PDF reports
+
+    Returns:
+        Dictionary with 'jobs', 'failed', 'seconds', 'jobs_per_minute' and
+        'latency' ('mean', 'p50', 'p95', 'max' seconds)
+    """
+    with open(export_file, 'rb') as f:
+        data = f.read()
+    assignments = None
+    if assignments_file:
+        with open(assignments_file, 'rb') as f:
+            assignments = f.read()
+    name = os.path.basename(export_file)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as pool:
+        results = list(pool.map(lambda _: run_job(url, name, data, assignments, default_days, generate_pdf),
+                                range(jobs)))
+    seconds = time.perf_counter() - start
+
+    latencies = sorted(result['seconds'] for result in results)
+    failed = [result for result in results if result['state'] != 'done']
+    return {
+        'jobs': jobs,
+        'failed': len(failed),
+        'errors': sorted({result['error'] for result in failed if result['error']}),
+        'cached_exports': sum(bool(result['cached_export']) for result in results),
+        'seconds': round(seconds, 2),
+        'jobs_per_minute': round((jobs - len(failed)) * 60 / seconds, 1),
+        'latency': {
+            'mean': round(statistics.mean(latencies), 3),
+            'p50': round(latencies[len(latencies) // 2], 3),
+            'p95': round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))], 3),
+            'max': round(latencies[-1], 3),
+        },
+    }
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from service import DEFAULT_PORT
+
+    parser = argparse.ArgumentParser(description='Measure the job throughput of a running service.py')
+    parser.add_argument('export_file', help='Export CSV to upload for every job')
+    parser.add_argument('--url', default=f'http://127.0.0.1:{DEFAULT_PORT}',
+                        help=f'Service URL (default: http://127.0.0.1:{DEFAULT_PORT})')
+    parser.add_argument('--jobs', type=int, default=20,
+                        help='Jobs to run in total (default: 20)')
+    parser.add_argument('--concurrency', type=int, default=4,
+                        help='Jobs in flight at once (default: 4)')
+    parser.add_argument('--assignments', dest='assignments_file',
+                        help='Assignments JSON to upload with each job')
+    parser.add_argument('--default-days', type=float,
+                        help='Working days for fundraisers without any')
+    parser.add_argument('--no-pdf', action='store_true',
+                        help='Skip PDF generation in the jobs')
+
+    args = parser.parse_args()
+
+    try:
+        report = load_test(args.url.rstrip('/'), args.export_file, args.jobs, args.concurrency,
+                           args.assignments_file, args.default_days, not args.no_pdf)
+    except urllib.error.URLError as e:
+        raise SystemExit(f"Could not reach the service at {args.url}: {e}")
+
+    print(f"Jobs: {report['jobs']} ({report['failed']} failed, {report['cached_exports']} with a cached export)")
+    for error in report['errors']:
+        print(f"  ✗ {error}")
+    print(f"Time: {report['seconds']} s")
+    print(f"Throughput: {report['jobs_per_minute']} jobs/minute")
+    latency = report['latency']
+    print(f"Latency: mean {latency['mean']} s, p50 {latency['p50']} s, p95 {latency['p95']} s, max {latency['max']} s")
@@ -0,0 +1,164 @@
+"""
+Logging setup: levels, a quiet console and a rotating log file.
+
+Modules log through logging.getLogger(__name__) with %-style arguments, so
+a message below the active level costs one level check and is never
+formatted. Where building the arguments is itself work (lists of names,
+dumps of rows), the code checks logger.isEnabledFor(logging.DEBUG) first.
+
+configure() sets up a run: warnings and errors on the console by default,
+info and above in a rotating log file when one is given, and debug detail
+only for the modules named in debug_modules:
+
+    configure(log_file=default_log_path(), debug_modules=['pipeline'])
+
+Without configure(), Python's default applies: warnings and errors on
+stderr, nothing else.
+"""
+import logging
+import logging.handlers
+import os
+import sys
+
+CONSOLE_FORMAT = '%(levelname)s: %(message)s'
+FILE_FORMAT = '%(asctime)s %(process)d %(levelname)-7s %(name)s: %(message)s'
+
+# Rotating log file: size per file and old files kept
+MAX_BYTES = 1_000_000
+BACKUP_COUNT = 3
+
+# Environment variable naming modules to log debug detail for, e.g. 'pipeline,pdf_generator'
+DEBUG_ENV = 'REALISIERUNGSDATEN_DEBUG'
+
+# Handlers and module levels set by the last configure(), undone by the next
+_installed = {'handlers': [], 'modules': [], 'settings': None}
+
+
+def default_log_path():
+    """realisierungsdaten.log next to the saved assignments in the application data directory."""
+    base = os.environ.get('APPDATA') or os.path.join(os.path.expanduser('~'), '.config')
+    return os.path.join(base, 'Realisierungsdatenvisualizer', 'realisierungsdaten.log')
+
+
+def debug_modules_from_env():
+    """Modules named in REALISIERUNGSDATEN_DEBUG (comma-separated), for runs without command-line options."""
+    return [module.strip() for module in os.environ.get(DEBUG_ENV, '').split(',') if module.strip()]
+
+
+def _level(level):
+    """Level number from a number or a name such as 'info'."""
+    if isinstance(level, int):
+        return level
+    number = logging.getLevelName(str(level).upper())
+    if not isinstance(number, int):
+        raise ValueError(f"Unknown log level {level!r}")
+    return number
+
+
+def _main_module():
+    """Module name of the script run as __main__ (e.g. 'pipeline'), or None."""
+    path = getattr(sys.modules.get('__main__'), '__file__', None)
+    return os.path.splitext(os.path.basename(path))[0] if path else None
+
+
+class _ModuleFilter(logging.Filter):
+    """Passes records at or above level, and every record of the debug modules."""
+
+    def __init__(self, level, debug_modules):
+        super().__init__()
+        self.level = level
+        self.debug_modules = tuple(debug_modules)
+        self.main_module = _main_module()
+
+    def filter(self, record):
+        # A module run as a script logs as '__main__'; name it as when imported
+        if record.name == '__main__' and self.main_module:
+            record.name = self.main_module
+        if record.levelno >= self.level:
+            return True
+        return any(record.name == module or record.name.startswith(module + '.') for module in self.debug_modules)
+
+
+def configure(level=logging.WARNING, log_file=None, file_level=logging.INFO, debug_modules=(), console=True,
+              handlers=()):
+    """
+    Set up logging for this process, replacing an earlier configure().
+
+    Args:
+        level: Console level (number or name)
+        log_file: Optional path of a rotating log file (directories are created)
+        file_level: Level of the log file
+        debug_modules: Module names (e.g. 'pipeline', 'pdf_generator') that
+            log debug detail to every handler regardless of the levels
+        console: Log to stderr; off for windowed builds without a console
+        handlers: Further handlers, receiving records at level and above
+            (e.g. one forwarding a worker's records to the GUI process)
+    """
+    level = _level(level)
+    file_level = _level(file_level)
+    debug_modules = list(debug_modules)
+    root = logging.getLogger()
+    for handler in _installed['handlers']:
+        root.removeHandler(handler)
+        handler.close()
+    for module in _installed['modules']:
+        logging.getLogger(module).setLevel(logging.NOTSET)
+
+    installed = []
+    if console:
+        handler = logging.StreamHandler()
+        handler.setFormatter(logging.Formatter(CONSOLE_FORMAT))
+        installed.append((handler, level))
+    if log_file:
+        os.makedirs(os.path.dirname(os.path.abspath(log_file)), exist_ok=True)
+        handler = logging.handlers.RotatingFileHandler(log_file, maxBytes=MAX_BYTES, backupCount=BACKUP_COUNT,
+                                                       encoding='utf-8')
+        handler.setFormatter(logging.Formatter(FILE_FORMAT))
+        installed.append((handler, file_level))
+    installed.extend((handler, level) for handler in handlers)
+
+    for handler, handler_level in installed:
+        handler.addFilter(_ModuleFilter(handler_level, debug_modules))
+        root.addHandler(handler)
+    # The root level is the lowest any handler wants, so everything below it
+    # stops at the level check
+    lowest = min([handler_level for _, handler_level in installed] or [level])
+    root.setLevel(lowest)
+    if _main_module() in debug_modules:
+        debug_modules.append('__main__')
+    for module in debug_modules:
+        logging.getLogger(module).setLevel(logging.DEBUG)
+
+    _installed['handlers'] = [handler for handler, _ in installed]
+    _installed['modules'] = debug_modules
+    _installed['settings'] = {'level': lowest, 'debug_modules': debug_modules}
+
+
+def settings():
+    """
+    Levels of the last configure() for a child process: {'level', 'debug_modules'}.
+
+    The child forwards records at these levels to this process, whose own
+    handlers then filter them as usual.
+    """
+    return dict(_installed['settings'] or {'level': logging.WARNING, 'debug_modules': []})
+
+
+def add_logging_arguments(parser):
+    """Add the logging options to an argparse parser."""
+    parser.add_argument('--verbose', '-v', action='count', default=0,
+                        help='Show progress messages (-v) or all debug detail (-vv)')
+    parser.add_argument('--quiet', '-q', action='store_true', help='Show errors only')
+    parser.add_argument('--log-file', help='Also log progress messages to this rotating log file')
+    parser.add_argument('--debug', action='append', default=[], metavar='MODULE',
+                        help='Log debug detail of this module, e.g. pipeline or pdf_generator (repeatable)')
+
+
+def configure_from_args(args, default=logging.WARNING):
+    """configure() from the options of add_logging_arguments; -v lowers the default level one step."""
+    if args.quiet:
+        level = logging.ERROR
+    else:
+        steps = [logging.WARNING, logging.INFO, logging.DEBUG]
+        level = steps[min(steps.index(default) + args.verbose, len(steps) - 1)]
+    configure(level, log_file=args.log_file, file_level=min(level, logging.INFO), debug_modules=args.debug)
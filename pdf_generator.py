@@ -1,3 +1,4 @@
+import logging
 import pandas as pd
 import os
 from datetime import datetime
@@ -9,8 +10,15 @@ from reportlab.lib.units import mm, cm
 from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle, PageBreak
 from reportlab.platypus.flowables import HRFlowable
 from reportlab.lib.enums import TA_CENTER, TA_LEFT, TA_RIGHT
+from rules import load_rules, plain_number
+from progress import Progress
+from instrument import instrumented, stage, count
+from weeks import parse_week_keys, resolve_week_keys, iso_month, MONTH_NAMES
 
-def generate_pdf_for_fundraiser(fundraiser_data, output_dir, payment_info=None, tl_bonus_info=None):
+logger = logging.getLogger(__name__)
+
+@instrumented('pdf_document')
+def generate_pdf_for_fundraiser(fundraiser_data, output_dir, payment_info=None, tl_bonus_info=None, rules=None):
     """
     Generate PDF file for a specific fundraiser with payment information.
 
@@ -19,10 +27,14 @@ def generate_pdf_for_fundraiser(fundraiser_data, output_dir, payment_info=None,
         output_dir: Directory to save the generated PDF files
         payment_info: DataFrame containing payment information for this fundraiser
         tl_bonus_info: DataFrame containing TL bonus information for this fundraiser
+        rules: CompiledRules used for eligibility and payout (defaults to rules.json)
 
     Returns:
         Path to the generated PDF file
     """
+    if rules is None:
+        rules = load_rules()
+
     # Extract fundraiser info - preserve original ID formatting
     fundraiser_id = str(fundraiser_data['Fundraiser ID'].iloc[0])
     # Ensure fundraiser ID has leading zeros (5 digits)
@@ -30,40 +42,19 @@ def generate_pdf_for_fundraiser(fundraiser_data, output_dir, payment_info=None,
         fundraiser_id = fundraiser_id.replace('.0', '').zfill(5)
     fundraiser_name = fundraiser_data['Fundraiser Name'].iloc[0]
 
-    # Determine month and year from calendar weeks
-    calendar_weeks = fundraiser_data['Calendar week'].dropna().unique()
-    year = "2025"  # Default year based on data
-
-    # Extract month from calendar weeks (approximation)
-    month_mapping = {
-        range(1, 5): "Januar",
-        range(5, 9): "Februar",
-        range(9, 14): "März",
-        range(14, 18): "April",
-        range(18, 23): "Mai",
-        range(23, 27): "Juni",
-        range(27, 31): "Juli",
-        range(31, 35): "August",
-        range(35, 40): "September",
-        range(40, 44): "Oktober",
-        range(44, 48): "November",
-        range(48, 53): "Dezember"
-    }
-
-    # Get first week number to determine month
-    first_week = None
-    for week in calendar_weeks:
-        if '/' in str(week):
-            week_num = int(str(week).split('/')[0])
-            first_week = week_num
-            break
-
-    month = "Mai"  # Default
-    if first_week:
-        for week_range, month_name in month_mapping.items():
-            if first_week in week_range:
-                month = month_name
-                break
+    # (year, week) keys are parsed once for the whole file by generate_all_pdf_files
+    if 'week_key' not in fundraiser_data.columns:
+        fundraiser_data = fundraiser_data.assign(week_key=parse_week_keys(fundraiser_data['Calendar week']))
+    fundraiser_data = fundraiser_data[fundraiser_data['week_key'] > 0]
+
+    # Month and year of the first week, by the ISO calendar (a week belongs
+    # to the month containing its Thursday)
+    if not fundraiser_data.empty:
+        first_year, first_month = iso_month(fundraiser_data['week_key'].min())
+    else:
+        first_year, first_month = datetime.now().year, datetime.now().month
+    year = str(first_year)
+    month = MONTH_NAMES[first_month - 1]
 
     # Create filename
     safe_name = re.sub(r'[^\w\s-]', '', fundraiser_name.replace(' ', '_'))
@@ -145,13 +136,16 @@ def generate_pdf_for_fundraiser(fundraiser_data, output_dir, payment_info=None,
     content.append(info_table)
     content.append(Spacer(1, 30))
 
-    # Group data by calendar weeks
+    # Group data by (year, week) in calendar order, labelled as in the export
     weeks_data = {}
-    for week in sorted(calendar_weeks):
-        if pd.notna(week):
-            week_data = fundraiser_data[fundraiser_data['Calendar week'] == week]
-            if not week_data.empty:
-                weeks_data[week] = week_data
+    week_rule_sets = {}
+    for week_key, week_data in fundraiser_data.groupby('week_key', sort=True):
+        week = week_data['Calendar week'].iloc[0]
+        weeks_data[week] = week_data
+        week_rule_sets[week] = rules.for_week(week_key)
+
+    # Payout per week as shown in the week footers, reused for the summary page
+    week_payouts = {}
 
     # Generate content for each week
     for week, week_data in weeks_data.items():
@@ -170,8 +164,8 @@ def generate_pdf_for_fundraiser(fundraiser_data, output_dir, payment_info=None,
         table_data = [['Public Ref ID', 'Alter', 'Intervall', 'Jahresbeitrag', 'Status', 'Punkte']]
 
         total_points = 0
-        approved_count = 0
-        total_count = 0
+        bonus_eligible = False
+        week_rules = week_rule_sets[week]
 
         # Filter valid rows once for better performance
         valid_rows = week_data[week_data['Public RefID'].notna()]
@@ -197,13 +191,12 @@ def generate_pdf_for_fundraiser(fundraiser_data, output_dir, payment_info=None,
                                  amounts.iloc[i], status_cell, points.iloc[i]])
 
             # Calculate totals efficiently
-            # For bonus eligibility: include all donors (including cancelled)
-            total_count = len(valid_rows)
-            approved_count = (valid_rows['status_agency'].str.lower() == 'approved').sum()
+            # For bonus eligibility: approval rate over the counted statuses
+            counted, approved, excluded = week_rules.status_masks(valid_rows['status_agency'])
+            bonus_eligible = bool(week_rules.eligible(counted.sum(), approved.sum()))
 
             # For total points and payout: exclude cancelled donors
-            non_cancelled_rows = valid_rows[valid_rows['status_agency'].str.lower() != 'cancelled']
-            total_points = non_cancelled_rows['points'].fillna(0).sum()
+            total_points = valid_rows['points'].fillna(0)[~excluded].sum()
 
         # Create table with properly balanced column widths (wider Status column)
         data_table = Table(table_data, colWidths=[2.5*cm, 1.4*cm, 2.0*cm, 2.8*cm, 2.3*cm, 1.6*cm])
@@ -236,7 +229,7 @@ def generate_pdf_for_fundraiser(fundraiser_data, output_dir, payment_info=None,
 
         # Week footer with totals and payout
         points_total_str = str(total_points).replace('.', ',')
-        bonus_granted = "Ja" if approved_count / total_count >= 0.7 else "Nein"
+        bonus_granted = "Ja" if bonus_eligible else "Nein"
 
         # Try to get actual payout data from payment_info for this week
         week_payout = 0
@@ -268,10 +261,10 @@ def generate_pdf_for_fundraiser(fundraiser_data, output_dir, payment_info=None,
                             if 'Rate:' in rate_text:
                                 rate_match = re.search(r'Rate:\s*€(\d+(?:\.\d+)?)', rate_text)
                                 if rate_match:
-                                    rate = float(rate_match.group(1))
+                                    rate = plain_number(rate_match.group(1))
 
                         # Only use the payout if bonus is granted
-                        if total_count > 0 and approved_count / total_count >= 0.7:
+                        if bonus_eligible:
                             week_payout = potential_payout
                         else:
                             week_payout = 0
@@ -286,20 +279,12 @@ def generate_pdf_for_fundraiser(fundraiser_data, output_dir, payment_info=None,
         if not week_payment_found:
             working_days = actual_working_days
             # Only calculate payout if bonus is granted
-            if total_points > 0 and approved_count / total_count >= 0.7:
-                # Calculate daily average and determine payout
-                daily_avg = total_points / working_days
-                if daily_avg < 2:
-                    rate = 3.95
-                elif daily_avg < 3:
-                    rate = 10
-                elif daily_avg < 5:
-                    rate = 15
-                elif daily_avg < 7:
-                    rate = 20
-                else:
-                    rate = 30
-                week_payout = total_points * rate
+            if total_points > 0 and bonus_eligible:
+                payout_details = week_rules.payout_details(total_points, working_days, bonus_eligible)
+                rate = payout_details["rate"]
+                week_payout = payout_details["payout"]
+
+        week_payouts[week] = week_payout
 
         payout_str = f"€{week_payout:.2f}"
 
@@ -323,10 +308,11 @@ def generate_pdf_for_fundraiser(fundraiser_data, output_dir, payment_info=None,
 
     # Add team leader bonus page if available
     if tl_bonus_info is not None and not tl_bonus_info.empty:
-        print(f"PDF DEBUG: Processing TL bonus info for {fundraiser_name}")
-        print(f"PDF DEBUG: TL bonus data shape: {tl_bonus_info.shape}")
-        for idx, row in tl_bonus_info.iterrows():
-            print(f"PDF DEBUG: Row {idx}: Fundraiser Name='{row['Fundraiser Name']}', Calendar week='{row['Calendar week']}'")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Processing TL bonus info for %s: %d rows", fundraiser_name, len(tl_bonus_info))
+            for idx, row in tl_bonus_info.iterrows():
+                logger.debug("TL bonus row %s: Fundraiser Name='%s', Calendar week='%s'",
+                             idx, row['Fundraiser Name'], row['Calendar week'])
 
         content.append(PageBreak())
 
@@ -371,7 +357,7 @@ def generate_pdf_for_fundraiser(fundraiser_data, output_dir, payment_info=None,
             # Check if this is a week header
             if pd.notna(bonus_row['Fundraiser Name']) and str(bonus_row['Fundraiser Name']).startswith('---'):
                 current_week = str(bonus_row['Fundraiser Name']).replace('---', '').strip()
-                print(f"PDF DEBUG: Found week header: '{current_week}' from '{bonus_row['Fundraiser Name']}'")
+                logger.debug("Found week header '%s'", current_week)
                 continue
 
             # Team bonus data
@@ -464,10 +450,7 @@ def generate_pdf_for_fundraiser(fundraiser_data, output_dir, payment_info=None,
             )
             content.append(Paragraph("Milestone Bonuses (Potential)", milestone_subtitle_style))
 
-            # Debug: Check if we have milestone data
-            print(f"Milestone data rows: {len(milestone_data_rows)}")
-            if milestone_data_rows:
-                print(f"First milestone row: {milestone_data_rows[0]}")
+            logger.debug("Milestone data rows for %s: %d", fundraiser_name, len(milestone_data_rows))
 
             # First table: Milestone Categories
             milestone_categories_data = [['Week', 'Team Size', 'Coach', 'Office', 'External', 'Material']]
@@ -476,7 +459,7 @@ def generate_pdf_for_fundraiser(fundraiser_data, output_dir, payment_info=None,
                 if len(row) >= 6:
                     milestone_categories_data.append(row[:6])
                 else:
-                    print(f"Warning: Milestone row has only {len(row)} columns: {row}")
+                    logger.warning("Milestone row has only %d columns: %s", len(row), row)
 
             if len(milestone_categories_data) > 1:  # Only create table if we have data
                 milestone_categories_table = Table(milestone_categories_data, colWidths=[3.0*cm, 3.0*cm, 3.0*cm, 3.0*cm, 3.0*cm, 3.0*cm])
@@ -514,7 +497,7 @@ def generate_pdf_for_fundraiser(fundraiser_data, output_dir, payment_info=None,
                 if len(row) >= 7:
                     milestone_totals_data.append([row[0], row[6]])
                 else:
-                    print(f"Warning: Cannot access column 6 in milestone row: {row}")
+                    logger.warning("Cannot access column 6 in milestone row: %s", row)
 
             if len(milestone_totals_data) > 1:  # Only create table if we have data
                 milestone_totals_table = Table(milestone_totals_data, colWidths=[9.0*cm, 9.0*cm])
@@ -581,45 +564,10 @@ def generate_pdf_for_fundraiser(fundraiser_data, output_dir, payment_info=None,
     content.append(Spacer(1, 30))
 
     # Calculate totals
-    total_regular_payout = 0
     total_tl_bonus = 0
 
-    # Sum up regular payouts - recalculate for each week based on bonus eligibility
-    for week, week_data in weeks_data.items():
-        if pd.notna(week) and not week_data.empty:
-            # Filter valid rows for this week
-            valid_rows = week_data[week_data['Public RefID'].notna()]
-
-            if not valid_rows.empty:
-                # Calculate bonus eligibility for this week
-                total_count = len(valid_rows)
-                approved_count = (valid_rows['status_agency'].str.lower() == 'approved').sum()
-
-                # Only include payout if bonus is granted (70% approval rate)
-                if total_count > 0 and approved_count / total_count >= 0.7:
-                    # Calculate total points for this week (excluding cancelled donors)
-                    non_cancelled_rows = valid_rows[valid_rows['status_agency'].str.lower() != 'cancelled']
-                    week_points = non_cancelled_rows['points'].fillna(0).sum()
-
-                    if week_points > 0:
-                        # Calculate payout based on points and rate
-                        working_days = 6  # Default assumption
-                        daily_avg = week_points / working_days
-
-                        # Determine rate based on daily average
-                        if daily_avg < 2:
-                            rate = 3.95
-                        elif daily_avg < 3:
-                            rate = 10
-                        elif daily_avg < 5:
-                            rate = 15
-                        elif daily_avg < 7:
-                            rate = 20
-                        else:
-                            rate = 30
-
-                        week_payout = week_points * rate
-                        total_regular_payout += week_payout
+    # Sum up regular payouts exactly as shown in the week footers
+    total_regular_payout = sum(week_payouts.values())
 
     # Sum up TL bonuses
     if tl_bonus_info is not None and not tl_bonus_info.empty:
@@ -676,22 +624,37 @@ def generate_pdf_for_fundraiser(fundraiser_data, output_dir, payment_info=None,
     ]))
 
     content.append(summary_table)
+    content.append(Spacer(1, 20))
+    content.append(Paragraph(f"Regelwerk: {rules.version}", ParagraphStyle(
+        'RulesVersionStyle',
+        parent=styles['Normal'],
+        fontSize=8,
+        textColor=colors.grey
+    )))
 
     # Build PDF
     doc.build(content)
     return output_path
 
-def generate_all_pdf_files(csv_file_path, output_dir=None):
+def generate_all_pdf_files(csv_file_path, output_dir=None, rules=None, week_keys=None, progress=None):
     """
     Generate PDF files for all fundraisers from formatted CSV.
 
     Args:
         csv_file_path: Path to the formatted CSV file
         output_dir: Directory to save PDF files (defaults to pdf_output next to CSV file)
+        rules: CompiledRules used for eligibility and payout (defaults to rules.json)
+        week_keys: {Calendar week: week key} resolved from the export (optional)
+        progress: Optional progress.Progress, advanced once per fundraiser
 
     Returns:
         List of generated PDF file paths
     """
+    if rules is None:
+        rules = load_rules()
+    progress = progress or Progress()
+    progress.plan(['render'])
+
     # If no output directory specified, create one next to the CSV file
     if output_dir is None:
         csv_dir = os.path.dirname(os.path.abspath(csv_file_path))
@@ -700,13 +663,16 @@ def generate_all_pdf_files(csv_file_path, output_dir=None):
     # Create output directory if it doesn't exist
     os.makedirs(output_dir, exist_ok=True)
 
-    print("Reading and preprocessing CSV data...")
+    logger.info("Reading %s", csv_file_path)
     # Read the formatted CSV
     df = pd.read_csv(csv_file_path, sep=';', encoding='utf-8-sig', skiprows=2)
 
     # Clean column names
     df.columns = df.columns.str.strip()
 
+    # Parse calendar weeks once for the whole file; summary rows get key 0
+    df['week_key'] = resolve_week_keys(df['Calendar week'], week_keys)
+
     # Separate different types of data
     # Regular donor data
     regular_data = df[
@@ -743,18 +709,21 @@ def generate_all_pdf_files(csv_file_path, output_dir=None):
     # Get unique fundraisers from regular data
     fundraisers = regular_data.groupby(['Fundraiser ID', 'Fundraiser Name'])
     total_fundraisers = len(fundraisers)
-    print(f"Processing {total_fundraisers} fundraisers...")
+    logger.info("Generating PDF files for %d fundraisers", total_fundraisers)
+    progress.start('render', total_fundraisers)
+    count(rows=len(df))
 
     generated_files = []
 
     for i, ((fundraiser_id, fundraiser_name), fundraiser_data) in enumerate(fundraisers, 1):
         try:
-            print(f"[{i}/{total_fundraisers}] Generating PDF for {fundraiser_name} (ID: {fundraiser_id})...")
+            logger.debug("[%d/%d] Generating PDF for %s (ID: %s)", i, total_fundraisers, fundraiser_name, fundraiser_id)
 
             # Get payment info for this fundraiser (payment info is stored right after each fundraiser's data)
             # We need to get all CSV data first to find payment info by proximity
-            all_csv_data = pd.read_csv(csv_file_path, sep=';', encoding='utf-8-sig', skiprows=2)
-            all_csv_data.columns = all_csv_data.columns.str.strip()
+            with stage('reread_csv'):
+                all_csv_data = pd.read_csv(csv_file_path, sep=';', encoding='utf-8-sig', skiprows=2)
+                all_csv_data.columns = all_csv_data.columns.str.strip()
 
             # Find payment rows that appear after this specific fundraiser
             fundraiser_payment_info = pd.DataFrame()
@@ -805,13 +774,16 @@ def generate_all_pdf_files(csv_file_path, output_dir=None):
                     fundraiser_tl_info = pd.concat([fundraiser_tl_info, row.to_frame().T])
 
             pdf_path = generate_pdf_for_fundraiser(fundraiser_data, output_dir,
-                                                 fundraiser_payment_info, fundraiser_tl_info)
+                                                 fundraiser_payment_info, fundraiser_tl_info,
+                                                 rules=rules)
             generated_files.append(pdf_path)
-            print(f"✓ Generated: {os.path.basename(pdf_path)}")
+            logger.debug("Generated %s", pdf_path)
         except Exception as e:
-            print(f"✗ Error generating PDF for {fundraiser_name}: {e}")
+            logger.error("Error generating PDF for %s: %s", fundraiser_name, e, exc_info=True)
+        progress.advance()
 
-    print(f"Completed! Generated {len(generated_files)} PDF files.")
+    logger.info("Generated %d PDF files in %s", len(generated_files), output_dir)
+    count(reports=len(generated_files))
     return generated_files
 
 if __name__ == "__main__":
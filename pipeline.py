@@ -0,0 +1,630 @@
+import datetime
+import logging
+import os
+
+import numpy as np
+import pandas as pd
+
+from csv_formatter import read_exports, output_frame
+from rules import load_rules, decode_status, plain_number
+from weeks import week_key_map
+from progress import Progress, Cancelled
+from instrument import count, RunReport, add_report_arguments, format_report, report_path
+from assignments import MissingWorkingDays, empty_selection, stored_selection
+from logs import add_logging_arguments, configure_from_args
+
+logger = logging.getLogger(__name__)
+
+
+class SelectionCancelled(Cancelled):
+    """The user cancelled the team leader selection."""
+
+
+class PipelineConfig:
+    """
+    Inputs and output options of one pipeline run.
+
+    A run reads nothing but its config and keeps no state outside it, so
+    several runs can execute at once in threads or processes. Configs
+    without request_selection can be pickled and sent to a worker process.
+    Team leaders and working days come from the first of request_selection,
+    selection, timesheet_file or the saved assignments (assignments_file,
+    default: the store the GUI saves to).
+    """
+
+    def __init__(self, input_file, output_file=None, pdf_output_dir=None, generate_pdf=True, rules=None,
+                 assignments_file=None, timesheet_file=None, default_days=None, selection=None,
+                 request_selection=None, parsed_export=None):
+        """
+        Args:
+            input_file: Path to the agency CSV export, or a list of overlapping
+                exports to process as one (see csv_formatter.read_exports)
+            output_file: Formatted CSV to write (default: <input>_formatted.csv next to
+                the input, <first input>_merged_formatted.csv for several)
+            pdf_output_dir: Directory for the PDF files (default: pdf_output next to output_file)
+            generate_pdf: Whether to render the PDF reports
+            rules: CompiledRules, or path of a rules file (default: the bundled rules.json)
+            assignments_file: Saved assignments file (see assignments.default_store_path)
+            timesheet_file: Timesheet CSV/XLSX to take working days and teams from
+            default_days: Working days for fundraisers without saved or timesheet
+                ones; when None, missing working days raise ValueError
+            selection: Ready selection dict (see assignments.empty_selection)
+            request_selection: Callable asking for the selection, e.g. the GUI
+                dialog (see process_export)
+            parsed_export: Optional read_export(input_file) frame to reuse
+                instead of reading the file again (not modified)
+        """
+        if output_file is None:
+            first_file = input_file if isinstance(input_file, str) else input_file[0]
+            input_dir = os.path.dirname(os.path.abspath(first_file))
+            input_name = os.path.splitext(os.path.basename(first_file))[0]
+            suffix = "_formatted.csv" if isinstance(input_file, str) or len(input_file) == 1 else "_merged_formatted.csv"
+            output_file = os.path.join(input_dir, f"{input_name}{suffix}")
+
+        self.input_file = input_file
+        self.output_file = output_file
+        self.pdf_output_dir = pdf_output_dir
+        self.generate_pdf = generate_pdf
+        self.rules = rules
+        self.assignments_file = assignments_file
+        self.timesheet_file = timesheet_file
+        self.default_days = default_days
+        self.selection = selection
+        self.request_selection = request_selection
+        self.parsed_export = parsed_export
+
+    def load_rules(self):
+        if self.rules is None or isinstance(self.rules, str):
+            return load_rules(self.rules)
+        return self.rules
+
+    def selection_source(self):
+        """The request_selection callable for process_export."""
+        if self.request_selection is not None:
+            return self.request_selection
+        if self.selection is not None:
+            selection = self.selection
+            return lambda fundraisers_by_week, week_keys, fundraiser_ids=None: lambda: selection
+        if self.timesheet_file:
+            from timesheet import timesheet_selection
+            return timesheet_selection(self.timesheet_file, self.default_days)
+        return stored_selection(self.assignments_file, self.default_days)
+
+
+def run(config, progress=None):
+    """
+    Run the pipeline for a config.
+
+    Args:
+        config: PipelineConfig
+        progress: Optional progress.Progress for stage updates and cancellation
+
+    Returns:
+        Dictionary with 'input_file', 'output_file', 'rows', 'pdf_files',
+        'rules_version' and 'preview' (see results_preview)
+    """
+    result = process_export(config.input_file, config.output_file, config.pdf_output_dir,
+                            request_selection=config.selection_source(), progress=progress,
+                            rules=config.load_rules(), generate_pdf=config.generate_pdf,
+                            parsed=config.parsed_export)
+    result['input_file'] = config.input_file
+    result['output_file'] = config.output_file
+    return result
+
+
+def results_preview(df_sorted, week_labels, weekly, weekly_eligible, payouts):
+    """
+    Column arrays for the GUI's results view.
+
+    Args:
+        df_sorted: Scored donor rows in output order
+        week_labels: Series of week key -> calendar week label
+        weekly: Per fundraiser-week aggregates with working days
+        weekly_eligible: Bonus eligibility per row of weekly
+        payouts: rules.payouts result per row of weekly
+
+    Returns:
+        Dictionary with 'weeks' (one entry per fundraiser-week) and 'donors'
+        (one entry per donor row, 'group' is its index in 'weeks' or -1),
+        each a dictionary of equally long NumPy arrays
+    """
+    counted = weekly['counted'].to_numpy(dtype=float)
+    weeks = {
+        'week': weekly['Calendar week'].to_numpy(dtype=object),
+        'week_key': weekly['week_key'].to_numpy(),
+        'fundraiser': weekly['Fundraiser Name'].to_numpy(dtype=object),
+        'points': weekly['points'].to_numpy(dtype=float),
+        'approval': np.divide(weekly['approved'].to_numpy(dtype=float), counted,
+                              out=np.full(len(counted), np.nan), where=counted > 0),
+        'eligible': np.asarray(weekly_eligible, dtype=bool),
+        'days': pd.to_numeric(weekly['working_days']).to_numpy(dtype=float),
+        'average': np.asarray(payouts['daily_average'], dtype=float),
+        'bracket': np.asarray(payouts['bracket'], dtype=object),
+        'payout': np.asarray(payouts['payout'], dtype=float),
+    }
+
+    donors = df_sorted[df_sorted['week_key'] > 0]
+    fundraisers = donors['Fundraiser Name'].astype(str)
+    groups = pd.MultiIndex.from_arrays([weeks['week_key'], weeks['fundraiser']]).get_indexer(
+        pd.MultiIndex.from_arrays([donors['week_key'].to_numpy(), fundraisers.to_numpy()]))
+    weeks['donors'] = np.bincount(groups[groups >= 0], minlength=len(weekly))
+    donor_rows = {
+        'group': groups,
+        'week': donors['week_key'].map(week_labels).to_numpy(dtype=object),
+        'week_key': donors['week_key'].to_numpy(),
+        'fundraiser': fundraisers.to_numpy(dtype=object),
+        'refid': donors['Public RefID'].astype(str).to_numpy(dtype=object),
+        'age': donors['Age'].astype(float).to_numpy(),
+        'interval': donors['Interval'].astype(str).to_numpy(dtype=object),
+        'amount': donors['Amount Yearly'].astype(str).astype(float).to_numpy(),
+        'status': donors['status_agency'].astype(str).to_numpy(dtype=object),
+        'points': donors['points'].to_numpy(dtype=float),
+    }
+    return {'weeks': weeks, 'donors': donor_rows}
+
+
+def process_export(input_file, output_file, pdf_output_dir=None, request_selection=None,
+                   progress=None, rules=None, generate_pdf=True, parsed=None, include_payouts=True):
+    """
+    Format an export with weekly payouts and team leader bonuses, then render PDFs.
+
+    This is the processing behind the GUI. It never touches Tk, so it runs
+    the same in a worker thread or a worker process (see worker.py).
+
+    Args:
+        input_file: Path to the agency CSV export, or a list of exports to
+            merge (see csv_formatter.read_exports)
+        output_file: Path of the formatted CSV to write
+        pdf_output_dir: Directory for the PDF files (default: pdf_output next to output_file)
+        request_selection: Callable taking {week: [fundraiser names]},
+            {week: week key} and {fundraiser name: Fundraiser ID} that asks
+            for team leaders and working days (the dialog,
+            assignments.stored_selection or timesheet.timesheet_selection). It must return
+            immediately with a wait function; calling that blocks until the
+            answer is in and returns a selection dict (see
+            assignments.empty_selection) or None when the user cancelled.
+            Without it no team leaders or working days are known.
+        progress: Optional progress.Progress for stage updates and cancellation
+        rules: CompiledRules to use (default: the bundled rules.json)
+        generate_pdf: Whether to render the PDF reports
+        parsed: Optional read_export(input_file) frame to use instead of
+            reading the file; it is copied, not modified
+        include_payouts: Whether to add weekly payouts and team leader
+            bonuses; without them no selection is asked for and the CSV only
+            has the donor and subtotal rows (csv_formatter.format_csv)
+
+    Returns:
+        Dictionary with 'rows', 'pdf_files', 'rules_version' and 'preview'
+        (see results_preview)
+    """
+    rules = rules or load_rules()
+    progress = progress or Progress()
+    progress.plan(['parse', 'points', 'eligibility'] + (['selection', 'payouts'] if include_payouts else []) + ['csv']
+                  + (['render'] if generate_pdf else []))
+
+    progress.start('parse')
+    df = read_exports(input_file) if parsed is None else parsed.copy()
+    count(rows=len(df))
+
+    # One label per (year, week) key for the dialog and the output, in
+    # calendar order; rows whose week could not be parsed have key 0
+    week_labels = df[df['week_key'] > 0].groupby('week_key', sort=True)['Calendar week'].first().astype(str)
+    label_keys = {label: key for key, label in week_labels.items()}
+
+    # Extract fundraisers by calendar week for TL selection
+    fundraiser_names = df[df['week_key'] > 0].groupby('week_key', sort=True)['Fundraiser Name'].unique()
+    fundraisers_by_week = {week_labels[key]: [str(name) for name in names] for key, names in fundraiser_names.items()}
+
+    # Ask for team leaders first; scoring below does not depend on the
+    # answer and keeps running while the user fills in the dialog
+    if include_payouts and request_selection is not None:
+        fundraiser_ids = df[df['week_key'] > 0].groupby('Fundraiser Name', observed=True)['Fundraiser ID'].first()
+        fundraiser_ids = {str(name): str(fundraiser_id) for name, fundraiser_id in fundraiser_ids.items()}
+        wait_for_selection = request_selection(fundraisers_by_week, label_keys, fundraiser_ids)
+    else:
+        wait_for_selection = empty_selection
+
+    progress.start('points')
+    # Calculate points for each donor using vectorized operations
+    df['points'] = rules.points(df['Age'], df['Interval'], df['Amount Yearly'], df['week_key'])
+
+    # Classify statuses once, each row by its own week's rules
+    progress.start('eligibility')
+    df['status_code'] = rules.status_codes(df['status_agency'], df['week_key'])
+    counted, approved, excluded = decode_status(df['status_code'])
+
+    # Group by fundraiser to calculate bonus eligibility
+    per_fundraiser = pd.DataFrame({'counted': counted, 'approved': approved, 'week_key': df['week_key']},
+                                  index=df.index).groupby(df['Fundraiser ID'], observed=True).agg(
+        {'counted': 'sum', 'approved': 'sum', 'week_key': 'max'})
+    logger.info("Processing bonus eligibility for %d fundraisers", len(per_fundraiser))
+    eligible = rules.eligible(per_fundraiser['counted'], per_fundraiser['approved'], per_fundraiser['week_key'])
+    fundraiser_bonus = dict(zip(per_fundraiser.index, np.where(eligible, 'eligible', 'not-eligible')))
+    count(fundraisers=len(per_fundraiser))
+    
+    # Add bonus status to dataframe
+    df['bonus_status'] = df['Fundraiser ID'].map(fundraiser_bonus).astype('category')
+    
+    # Sort data by (year, week), then by Fundraiser Name
+    df_sorted = df.sort_values(['week_key', 'Fundraiser Name', 'Billing group'])
+    
+    # Select only required columns
+    required_columns = [
+        'Fundraiser ID', 'Fundraiser Name', 'Calendar week',
+        'Public RefID', 'Age', 'Interval', 'Amount Yearly', 'status_agency',
+        'points', 'bonus_status'
+    ]
+    
+    # Wait for the team leader selection without spinning
+    if include_payouts:
+        progress.start('selection')
+    selection = wait_for_selection()
+    if selection is None:
+        raise SelectionCancelled("Team Leader selection was cancelled")
+    team_leaders = selection['team_leaders']
+    team_assignments = selection['team_assignments']
+    working_days_by_week = selection['working_days']
+
+    if include_payouts:
+        progress.start('payouts')
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("Weekly team leaders: %s", team_leaders)
+        logger.debug("Weekly team assignments: %s", team_assignments)
+        logger.debug("Weekly working days: %s", working_days_by_week)
+        # Team leaders appearing in several weeks
+        all_tls = set()
+        for week, tls in team_leaders.items():
+            all_tls.update(tls.keys())
+        for tl in sorted(all_tls):
+            logger.debug("TL %s is assigned to weeks: %s", tl, [week for week, tls in team_leaders.items() if tl in tls])
+        logger.debug("Calendar weeks in data: %s", list(week_labels))
+
+    # Calculate payment data for all fundraisers per week
+    weekly_fundraiser_payments = {}
+    weekly_team_leader_bonuses = {}
+
+    for week in week_labels:
+        if include_payouts and week not in working_days_by_week:
+            logger.warning("No working days data for week %s", week)
+
+    # Aggregate points and approval counts per fundraiser and week in one pass
+    counted, approved, excluded = decode_status(df_sorted['status_code'])
+    weekly = df_sorted.assign(payout_points=np.where(excluded, 0, df_sorted['points']),
+                              counted=counted, approved=approved)
+    weekly = weekly[weekly['week_key'] > 0].groupby(['week_key', 'Fundraiser Name'], sort=True, observed=True).agg(
+        points=('payout_points', 'sum'), counted=('counted', 'sum'), approved=('approved', 'sum')).reset_index()
+    weekly['Calendar week'] = weekly['week_key'].map(week_labels)
+    weekly['Fundraiser Name'] = weekly['Fundraiser Name'].astype(str)
+    # Kept as entered (object dtype) so whole days still print as "5 days"
+    weekly['working_days'] = pd.Series([
+        working_days_by_week.get(week, {}).get(fundraiser_name)
+        for week, fundraiser_name in zip(weekly['Calendar week'], weekly['Fundraiser Name'])
+    ], index=weekly.index, dtype=object)
+    weekly = weekly[weekly['working_days'].notna()]
+
+    # Eligibility and payout per fundraiser-week, each with its week's rule set
+    weekly_eligible = rules.eligible(weekly['counted'], weekly['approved'], weekly['week_key'])
+    payouts = rules.payouts(weekly['points'], weekly['working_days'], weekly_eligible, weekly['week_key'])
+    if include_payouts:
+        count(fundraiser_weeks=len(weekly), team_leaders=sum(len(tls) for tls in team_leaders.values()))
+
+    team_data_by_week = {}
+    for i, (week, fundraiser_name, week_points, working_days) in enumerate(zip(
+            weekly['Calendar week'], weekly['Fundraiser Name'], weekly['points'], weekly['working_days'])):
+        payout_info = {
+            "daily_average": float(payouts['daily_average'][i]),
+            "payout": float(payouts['payout'][i]),
+            "rate": plain_number(payouts['rate'][i]),  # "Rate: €20", unpaid weeks "Rate: €0"
+            "bracket": payouts['bracket'][i]
+        }
+        weekly_fundraiser_payments.setdefault(week, {})[fundraiser_name] = {
+            "points": week_points,
+            "working_days": working_days,
+            "payout": payout_info
+        }
+        team_data_by_week.setdefault(week, {})[fundraiser_name] = {
+            "points": week_points,
+            "working_days": working_days
+        }
+
+    for week in weekly_fundraiser_payments:
+        team_data_for_week = team_data_by_week[week]
+
+        # Calculate team leader bonuses for this week
+        if week in team_leaders and team_leaders[week]:
+            logger.debug("Processing TL bonuses for %s: TLs = %s", week, team_leaders[week])
+            weekly_team_leader_bonuses[week] = {}
+
+            for tl_name, tl_working_days in team_leaders[week].items():
+                if tl_name in team_data_for_week:
+                    # Get specific team members for this TL
+                    tl_team_data = {tl_name: team_data_for_week[tl_name]}  # Include TL in their team
+
+                    # Add selected team members for this TL
+                    if week in team_assignments and tl_name in team_assignments[week]:
+                        for team_member in team_assignments[week][tl_name]:
+                            if team_member in team_data_for_week:
+                                tl_team_data[team_member] = team_data_for_week[team_member]
+                    else:
+                        # If no specific team assignments, include all other fundraisers as team members (backward compatibility)
+                        logger.info("No specific team assignments for TL %s in %s, using all fundraisers",
+                                    tl_name, week)
+                        for fundraiser_name, fundraiser_data in team_data_for_week.items():
+                            if fundraiser_name != tl_name:  # Don't duplicate the TL
+                                tl_team_data[fundraiser_name] = fundraiser_data
+
+                    # Calculate team bonus only for selected team members
+                    team_bonus_info = rules.team_leader_bonus_details(tl_team_data, label_keys[week])
+                    milestone_info = rules.milestone_details(len(tl_team_data), label_keys[week])
+
+                    if not team_bonus_info or 'bracket' not in team_bonus_info:
+                        logger.warning("Invalid team_bonus_info for %s in %s: %s", tl_name, week, team_bonus_info)
+
+                    if logger.isEnabledFor(logging.DEBUG):
+                        logger.debug("TL %s team in %s: %s (size: %d)", tl_name, week, list(tl_team_data),
+                                     len(tl_team_data))
+
+                    # Get team member names for this TL
+                    team_member_names = list(tl_team_data.keys())
+
+                    weekly_team_leader_bonuses[week][tl_name] = {
+                        "team_bonus": team_bonus_info,
+                        "milestones": milestone_info,
+                        "team_members": team_member_names
+                    }
+
+    # Create output dataframe with subtotals and payment info
+    final_rows = []
+
+    # Process data grouped by (year, week) and Fundraiser
+    weekly_groups = df_sorted[df_sorted['week_key'] > 0].groupby(['week_key', 'Fundraiser Name'],
+                                                                 sort=True, observed=True)
+    output = output_frame(df_sorted, required_columns)
+    logger.info("Processing %d calendar weeks", len(week_labels))
+
+    for (week_key, fundraiser_name), fundraiser_data in weekly_groups:
+        week = week_labels[week_key]
+
+        # Add all individual entries using vectorized operations
+        fundraiser_dicts = output.loc[fundraiser_data.index].to_dict('records')
+        for row_dict in fundraiser_dicts:
+            row_dict['bonus_status'] = ''
+            final_rows.append(row_dict)
+
+        # Add subtotal row
+        # Exclude cancelled donors from total points calculation
+        _, _, excluded = decode_status(fundraiser_data['status_code'])
+        total_points = fundraiser_data['points'][~excluded].sum()
+        bonus_status = fundraiser_data['bonus_status'].iloc[0]
+
+        subtotal_row = {
+            'Fundraiser ID': '',
+            'Fundraiser Name': '',
+            'Calendar week': '',
+            'Public RefID': '',
+            'Age': '',
+            'Interval': '',
+            'Amount Yearly': '',
+            'status_agency': '',
+            'points': f"Total: {total_points}",
+            'bonus_status': bonus_status
+        }
+        final_rows.append(subtotal_row)
+
+        # Add payment info for this fundraiser if we have weekly data
+        if week in weekly_fundraiser_payments and fundraiser_name in weekly_fundraiser_payments[week]:
+            payment_info = weekly_fundraiser_payments[week][fundraiser_name]
+
+            # Debug: check if payment_info has the expected structure
+            if 'payout' in payment_info and payment_info['payout']:
+                payout_data = payment_info['payout']
+                payout_row = {
+                    'Fundraiser ID': '',
+                    'Fundraiser Name': '',
+                    'Calendar week': '',
+                    'Public RefID': f"Payout ({payout_data.get('bracket', 'unknown')} avg)",
+                    'Age': '',
+                    'Interval': f"{payment_info.get('working_days', 0)} days",
+                    'Amount Yearly': f"€{payout_data.get('payout', 0):.2f}",
+                    'status_agency': f"Rate: €{payout_data.get('rate', 0)}",
+                    'points': f"Avg: {payout_data.get('daily_average', 0):.2f}",
+                    'bonus_status': ''
+                }
+                final_rows.append(payout_row)
+            else:
+                logger.warning("Invalid payment_info structure for %s in %s: %s", fundraiser_name, week, payment_info)
+
+    # Add weekly team leader bonus summary at the end
+    if weekly_team_leader_bonuses:
+        if logger.isEnabledFor(logging.DEBUG):
+            for week, bonuses in weekly_team_leader_bonuses.items():
+                logger.debug("Week %s has TL bonuses for: %s", week, list(bonuses))
+        final_rows.append({col: '' for col in required_columns})  # Empty separator row
+
+        final_rows.append({
+            'Fundraiser ID': '',
+            'Fundraiser Name': 'TEAMLEITER BONI (NACH WOCHE)',
+            'Calendar week': '',
+            'Public RefID': '',
+            'Age': '',
+            'Interval': '',
+            'Amount Yearly': '',
+            'status_agency': '',
+            'points': '',
+            'bonus_status': ''
+        })
+
+        for week in sorted(weekly_team_leader_bonuses, key=label_keys.get):
+            # Week header
+            final_rows.append({
+                'Fundraiser ID': '',
+                'Fundraiser Name': f"--- {week} ---",
+                'Calendar week': '',
+                'Public RefID': '',
+                'Age': '',
+                'Interval': '',
+                'Amount Yearly': '',
+                'status_agency': '',
+                'points': '',
+                'bonus_status': ''
+            })
+
+            for tl_name, bonus_info in weekly_team_leader_bonuses[week].items():
+                team_bonus = bonus_info['team_bonus']
+                milestones = bonus_info['milestones']
+                team_members = bonus_info.get('team_members', [])
+
+                # Create team member names string (limit length for CSV)
+                team_names_str = ", ".join(team_members[:3])  # Show max 3 names
+                if len(team_members) > 3:
+                    team_names_str += f" (+{len(team_members)-3} weitere)"
+
+                # Team performance bonus
+                final_rows.append({
+                    'Fundraiser ID': '',
+                    'Fundraiser Name': tl_name,
+                    'Calendar week': 'Team Bonus',
+                    'Public RefID': f"Team Ø: {team_bonus.get('team_average', 0):.2f}",
+                    'Age': team_names_str,
+                    'Interval': f"€{team_bonus.get('rate', 0)}/Punkt",
+                    'Amount Yearly': f"€{team_bonus.get('bonus', 0):.2f}",
+                    'status_agency': team_bonus.get('bracket', 'unbekannt'),
+                    'points': f"Gesamt: {team_bonus.get('team_points', 0):.1f} Pkt",
+                    'bonus_status': ''
+                })
+
+                # Milestone bonuses (potential)
+                final_rows.append({
+                    'Fundraiser ID': '',
+                    'Fundraiser Name': '',
+                    'Calendar week': 'Meilensteine',
+                    'Public RefID': f"Max möglich: €{milestones.get('total_possible', 0)}",
+                    'Age': milestones.get('team_size_bracket', 'unbekannt'),
+                    'Interval': f"Coach: €{milestones.get('communication_coach', 0)}",
+                    'Amount Yearly': f"Büro: €{milestones.get('communication_office', 0)}",
+                    'status_agency': f"Extern: €{milestones.get('external_presence', 0)}",
+                    'points': f"Material: €{milestones.get('material_responsibility', 0)}",
+                    'bonus_status': ''
+                })
+    
+    # Create final dataframe
+    progress.start('csv')
+    final_df = pd.DataFrame(final_rows)
+    count(rows=len(final_df))
+    
+    # Save with custom headers
+    current_date = datetime.datetime.now().strftime("%Y-%m-%d")
+    header_lines = [
+        f"WoVi_CW_Formatted_{current_date};Regelwerk {rules.version};" + ";" * (len(required_columns) - 2),
+        ";" * len(required_columns)
+    ]
+    
+    with open(output_file, 'w', encoding='utf-8-sig', newline='') as f:
+        # Write headers
+        for line in header_lines:
+            f.write(line + '\n')
+        
+        # Write column headers
+        f.write(';'.join(required_columns) + '\n')
+        
+        # Write data using vectorized operations
+        # Pre-process numeric formatting
+        final_df_copy = final_df.copy()
+        for col in required_columns:
+            if col == 'points':
+                # Format points column
+                mask = (final_df_copy[col].notna() &
+                       pd.to_numeric(final_df_copy[col], errors='coerce').notna() &
+                       ~final_df_copy[col].astype(str).str.startswith('Total:'))
+                final_df_copy.loc[mask, col] = final_df_copy.loc[mask, col].astype(str).str.replace('.', ',')
+
+            # Fill NaN and empty values
+            final_df_copy[col] = final_df_copy[col].fillna('').astype(str)
+
+        # Write all rows at once
+        for row_values in final_df_copy[required_columns].values:
+            f.write(';'.join(row_values) + '\n')
+    
+    # Generate PDF files
+    pdf_files = []
+    if generate_pdf:
+        try:
+            from pdf_generator import generate_all_pdf_files
+            pdf_files = generate_all_pdf_files(output_file, pdf_output_dir, rules=rules, week_keys=week_key_map(df),
+                                               progress=progress)
+            logger.info("Generated %d PDF files", len(pdf_files))
+        except Cancelled:
+            raise
+        except Exception as e:
+            logger.error("Error generating PDF files: %s", e, exc_info=True)
+
+    progress.finish()
+    return {"rows": len(final_df), "pdf_files": pdf_files, "rules_version": rules.version,
+            "preview": results_preview(df_sorted, week_labels, weekly, weekly_eligible, payouts)}
+
+
+def add_config_arguments(parser):
+    """Add the rules and team leader source options of PipelineConfig to an argparse parser."""
+    parser.add_argument('--rules', dest='rules_file',
+                        help='Rules JSON file (defaults to the bundled rules.json)')
+    parser.add_argument('--assignments', dest='assignments_file',
+                        help='Saved assignments file (defaults to the one the GUI saves to)')
+    parser.add_argument('--timesheet', dest='timesheet_file',
+                        help='Take working days and teams from this timesheet CSV/XLSX instead')
+    parser.add_argument('--default-days', type=float,
+                        help='Working days for fundraisers without saved or timesheet ones (default: fail)')
+
+
+def config_options(args):
+    """PipelineConfig keyword arguments from options added by add_config_arguments (rules loaded once)."""
+    return {
+        'rules': load_rules(args.rules_file),
+        'assignments_file': args.assignments_file,
+        'timesheet_file': args.timesheet_file,
+        'default_days': args.default_days,
+    }
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        description='Format an export with payouts and team leader bonuses from saved assignments (no dialog)')
+    parser.add_argument('input_file', help='Input CSV file path')
+    parser.add_argument('output_file', nargs='?', default=None,
+                        help='Output CSV file path (optional, defaults to input_formatted.csv)')
+    parser.add_argument('--merge', nargs='+', dest='merge_files', default=[], metavar='FILE',
+                        help='Further exports to process together with the input as one; '
+                             'donors in several files are counted once (by Public RefID)')
+    parser.add_argument('--pdf-dir', '-p', dest='pdf_output_dir',
+                        help='Custom directory for PDF output')
+    parser.add_argument('--no-pdf', action='store_true',
+                        help='Skip PDF generation')
+    add_config_arguments(parser)
+    add_report_arguments(parser)
+    add_logging_arguments(parser)
+
+    args = parser.parse_args()
+    configure_from_args(args)
+
+    input_files = [args.input_file] + args.merge_files if args.merge_files else args.input_file
+    config = PipelineConfig(input_files, args.output_file, args.pdf_output_dir, not args.no_pdf,
+                            **config_options(args))
+    try:
+        with RunReport(trace_memory=args.trace_memory, profile=args.profile) as report:
+            result = run(config)
+    except MissingWorkingDays as e:
+        parser.exit(1, f"{parser.prog}: {e}. Pass --default-days N for fundraisers without working days\n")
+
+    print("\nProcessing complete!")
+    print(f"CSV rows processed: {result['rows']}")
+    print(f"Output CSV: {result['output_file']}")
+    print(f"Rules version: {result['rules_version']}")
+    if result['pdf_files']:
+        print(f"PDF files generated: {len(result['pdf_files'])}")
+
+    report_files = report.write(report_path(result['output_file']))
+    print(f"\nRun report ({report.wall_s:.2f} s): {report_files[0]}")
+    print("\n".join(format_report(report)))
+    for profile_file in report_files[1:]:
+        print(f"Profile: {profile_file}")
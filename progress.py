@@ -0,0 +1,175 @@
+"""
+Stage progress and cancellation for long processing runs.
+
+format_csv, pipeline.process_export and the report generators take an
+optional Progress. They announce each stage with start() and report items
+inside a stage with advance(); both raise Cancelled once the run has been
+cancelled, so a run stops at the next stage or fundraiser boundary. Stage
+changes also go to the active instrument.RunReport, if any.
+"""
+import time
+
+import instrument
+
+# Stage name -> (label, relative weight). The weights are the rough share of
+# a typical run's time; only the stages a run plans are counted.
+STAGES = {
+    'parse': ("Reading export", 10),
+    'points': ("Calculating points", 3),
+    'eligibility': ("Checking bonus eligibility", 2),
+    'selection': ("Waiting for team leader selection", 0),
+    'payouts': ("Calculating payouts", 3),
+    'csv': ("Writing CSV", 7),
+    'render': ("Generating reports", 75),
+}
+
+
+class Cancelled(Exception):
+    """The run was cancelled through its Progress."""
+
+
+class Progress:
+    """
+    Weighted progress over a run's stages, with an ETA and cancellation.
+
+    Each update passed to the callback is a dict with 'stage', 'label',
+    'done' and 'total' (items of the current stage), 'fraction' (0-1 over
+    the whole run) and 'eta' (seconds left, None until measurable).
+
+    The ETA uses measured throughput: items per second for the rest of the
+    current stage, weight per second of the finished stages for the stages
+    still to come. Time in zero-weight stages (waiting for the user) does
+    not count.
+    """
+
+    def __init__(self, callback=None, cancel_event=None, clock=time.monotonic):
+        """
+        Args:
+            callback: Optional callable receiving each update dict
+            cancel_event: Optional object with is_set(), e.g. a threading or
+                multiprocessing Event; once set, start() and advance() raise Cancelled
+            clock: Time source in seconds (for tests)
+        """
+        self.callback = callback
+        self.cancel_event = cancel_event
+        self.clock = clock
+        self.stages = None
+        self.stage = None
+        self.done = 0
+        self.total = 1
+        self.completed_weight = 0.0
+        self.weighted_seconds = 0.0
+        self.stage_started = None
+
+    def plan(self, stages):
+        """
+        Set the stages this run goes through, in order.
+
+        Only the first call counts, so the outermost function decides and
+        nested calls (e.g. generate_all_pdf_files from format_csv) keep it.
+        """
+        if self.stages is None:
+            self.stages = list(stages)
+
+    def start(self, stage, total=1):
+        """Finish the current stage and begin the next one with total items."""
+        self.check_cancelled()
+        if self.stages is None:
+            self.stages = [stage]
+        self._finish_stage()
+        instrument.begin_stage(stage)
+        self.stage = stage
+        self.done = 0
+        self.total = max(int(total), 1)
+        self.stage_started = self.clock()
+        self._report()
+
+    def advance(self, count=1):
+        """Count items of the current stage as done."""
+        self.done = min(self.done + count, self.total)
+        self._report()
+        self.check_cancelled()
+
+    def finish(self):
+        """Mark the run as complete."""
+        self._finish_stage()
+        instrument.end_stage()
+        self.stage = None
+        self.done = self.total = 1
+        self._report()
+
+    def cancelled(self):
+        return self.cancel_event is not None and self.cancel_event.is_set()
+
+    def check_cancelled(self):
+        if self.cancelled():
+            raise Cancelled("Processing was cancelled")
+
+    def _weight(self, stage):
+        return STAGES.get(stage, ("", 1))[1]
+
+    def _planned_weight(self):
+        return sum(self._weight(stage) for stage in self.stages or []) or 1
+
+    def _finish_stage(self):
+        if self.stage is None:
+            return
+        weight = self._weight(self.stage)
+        self.completed_weight += weight
+        if weight:
+            self.weighted_seconds += self.clock() - self.stage_started
+
+    def fraction(self):
+        current = self._weight(self.stage) * self.done / self.total if self.stage else 0
+        return min((self.completed_weight + current) / self._planned_weight(), 1.0)
+
+    def eta(self):
+        """Seconds left for the run, or None while there is nothing to measure yet."""
+        if self.stage is None:
+            return 0.0 if self.completed_weight else None
+
+        elapsed = self.clock() - self.stage_started
+        weight = self._weight(self.stage)
+        remaining = 0.0
+        if 0 < self.done < self.total:
+            # Rest of this stage at its own item rate
+            remaining += elapsed / self.done * (self.total - self.done)
+            left_weight = 0
+        else:
+            left_weight = weight * (1 - self.done / self.total)
+
+        stages = self.stages or []
+        later = stages[stages.index(self.stage) + 1:] if self.stage in stages else []
+        left_weight += sum(self._weight(stage) for stage in later)
+        if left_weight:
+            # Everything else at the weight rate measured so far
+            weight_done = self.completed_weight + weight * self.done / self.total
+            seconds = self.weighted_seconds + (elapsed if weight and self.done else 0)
+            if not weight_done or not seconds:
+                return None
+            remaining += left_weight * seconds / weight_done
+        return remaining
+
+    def _report(self):
+        if self.callback is None:
+            return
+        label = STAGES.get(self.stage, (self.stage or "Done", 0))[0]
+        self.callback({
+            'stage': self.stage,
+            'label': label,
+            'done': self.done,
+            'total': self.total,
+            'fraction': self.fraction(),
+            'eta': self.eta(),
+        })
+
+
+def format_update(update):
+    """One-line status text for a progress update, e.g. 'Generating reports 3/40 (~12 s left)'."""
+    text = update['label']
+    if update['total'] > 1:
+        text += f" {update['done']}/{update['total']}"
+    eta = update['eta']
+    if eta is not None and update['stage'] is not None:
+        text += f" (~{eta:.0f} s left)" if eta < 90 else f" (~{eta / 60:.0f} min left)"
+    return text
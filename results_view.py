@@ -0,0 +1,329 @@
+"""
+Results window: per fundraiser-week aggregates with a drill-down into donor rows.
+
+The data is pipeline.results_preview's column arrays. Sorting and filtering
+work on index arrays over them, and the Treeview only ever holds
+TABLE_ROWS items that are refilled as the view scrolls, so exports with
+100k donor rows scroll as smoothly as small ones.
+"""
+import tkinter as tk
+from tkinter import ttk
+
+import numpy as np
+
+# Items the Treeview holds; scrolling refills them
+TABLE_ROWS = 25
+
+# Milliseconds of typing pause before the filter is applied
+FILTER_DELAY_MS = 200
+
+
+def _text(value):
+    return "" if value is None else str(value)
+
+
+def _number(value):
+    return "" if np.isnan(value) else f"{value:g}"
+
+
+def _euro(value):
+    return "" if np.isnan(value) else f"{value:.2f} €"
+
+
+def _percent(value):
+    return "" if np.isnan(value) else f"{value:.0%}"
+
+
+def _yes_no(value):
+    return "Yes" if value else "No"
+
+
+# (key in the preview arrays, heading, width, formatter)
+WEEK_COLUMNS = [
+    ('week', "Week", 80, _text),
+    ('fundraiser', "Fundraiser", 200, _text),
+    ('donors', "Donors", 70, _number),
+    ('points', "Points", 70, _number),
+    ('approval', "Approved", 80, _percent),
+    ('eligible', "Eligible", 70, _yes_no),
+    ('days', "Days", 60, _number),
+    ('average', "Avg/Day", 70, _number),
+    ('bracket', "Bracket", 110, _text),
+    ('payout', "Payout", 90, _euro),
+]
+
+DONOR_COLUMNS = [
+    ('week', "Week", 80, _text),
+    ('fundraiser', "Fundraiser", 180, _text),
+    ('refid', "Public RefID", 120, _text),
+    ('age', "Age", 50, _number),
+    ('interval', "Interval", 90, _text),
+    ('amount', "Amount Yearly", 100, _number),
+    ('status', "Status", 150, _text),
+    ('points', "Points", 60, _number),
+]
+
+# Columns sorted by another array than the one shown ("18/2025" labels sort by week key)
+SORT_BY = {'week': 'week_key'}
+
+
+def search_keys(data, columns):
+    """Lower-case text of each row as displayed, for substring filtering."""
+    texts = [map(formatter, data[key]) for key, _, _, formatter in columns]
+    return np.array(["\t".join(row).lower() for row in zip(*texts)], dtype=str)
+
+
+class VirtualTable:
+    """
+    ttk.Treeview over column arrays that only holds the visible rows.
+
+    The table shows data rows through `order`, an index array that sorting
+    and filtering rebuild; the Treeview keeps a fixed pool of items whose
+    values are rewritten from order[first:first + rows] on every scroll.
+    """
+
+    def __init__(self, parent, columns, rows=TABLE_ROWS, on_open=None):
+        """
+        Args:
+            parent: Tk container
+            columns: List of (key, heading, width, formatter) tuples
+            rows: Number of visible rows
+            on_open: Optional callable receiving the data index of a
+                double-clicked or Enter-pressed row
+        """
+        self.columns = columns
+        self.rows = rows
+        self.on_open = on_open
+        self.data = {}
+        self.search = None
+        self.base = np.arange(0)    # rows this table may show at all
+        self.sorted = self.base     # base in the current sort order
+        self.order = self.base      # sorted rows that pass the filter
+        self._filter_mask = None
+        self.first = 0
+        self.sort_key = None
+        self.descending = False
+
+        self.frame = tk.Frame(parent)
+        self.tree = ttk.Treeview(self.frame, columns=[key for key, _, _, _ in columns], show="headings",
+                                 height=rows, selectmode="browse")
+        for key, heading, width, _ in columns:
+            self.tree.heading(key, text=heading, command=lambda k=key: self.sort(k))
+            self.tree.column(key, width=width, anchor="w", stretch=True)
+        self.scrollbar = ttk.Scrollbar(self.frame, orient="vertical", command=self.yview)
+        self.scrollbar.pack(side="right", fill="y")
+        self.tree.pack(side="left", fill="both", expand=True)
+
+        self.slots = [self.tree.insert("", "end", iid=f"slot{index}") for index in range(rows)]
+        self.attached = rows
+
+        for sequence in ("<MouseWheel>", "<Button-4>", "<Button-5>"):
+            self.tree.bind(sequence, self._on_wheel)
+        self.tree.bind("<Double-1>", self._on_open)
+        self.tree.bind("<Return>", self._on_open)
+        self.tree.bind("<Prior>", lambda event: self._scroll_key(-self.rows))
+        self.tree.bind("<Next>", lambda event: self._scroll_key(self.rows))
+        self.tree.bind("<Up>", lambda event: self._move_selection(-1))
+        self.tree.bind("<Down>", lambda event: self._move_selection(1))
+
+    def set_data(self, data, search=None, base=None):
+        """
+        Show new column arrays.
+
+        Args:
+            data: Dictionary of equally long arrays, one per column key
+            search: Optional precomputed search_keys(data, columns); built
+                on the first filter otherwise and kept while data stays the same
+            base: Optional index array of the rows to show (default: all)
+        """
+        if data is not self.data or search is not None:
+            self.search = search
+        self.data = data
+        length = len(next(iter(data.values()))) if data else 0
+        self.base = np.arange(length) if base is None else np.asarray(base)
+        self.sort_key = None
+        self.descending = False
+        self.sorted = self.base
+        self.order = self.base
+        self._filter_mask = None
+        self._update_headings()
+        self._scroll_to(0)
+
+    def sort(self, key):
+        """Sort by a column; sorting by the same column again reverses the order."""
+        self.descending = key == self.sort_key and not self.descending
+        self.sort_key = key
+        values = np.asarray(self.data.get(SORT_BY.get(key), self.data[key]))[self.base]
+        if values.dtype == object:
+            values = values.astype(str)
+        # Stable, so equal values stay in export order
+        ranks = np.argsort(values, kind="stable")
+        if self.descending:
+            ranks = ranks[::-1]
+        self.sorted = self.base[ranks]
+        self._apply(self._filter_mask)
+        self._update_headings()
+
+    def filter(self, text):
+        """Show only rows whose columns contain text (case-insensitive)."""
+        text = text.strip().lower()
+        if text and self.search is None:
+            self.search = search_keys(self.data, self.columns)
+        self._filter_mask = np.char.find(self.search, text) >= 0 if text else None
+        self._apply(self._filter_mask)
+
+    def row_count(self):
+        """(rows shown, rows in the table before filtering)."""
+        return len(self.order), len(self.base)
+
+    def yview(self, *args):
+        """Scrollbar command ('moveto', fraction) or ('scroll', n, 'units'/'pages')."""
+        if args[0] == "moveto":
+            self._scroll_to(round(float(args[1]) * len(self.order)))
+        elif args[0] == "scroll":
+            step = int(args[1]) * (self.rows if args[2] == "pages" else 1)
+            self._scroll_to(self.first + step)
+
+    def _apply(self, mask):
+        self.order = self.sorted if mask is None else self.sorted[mask[self.sorted]]
+        self._scroll_to(0)
+
+    def _update_headings(self):
+        for key, heading, _, _ in self.columns:
+            arrow = (" ▼" if self.descending else " ▲") if key == self.sort_key else ""
+            self.tree.heading(key, text=heading + arrow)
+
+    def _on_wheel(self, event):
+        up = event.num == 4 or getattr(event, "delta", 0) > 0
+        self._scroll_to(self.first + (-3 if up else 3))
+        return "break"
+
+    def _scroll_key(self, step):
+        self._scroll_to(self.first + step)
+        return "break"
+
+    def _move_selection(self, step):
+        """Arrow keys move the selection and scroll when it leaves the window."""
+        selected = self.tree.selection()
+        slot = self.slots.index(selected[0]) if selected else -1
+        target = slot + step
+        if target < 0 or target >= min(self.rows, len(self.order) - self.first):
+            self._scroll_to(self.first + step, keep_selection=True)
+            target = min(max(target, 0), self.attached - 1)
+        if self.attached:
+            self.tree.selection_set(self.slots[target])
+            self.tree.focus(self.slots[target])
+        return "break"
+
+    def _scroll_to(self, first, keep_selection=False):
+        self.first = max(0, min(first, len(self.order) - self.rows))
+        if not keep_selection:
+            # The selection belongs to a pooled item, not to a data row
+            self.tree.selection_remove(self.tree.selection())
+        self._draw()
+
+    def _draw(self):
+        visible = self.order[self.first:self.first + self.rows]
+        for slot, index in zip(self.slots, visible):
+            self.tree.item(slot, values=[formatter(self.data[key][index]) for key, _, _, formatter in self.columns])
+
+        # Items past the end of a short view are detached, not deleted
+        if len(visible) < self.attached:
+            self.tree.detach(*self.slots[len(visible):self.attached])
+        for position in range(self.attached, len(visible)):
+            self.tree.move(self.slots[position], "", position)
+        self.attached = len(visible)
+
+        total = len(self.order)
+        if total:
+            self.scrollbar.set(self.first / total, min(self.first + self.rows, total) / total)
+        else:
+            self.scrollbar.set(0, 1)
+
+    def _on_open(self, event):
+        selected = self.tree.selection()
+        if self.on_open is None or not selected:
+            return
+        self.on_open(int(self.order[self.first + self.slots.index(selected[0])]))
+
+
+class ResultsWindow:
+    """Toplevel with the week summary of a run; double-click a row for its donors."""
+
+    def __init__(self, parent, preview, colors, title="Results"):
+        """
+        Args:
+            parent: Tk root
+            preview: pipeline.results_preview dictionary
+            colors: The app's theme colors
+            title: Window title
+        """
+        self.weeks = preview['weeks']
+        self.donors = preview['donors']
+        self.colors = colors
+        self.group = None
+
+        self.window = tk.Toplevel(parent)
+        self.window.title(title)
+        self.window.geometry("1000x640")
+        self.window.configure(bg=colors['bg'])
+
+        top = tk.Frame(self.window, bg=colors['bg'])
+        top.pack(fill="x", padx=10, pady=10)
+        self.back_btn = tk.Button(top, text="← Weeks", font=("Helvetica", 10),
+                                  bg=colors['button'], fg=colors['button_text'],
+                                  command=self.show_weeks, cursor="hand2")
+        self.title_label = tk.Label(top, font=("Helvetica", 12, "bold"), bg=colors['bg'], fg=colors['fg'])
+        self.title_label.pack(side="left")
+        self.filter_var = tk.StringVar()
+        tk.Entry(top, textvariable=self.filter_var, width=30, font=("Helvetica", 10),
+                 bg=colors['entry'], fg=colors['entry_text']).pack(side="right")
+        tk.Label(top, text="Filter:", font=("Helvetica", 10),
+                 bg=colors['bg'], fg=colors['fg']).pack(side="right", padx=(0, 5))
+        self.filter_var.trace_add("write", self._schedule_filter)
+        self.filter_job = None
+
+        body = tk.Frame(self.window, bg=colors['bg'])
+        body.pack(fill="both", expand=True, padx=10)
+        self.week_table = VirtualTable(body, WEEK_COLUMNS, on_open=self.show_donors)
+        self.week_table.set_data(self.weeks)
+        self.donor_table = VirtualTable(body, DONOR_COLUMNS)
+
+        self.count_label = tk.Label(self.window, font=("Helvetica", 10),
+                                    bg=colors['bg'], fg=colors['fg_secondary'])
+        self.count_label.pack(anchor="w", padx=10, pady=10)
+
+        self.show_weeks()
+
+    def show_weeks(self):
+        self.group = None
+        self.donor_table.frame.pack_forget()
+        self.back_btn.pack_forget()
+        self.week_table.frame.pack(fill="both", expand=True)
+        self.title_label.config(text="Fundraiser weeks (double-click for donor rows)")
+        self._apply_filter()
+
+    def show_donors(self, group):
+        self.group = group
+        rows = np.flatnonzero(self.donors['group'] == group)
+        self.donor_table.set_data(self.donors, base=rows)
+        self.week_table.frame.pack_forget()
+        self.donor_table.frame.pack(fill="both", expand=True)
+        self.back_btn.pack(side="left", padx=(0, 10), before=self.title_label)
+        self.title_label.config(text=f"{self.weeks['fundraiser'][group]}, {self.weeks['week'][group]}")
+        self._apply_filter()
+
+    def _table(self):
+        return self.week_table if self.group is None else self.donor_table
+
+    def _schedule_filter(self, *args):
+        if self.filter_job is not None:
+            self.window.after_cancel(self.filter_job)
+        self.filter_job = self.window.after(FILTER_DELAY_MS, self._apply_filter)
+
+    def _apply_filter(self):
+        self.filter_job = None
+        table = self._table()
+        table.filter(self.filter_var.get())
+        shown, total = table.row_count()
+        self.count_label.config(text=f"{shown:,} of {total:,} rows")
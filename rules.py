@@ -0,0 +1,660 @@
+import bisect
+import json
+import math
+import os
+import sys
+import hashlib
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+from weeks import parse_iso_week, format_iso_week
+
+RULES_FILENAME = "rules.json"
+
+# Sections a rule set may define; everything else in rules.json is shared
+RULE_SECTIONS = ('points', 'eligibility', 'payout', 'team_leader', 'milestones')
+
+# Open-ended validity for rule sets without valid_from / valid_to
+MIN_WEEK_KEY = 0
+MAX_WEEK_KEY = 999999
+
+# Bit flags of the uint8 status code a donor row's agency status maps to
+STATUS_COUNTED = 1
+STATUS_APPROVED = 2
+STATUS_EXCLUDED = 4
+
+
+def default_rules_path():
+    """Path of the bundled rules file, works for dev and PyInstaller bundle"""
+    # PyInstaller unpacks data files into _MEIPASS
+    base_path = getattr(sys, '_MEIPASS', os.path.dirname(os.path.abspath(__file__)))
+    return os.path.join(base_path, RULES_FILENAME)
+
+
+def normalize_status(status):
+    """Normalize an agency status so 'conditionally-approved' and 'Conditionally Approved' match."""
+    return str(status).strip().lower().replace('-', ' ').replace('_', ' ')
+
+
+def _brackets(section, key, name):
+    """Validate a list of {key, rate, label} brackets and return (edges, rates, labels)."""
+    brackets = section.get('brackets')
+    if not isinstance(brackets, list) or not brackets:
+        raise ValueError(f"'{name}.brackets' must be a non-empty list")
+
+    brackets = sorted(brackets, key=lambda b: b[key])
+    if brackets[0][key] != 0:
+        raise ValueError(f"The first bracket in '{name}' must start at {key} 0")
+
+    for bracket in brackets:
+        for field in (key, 'rate', 'label'):
+            if field not in bracket:
+                raise ValueError(f"Bracket in '{name}' is missing '{field}': {bracket}")
+
+    edges = np.array([b[key] for b in brackets[1:]], dtype=float)
+    rates = np.array([b['rate'] for b in brackets], dtype=float)
+    labels = np.array([b['label'] for b in brackets], dtype=object)
+    return edges, rates, labels
+
+
+class Intervals:
+    """Interval names and match patterns shared by all rule sets."""
+
+    def __init__(self, data):
+        intervals = data.get('intervals')
+        if not isinstance(intervals, dict) or not intervals:
+            raise ValueError("'intervals' must map interval names to match patterns")
+
+        self.names = list(intervals.keys())
+        self.patterns = [[p.lower() for p in intervals[name]] for name in self.names]
+
+        default = data.get('default_interval', self.names[-1])
+        if default not in intervals:
+            raise ValueError(f"'default_interval' {default!r} is not a known interval")
+        self.default = self.names.index(default)
+        self._code_cache = {}
+
+    def codes(self, intervals):
+        """Map interval strings to indices into names."""
+        inverse, uniques = _factorize_strings(intervals)
+        unique_codes = np.array([self.code(value) for value in uniques], dtype=np.int8)
+        return unique_codes[inverse]
+
+    def code(self, interval):
+        """Index into names of one interval string (missing values get the default)."""
+        value = '' if interval is None or pd.isna(interval) else str(interval).lower()
+        if value not in self._code_cache:
+            self._code_cache[value] = next((code for code, patterns in enumerate(self.patterns)
+                                            if any(pattern in value for pattern in patterns)), self.default)
+        return self._code_cache[value]
+
+
+class RuleSet:
+    """
+    One rule set validated and compiled into NumPy lookup tables.
+
+    All lookups are vectorized: they accept scalars, lists, NumPy arrays or
+    pandas Series and return NumPy arrays.
+    """
+
+    def __init__(self, data, intervals):
+        self.data = data
+        self.id = str(data.get('id', 'default'))
+        self.valid_from = parse_iso_week(data['valid_from']) if data.get('valid_from') else MIN_WEEK_KEY
+        self.valid_to = parse_iso_week(data['valid_to']) if data.get('valid_to') else MAX_WEEK_KEY
+        if self.valid_to < self.valid_from:
+            raise ValueError(f"Rule set '{self.id}' ends before it starts")
+
+        self.intervals = intervals
+        self._compile_points(data)
+        self._compile_statuses(data)
+
+        self.payout_edges, self.payout_rates, self.payout_labels = _brackets(
+            data.get('payout', {}), 'min_average', 'payout')
+
+        team_leader = data.get('team_leader', {})
+        self.tl_min_team_size = int(team_leader.get('min_team_size', 0))
+        self.tl_edges, self.tl_rates, self.tl_labels = _brackets(
+            team_leader, 'min_average', 'team_leader')
+
+        self._compile_milestones(data)
+
+    # Compilation
+
+    def _compile_points(self, data):
+        points = data.get('points', {})
+        flat = sorted(points.get('flat_by_age', []), key=lambda r: r['below_age'])
+        table = sorted(points.get('table', []), key=lambda r: r['min_amount'])
+        age_bonus = points.get('age_bonus', [])
+
+        if not table or table[0]['min_amount'] != 0:
+            raise ValueError("'points.table' must be non-empty and start at min_amount 0")
+
+        for row in flat + table:
+            missing = [name for name in self.intervals.names if name not in row]
+            if missing:
+                raise ValueError(f"Point row {row} is missing intervals: {missing}")
+
+        self.amount_edges = np.array([r['min_amount'] for r in table[1:]], dtype=float)
+        self.age_edges = np.array(sorted({r['below_age'] for r in flat} |
+                                         {b['min_age'] for b in age_bonus}), dtype=float)
+
+        amount_table = np.array([[row[name] for name in self.intervals.names] for row in table],
+                                dtype=float).T  # (interval, amount bin)
+
+        # One slab per age band: flat points below the flat age limits,
+        # otherwise the amount table plus any age bonus that applies.
+        slabs = []
+        lower_bounds = np.concatenate([[0.0], self.age_edges])
+        for lower in lower_bounds:
+            flat_row = next((r for r in flat if lower < r['below_age']), None)
+            if flat_row is not None:
+                values = np.array([flat_row[name] for name in self.intervals.names], dtype=float)
+                slab = np.repeat(values[:, None], len(table), axis=1)
+            else:
+                bonus = sum(b['points'] for b in age_bonus if lower >= b['min_age'])
+                slab = amount_table + bonus
+            slabs.append(slab)
+
+        self.points_table = np.stack(slabs)  # (age band, interval, amount bin)
+        # Plain lists for the scalar lookup (donor_points)
+        self._age_edge_list = self.age_edges.tolist()
+        self._amount_edge_list = self.amount_edges.tolist()
+        self._points_list = self.points_table.tolist()
+
+        self.excluded_statuses = {normalize_status(s) for s in points.get('excluded_statuses', [])}
+
+    def _compile_statuses(self, data):
+        eligibility = data.get('eligibility', {})
+        try:
+            self.min_approval_rate = float(eligibility['min_approval_rate'])
+        except (KeyError, TypeError, ValueError):
+            raise ValueError("'eligibility.min_approval_rate' must be a number")
+
+        self.counted_statuses = {normalize_status(s) for s in eligibility.get('counted_statuses', [])}
+        self.approved_statuses = {normalize_status(s) for s in eligibility.get('approved_statuses', [])}
+        if not self.approved_statuses <= self.counted_statuses:
+            raise ValueError("Every approved status must also be a counted status")
+
+    def _compile_milestones(self, data):
+        milestones = data.get('milestones', {})
+        self.milestone_categories = list(milestones.get('categories', []))
+        tiers = sorted(milestones.get('tiers', []), key=lambda t: t['min_team_size'])
+        if not tiers or tiers[0]['min_team_size'] != 0:
+            raise ValueError("'milestones.tiers' must be non-empty and start at min_team_size 0")
+
+        self.milestone_edges = np.array([t['min_team_size'] for t in tiers[1:]], dtype=float)
+        self.milestone_amounts = np.array(
+            [[tier.get(category, tier.get('amount', 0)) for category in self.milestone_categories]
+             for tier in tiers], dtype=float)  # (tier, category)
+
+    # Lookups
+
+    def status_masks(self, statuses):
+        """Return (counted, approved, excluded) boolean arrays for agency statuses."""
+        inverse, uniques = _factorize_strings(statuses)
+        normalized = [normalize_status(u) for u in uniques]
+
+        counted = np.array([s in self.counted_statuses for s in normalized], dtype=bool)
+        approved = np.array([s in self.approved_statuses for s in normalized], dtype=bool)
+        excluded = np.array([s in self.excluded_statuses for s in normalized], dtype=bool)
+        return counted[inverse], approved[inverse], excluded[inverse]
+
+    def points(self, ages, intervals, amounts):
+        """Vectorized point lookup for donors."""
+        ages = pd.to_numeric(_as_series(ages), errors='coerce').fillna(0)
+        amounts = pd.to_numeric(_as_series(amounts), errors='coerce').fillna(0)
+
+        age_band = np.searchsorted(self.age_edges, np.floor(ages.to_numpy(dtype=float)), side='right')
+        amount_bin = np.searchsorted(self.amount_edges, amounts.to_numpy(dtype=float), side='right')
+        return self.points_table[age_band, self.intervals.codes(intervals), amount_bin]
+
+    def eligible(self, counted, approved):
+        """Apply the approval-rate rule to counted/approved donor totals."""
+        counted = np.asarray(counted, dtype=float)
+        approved = np.asarray(approved, dtype=float)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            rate = np.where(counted > 0, approved / np.where(counted > 0, counted, 1), 0.0)
+        return (counted > 0) & (rate >= self.min_approval_rate)
+
+    def payout_brackets(self, daily_average):
+        """Return bracket indices into payout_rates/payout_labels."""
+        return np.searchsorted(self.payout_edges, np.asarray(daily_average, dtype=float), side='right')
+
+    def team_leader_brackets(self, team_average):
+        """Return bracket indices into tl_rates/tl_labels."""
+        return np.searchsorted(self.tl_edges, np.asarray(team_average, dtype=float), side='right')
+
+    def milestone_tiers(self, team_size):
+        """Return tier indices into milestone_amounts."""
+        return np.searchsorted(self.milestone_edges, np.asarray(team_size, dtype=float), side='right')
+
+    # Scalar helpers returning the dictionaries used by the GUI, CSV and PDF code
+
+    def donor_points(self, age, interval, amount):
+        """Points for one donor, as points() without building arrays."""
+        age_band = bisect.bisect_right(self._age_edge_list, math.floor(_scalar_number(age)))
+        amount_bin = bisect.bisect_right(self._amount_edge_list, _scalar_number(amount))
+        return self._points_list[age_band][self.intervals.code(interval)][amount_bin]
+
+    def eligibility_status(self, statuses):
+        """Return 'eligible' or 'not-eligible' for one group of donor statuses."""
+        counted, approved, _ = self.status_masks(statuses)
+        return 'eligible' if self.eligible(counted.sum(), approved.sum()) else 'not-eligible'
+
+    def payout_details(self, points, working_days, bonus_eligible=True):
+        """Calculate payout for a regular fundraiser (see calculate_regular_fundraiser_payout)."""
+        if working_days <= 0:
+            return {"daily_average": 0, "payout": 0, "rate": 0, "bracket": "keine Arbeitstage"}
+
+        daily_average = points / working_days
+
+        if not bonus_eligible:
+            return {"daily_average": daily_average, "payout": 0, "rate": 0, "bracket": "nicht gewährt"}
+
+        bracket = int(self.payout_brackets(daily_average))
+        rate = plain_number(self.payout_rates[bracket])
+        return {
+            "daily_average": daily_average,
+            "payout": points * rate,
+            "rate": rate,
+            "bracket": str(self.payout_labels[bracket])
+        }
+
+    def team_leader_bonus_details(self, team_data):
+        """Calculate team leader bonus for {fundraiser: {"points", "working_days"}} (TL included)."""
+        team_size = len(team_data) if team_data else 0
+        result = {
+            "bonus": 0,
+            "team_average": 0,
+            "rate": 0,
+            "bracket": "kein Bonus",
+            "team_size": team_size,
+            "team_points": 0
+        }
+
+        if team_size < self.tl_min_team_size:
+            result["bracket"] = ""
+            return result
+
+        team_points = sum(data["points"] for data in team_data.values())
+        team_working_days = sum(data["working_days"] for data in team_data.values())
+
+        if team_working_days <= 0:
+            result["bracket"] = "keine Arbeitstage"
+            return result
+
+        team_average = team_points / team_working_days
+        bracket = int(self.team_leader_brackets(team_average))
+        rate = float(self.tl_rates[bracket])
+
+        result.update({
+            "bonus": team_points * rate,
+            "team_average": team_average,
+            "rate": rate,
+            "bracket": str(self.tl_labels[bracket]),
+            "team_points": team_points
+        })
+        return result
+
+    def milestone_details(self, team_size):
+        """Return milestone bonus amounts for a team of the given size."""
+        amounts = self.milestone_amounts[int(self.milestone_tiers(team_size))]
+        result = {category: plain_number(amount)
+                  for category, amount in zip(self.milestone_categories, amounts)}
+        result["total_possible"] = plain_number(amounts.sum())
+        result["team_size_bracket"] = f"{team_size} persons"
+        return result
+
+
+class RuleSetStack:
+    """
+    Lookup tables of several rule sets stacked along a leading rule set axis.
+
+    Tables are padded to a common shape, so every lookup takes a 'sets' array
+    with the rule set index of each row and evaluates all rows in one pass,
+    whichever set they belong to.
+    """
+
+    def __init__(self, rule_sets, intervals):
+        self.rule_sets = list(rule_sets)
+        self.intervals = intervals
+
+        self.age_edges = _pad_edges([rule_set.age_edges for rule_set in self.rule_sets])
+        self.amount_edges = _pad_edges([rule_set.amount_edges for rule_set in self.rule_sets])
+        shape = (self.age_edges.shape[1] + 1, len(intervals.names), self.amount_edges.shape[1] + 1)
+        self.points_table = np.stack([
+            np.pad(rule_set.points_table,
+                   [(0, target - size) for target, size in zip(shape, rule_set.points_table.shape)],
+                   mode='edge')
+            for rule_set in self.rule_sets
+        ])  # (rule set, age band, interval, amount bin)
+
+        self.min_approval_rate = np.array([rule_set.min_approval_rate for rule_set in self.rule_sets])
+
+        self.payout_edges = _pad_edges([rule_set.payout_edges for rule_set in self.rule_sets])
+        self.payout_rates = _pad_rows([rule_set.payout_rates for rule_set in self.rule_sets])
+        self.payout_labels = _pad_rows([rule_set.payout_labels for rule_set in self.rule_sets])
+
+    def points(self, sets, ages, intervals, amounts):
+        """Point lookup for donors, row i scored with rule set sets[i]."""
+        ages = pd.to_numeric(_as_series(ages), errors='coerce').fillna(0).to_numpy(dtype=float)
+        amounts = pd.to_numeric(_as_series(amounts), errors='coerce').fillna(0).to_numpy(dtype=float)
+
+        age_band = _stacked_bins(self.age_edges, sets, np.floor(ages))
+        amount_bin = _stacked_bins(self.amount_edges, sets, amounts)
+        return self.points_table[sets, age_band, self.intervals.codes(intervals), amount_bin]
+
+    def status_codes(self, sets, statuses):
+        """Return uint8 STATUS_* flag codes, row i classified by rule set sets[i]."""
+        inverse, uniques = _factorize_strings(statuses)
+        normalized = [normalize_status(u) for u in uniques]
+
+        codes = np.array([[STATUS_COUNTED * (status in rule_set.counted_statuses) |
+                           STATUS_APPROVED * (status in rule_set.approved_statuses) |
+                           STATUS_EXCLUDED * (status in rule_set.excluded_statuses) for status in normalized]
+                          for rule_set in self.rule_sets], dtype=np.uint8).reshape(len(self.rule_sets), len(uniques))
+        return codes[sets, inverse]
+
+    def status_masks(self, sets, statuses):
+        """Return (counted, approved, excluded) boolean arrays, row i classified by rule set sets[i]."""
+        return decode_status(self.status_codes(sets, statuses))
+
+    def eligible(self, sets, counted, approved):
+        """Apply each row's approval-rate rule to counted/approved donor totals."""
+        counted = np.atleast_1d(np.asarray(counted, dtype=float))
+        approved = np.atleast_1d(np.asarray(approved, dtype=float))
+        rate = approved / np.where(counted > 0, counted, 1)
+        return (counted > 0) & (rate >= self.min_approval_rate[sets])
+
+    def payouts(self, sets, points, working_days, bonus_eligible):
+        """
+        Regular fundraiser payout, row i paid by rule set sets[i].
+
+        Returns:
+            Dictionary of arrays: daily_average, payout, rate, bracket
+        """
+        points = np.atleast_1d(np.asarray(points, dtype=float))
+        working_days = np.atleast_1d(np.asarray(working_days, dtype=float))
+        bonus_eligible = np.broadcast_to(np.asarray(bonus_eligible, dtype=bool), points.shape)
+
+        has_days = working_days > 0
+        daily_average = np.where(has_days, points / np.where(has_days, working_days, 1), 0.0)
+        bracket = _stacked_bins(self.payout_edges, sets, daily_average)
+
+        paid = has_days & bonus_eligible
+        rate = np.where(paid, self.payout_rates[sets, bracket], 0.0)
+        labels = np.where(~has_days, "keine Arbeitstage",
+                          np.where(~bonus_eligible, "nicht gewährt", self.payout_labels[sets, bracket]))
+        return {
+            "daily_average": daily_average,
+            "payout": points * rate,
+            "rate": rate,
+            "bracket": labels.astype(object)
+        }
+
+
+class CompiledRules:
+    """
+    Rules file compiled into effective-dated rule sets.
+
+    Each rule set is valid for a range of ISO weeks. The lookup tables of all
+    sets are stacked (padded to a common shape), so rows from different
+    periods get their own set's points, status flags and payout brackets in
+    one vectorized pass, keyed by each row's (year, week) key. Lookups
+    without week keys use the most recent rule set.
+    """
+
+    def __init__(self, data, source=None):
+        self.data = data
+        self.source = source
+
+        if 'version' not in data:
+            raise ValueError("Rules are missing a 'version'")
+        self.version = str(data['version'])
+
+        canonical = json.dumps(data, sort_keys=True, ensure_ascii=False)
+        digest = hashlib.sha256(canonical.encode('utf-8')).hexdigest()[:12]
+        self.cache_key = f"{self.version}-{digest}"
+
+        self.intervals = Intervals(data)
+
+        rule_sets = data.get('rule_sets')
+        if rule_sets is None:
+            # Single-scheme file: the sections live at the top level
+            rule_sets = [{key: data[key] for key in RULE_SECTIONS if key in data}]
+        if not isinstance(rule_sets, list) or not rule_sets:
+            raise ValueError("'rule_sets' must be a non-empty list")
+
+        self.rule_sets = sorted((RuleSet(set_data, self.intervals) for set_data in _resolve_extends(rule_sets)),
+                                key=lambda rule_set: rule_set.valid_from)
+
+        for previous, current in zip(self.rule_sets, self.rule_sets[1:]):
+            if current.valid_from <= previous.valid_to:
+                raise ValueError(f"Rule sets '{previous.id}' and '{current.id}' overlap")
+
+        self.set_starts = np.array([rule_set.valid_from for rule_set in self.rule_sets], dtype=np.int64)
+        self.set_ends = np.array([rule_set.valid_to for rule_set in self.rule_sets], dtype=np.int64)
+        self._set_start_list = self.set_starts.tolist()
+        self.stack = RuleSetStack(self.rule_sets, self.intervals)
+
+    # Rule set selection
+
+    def rule_set_index(self, week_keys):
+        """
+        Return the index of the rule set valid for each week key.
+
+        Keys of 0 (unknown week) map to the most recent rule set. Raises
+        ValueError if a week is not covered by any rule set.
+        """
+        keys = np.atleast_1d(np.asarray(week_keys, dtype=np.int64))
+        index = np.searchsorted(self.set_starts, keys, side='right') - 1
+
+        unknown = keys <= 0
+        index[unknown] = len(self.rule_sets) - 1
+
+        covered = unknown | ((index >= 0) & (keys <= self.set_ends[np.clip(index, 0, None)]))
+        if not covered.all():
+            missing = ', '.join(format_iso_week(key) for key in np.unique(keys[~covered]))
+            raise ValueError(f"No rule set covers week(s): {missing}")
+        return index
+
+    def for_week(self, week_key=None):
+        """Return the RuleSet valid for one week key (most recent if None), as rule_set_index."""
+        if not week_key or week_key <= 0:
+            return self.rule_sets[-1]
+        index = bisect.bisect_right(self._set_start_list, week_key) - 1
+        if index < 0 or week_key > self.rule_sets[index].valid_to:
+            raise ValueError(f"No rule set covers week(s): {format_iso_week(week_key)}")
+        return self.rule_sets[index]
+
+    def _row_sets(self, week_keys, length):
+        if week_keys is None:
+            return np.full(length, len(self.rule_sets) - 1)
+        return self.rule_set_index(week_keys)
+
+    # Vectorized lookups
+
+    def points(self, ages, intervals, amounts, week_keys=None):
+        """Vectorized point lookup for donors, each row using its week's rule set."""
+        return self.stack.points(self._row_sets(week_keys, len(_as_series(ages))), ages, intervals, amounts)
+
+    def status_codes(self, statuses, week_keys=None):
+        """Return uint8 STATUS_* flag codes for agency statuses (see decode_status)."""
+        return self.stack.status_codes(self._row_sets(week_keys, len(_as_series(statuses))), statuses)
+
+    def status_masks(self, statuses, week_keys=None):
+        """Return (counted, approved, excluded) boolean arrays for agency statuses."""
+        return decode_status(self.status_codes(statuses, week_keys))
+
+    def eligible(self, counted, approved, week_keys=None):
+        """Apply each week's approval-rate rule to counted/approved donor totals."""
+        counted = np.atleast_1d(np.asarray(counted, dtype=float))
+        return self.stack.eligible(self._row_sets(week_keys, len(counted)), counted, approved)
+
+    def payouts(self, points, working_days, bonus_eligible, week_keys=None):
+        """
+        Vectorized regular fundraiser payout (see payout_details).
+
+        Returns:
+            Dictionary of arrays: daily_average, payout, rate, bracket
+        """
+        points = np.atleast_1d(np.asarray(points, dtype=float))
+        return self.stack.payouts(self._row_sets(week_keys, len(points)), points, working_days, bonus_eligible)
+
+    # Scalar helpers for one week
+
+    def donor_points(self, age, interval, amount, week_key=None):
+        """Points for one donor with the rule set of week_key (most recent if None)."""
+        return self.for_week(week_key).donor_points(age, interval, amount)
+
+    def eligibility_status(self, statuses, week_key=None):
+        """Return 'eligible' or 'not-eligible' for one group of donor statuses."""
+        return self.for_week(week_key).eligibility_status(statuses)
+
+    def payout_details(self, points, working_days, bonus_eligible=True, week_key=None):
+        """Calculate payout for a regular fundraiser (see calculate_regular_fundraiser_payout)."""
+        return self.for_week(week_key).payout_details(points, working_days, bonus_eligible)
+
+    def team_leader_bonus_details(self, team_data, week_key=None):
+        """Calculate team leader bonus for {fundraiser: {"points", "working_days"}} (TL included)."""
+        return self.for_week(week_key).team_leader_bonus_details(team_data)
+
+    def milestone_details(self, team_size, week_key=None):
+        """Return milestone bonus amounts for a team of the given size."""
+        return self.for_week(week_key).milestone_details(team_size)
+
+
+def _resolve_extends(rule_sets):
+    """Apply 'extends': a rule set inherits every section it does not override from its parent."""
+    by_id = {}
+    resolved = []
+    for set_data in rule_sets:
+        parent_id = set_data.get('extends')
+        merged = dict(set_data)
+        if parent_id is not None:
+            if parent_id not in by_id:
+                raise ValueError(f"Rule set '{set_data.get('id')}' extends unknown rule set '{parent_id}'")
+            parent = {key: value for key, value in by_id[parent_id].items()
+                      if key in RULE_SECTIONS}
+            merged = _deep_merge(parent, {key: value for key, value in set_data.items() if key != 'extends'})
+        if 'id' in merged:
+            by_id[merged['id']] = merged
+        resolved.append(merged)
+    return resolved
+
+
+def _deep_merge(base, override):
+    """Merge nested dictionaries; lists and scalars in override replace those in base."""
+    merged = dict(base)
+    for key, value in override.items():
+        if isinstance(value, dict) and isinstance(merged.get(key), dict):
+            merged[key] = _deep_merge(merged[key], value)
+        else:
+            merged[key] = value
+    return merged
+
+
+def _pad_edges(edge_lists):
+    """Stack bracket edges of different lengths, padding with +inf (never reached)."""
+    width = max(len(edges) for edges in edge_lists)
+    stacked = np.full((len(edge_lists), width), np.inf)
+    for i, edges in enumerate(edge_lists):
+        stacked[i, :len(edges)] = edges
+    return stacked
+
+
+def _pad_rows(rows):
+    """Stack per-bracket values of different lengths, repeating the last value."""
+    width = max(len(row) for row in rows)
+    return np.stack([np.concatenate([row, np.repeat(row[-1:], width - len(row))]) for row in rows])
+
+
+def _stacked_bins(stacked_edges, sets, values):
+    """Bracket index of each value within its own rule set's edges (searchsorted side='right')."""
+    if stacked_edges.shape[1] == 0:
+        return np.zeros(len(values), dtype=np.intp)
+    return (stacked_edges[sets] <= np.asarray(values, dtype=float)[:, None]).sum(axis=1)
+
+
+def decode_status(codes):
+    """Split uint8 status codes into (counted, approved, excluded) boolean arrays."""
+    codes = np.asarray(codes)
+    return (codes & STATUS_COUNTED) > 0, (codes & STATUS_APPROVED) > 0, (codes & STATUS_EXCLUDED) > 0
+
+
+def _factorize_strings(values):
+    """
+    Return (codes, uniques) for string values, missing values as ''.
+
+    Categorical input reuses its existing codes, so lookups over the compact
+    working frame only touch each category once.
+    """
+    series = _as_series(values)
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        codes = series.cat.codes.to_numpy()
+        uniques = [str(category) for category in series.cat.categories] + ['']
+        return np.where(codes < 0, len(uniques) - 1, codes), uniques
+    return pd.factorize(series.fillna('').astype(str))
+
+
+def _as_series(values):
+    """Wrap scalars, lists and arrays in a pandas Series (Series pass through)."""
+    if isinstance(values, pd.Series):
+        return values.reset_index(drop=True)
+    return pd.Series(np.atleast_1d(np.asarray(values, dtype=object)))
+
+
+def _scalar_number(value):
+    """One value as a float, 0 where missing or not numeric (as pd.to_numeric(errors='coerce').fillna(0))."""
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return 0.0
+    return 0.0 if math.isnan(number) else number
+
+
+def plain_number(value):
+    """Return whole numbers as int so they render as '20' rather than '20.0'."""
+    value = float(value)
+    return int(value) if value.is_integer() else value
+
+
+@lru_cache(maxsize=8)
+def _load_compiled(path, mtime_ns, size):
+    with open(path, 'r', encoding='utf-8') as f:
+        try:
+            data = json.load(f)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"Rules file {path} is not valid JSON: {e}")
+
+    try:
+        return CompiledRules(data, source=path)
+    except (KeyError, TypeError) as e:
+        raise ValueError(f"Invalid rules file {path}: {e}")
+
+
+def load_rules(path=None):
+    """
+    Load, validate and compile a rules file.
+
+    Compiled rules are cached per file path and modification time, so
+    repeated calls are free until the file changes.
+
+    Args:
+        path: Path to a rules JSON file (defaults to the bundled rules.json)
+
+    Returns:
+        CompiledRules instance
+    """
+    if path is None:
+        path = default_rules_path()
+    path = os.path.abspath(path)
+
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"Rules file not found: {path}")
+
+    stat = os.stat(path)
+    return _load_compiled(path, stat.st_mtime_ns, stat.st_size)
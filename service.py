@@ -0,0 +1,444 @@
+"""
+Local HTTP service that processes exports for a whole team on one machine.
+
+Coordinators upload an export (and optionally their assignments) and get a
+job back; jobs run on a pool of worker processes and their formatted CSV
+and PDF reports are downloaded when done.
+
+    POST /jobs                  multipart/form-data with the fields
+                                  export        the agency CSV export (required)
+                                  assignments   assignments JSON: the GUI's saved
+                                                assignments file ({"weeks": ...}) or a
+                                                selection dict ({"team_leaders": ...})
+                                  default_days  working days for fundraisers without any
+                                  pdf           0 to skip the PDF reports
+                                or the raw CSV as the body, options as query parameters
+                                -> 202 {"id": ..., "state": "queued", ...}
+    GET  /jobs                  status of all jobs
+    GET  /jobs/<id>             status of one job
+    GET  /jobs/<id>/csv         formatted CSV
+    GET  /jobs/<id>/pdfs.zip    ZIP of the PDF reports
+    GET  /health                worker count and queue length
+
+Every worker process compiles the rules once and keeps the last
+EXPORT_CACHE_SIZE parsed exports, keyed by content hash, so re-submitting an
+export with corrected assignments skips reading and cleaning it. Uploads are
+stored once per content hash. Without assignments a job uses the saved
+assignments of the machine running the service.
+
+Run with `python service.py --workers 4`; it only listens on 127.0.0.1
+unless --host says otherwise. load_test.py measures its throughput.
+"""
+import collections
+import datetime
+import email.parser
+import email.policy
+import hashlib
+import json
+import multiprocessing
+import os
+import threading
+import time
+import uuid
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs
+
+from jobs import QUEUED, RUNNING, DONE, FAILED
+
+DEFAULT_PORT = 8765
+
+# Largest accepted upload; full-year exports are a few tens of MB
+MAX_UPLOAD_BYTES = 200 * 1024 * 1024
+
+# Parsed exports each worker process keeps for re-submitted files
+EXPORT_CACHE_SIZE = 4
+
+# Set in each worker process by _init_worker
+_rules = None
+_exports = collections.OrderedDict()   # sha256 -> read_export frame
+
+
+def default_worker_count():
+    """Worker processes: all cores but one, at least one."""
+    return max(1, (os.cpu_count() or 2) - 1)
+
+
+def _init_worker(rules_file):
+    """Pool initializer: import the pipeline and compile the rules once per process."""
+    global _rules
+    from rules import load_rules
+    import pipeline  # noqa: F401 (pandas, ReportLab and friends load here, not in the first job)
+    _rules = load_rules(rules_file)
+
+
+def _parsed_export(path, digest):
+    """read_export frame of an upload, from the process's cache when it was seen before."""
+    from csv_formatter import read_export
+    frame = _exports.get(digest)
+    if frame is not None:
+        _exports.move_to_end(digest)
+        return frame, True
+    frame = read_export(path)
+    _exports[digest] = frame
+    while len(_exports) > EXPORT_CACHE_SIZE:
+        _exports.popitem(last=False)
+    return frame, False
+
+
+def _process_job(job_dir, export_path, digest, options):
+    """
+    Worker process entry point: run the pipeline for one job.
+
+    Args:
+        job_dir: The job's output directory
+        export_path: Stored upload
+        digest: sha256 of the upload, the parsed export cache key
+        options: PipelineConfig keyword arguments from the request
+
+    Returns:
+        Dictionary with 'rows', 'pdf_files' (paths relative to job_dir),
+        'rules_version', 'seconds' and 'cached' (whether the parsed export
+        was reused)
+    """
+    from pipeline import PipelineConfig, run
+
+    start = time.perf_counter()
+    frame, cached = _parsed_export(export_path, digest)
+    config = PipelineConfig(export_path, os.path.join(job_dir, 'formatted.csv'), os.path.join(job_dir, 'pdf'),
+                            rules=_rules, parsed_export=frame, **options)
+    result = run(config)
+    return {
+        'rows': result['rows'],
+        'pdf_files': [os.path.relpath(path, job_dir) for path in result['pdf_files']],
+        'rules_version': result['rules_version'],
+        'seconds': round(time.perf_counter() - start, 3),
+        'cached': cached,
+    }
+
+
+class ServiceJob:
+    """One submitted export and its state."""
+
+    def __init__(self, job_id, name, job_dir):
+        self.id = job_id
+        self.name = name
+        self.dir = job_dir
+        self.state = QUEUED
+        self.submitted = time.time()
+        self.finished = None
+        self.result = None
+        self.error = None
+        self.future = None
+
+    def status(self):
+        """JSON-ready status; a queued job counts as running once the pool has picked it up."""
+        state = self.state
+        if state == QUEUED and self.future is not None and self.future.running():
+            state = RUNNING
+        status = {
+            'id': self.id,
+            'file': self.name,
+            'state': state,
+            'submitted': datetime.datetime.fromtimestamp(self.submitted).isoformat(timespec='seconds'),
+        }
+        if self.finished is not None:
+            status['seconds'] = round(self.finished - self.submitted, 3)
+        if self.state == DONE:
+            status.update(rows=self.result['rows'], pdf_files=len(self.result['pdf_files']),
+                          rules_version=self.result['rules_version'],
+                          processing_seconds=self.result['seconds'], cached_export=self.result['cached'],
+                          csv=f"/jobs/{self.id}/csv")
+            if self.result['pdf_files']:
+                status['pdfs'] = f"/jobs/{self.id}/pdfs.zip"
+        if self.state == FAILED:
+            status['error'] = self.error
+        return status
+
+
+class ProcessingService:
+    """Job table and worker pool behind the HTTP handler."""
+
+    def __init__(self, jobs_dir, workers=None, rules_file=None):
+        """
+        Args:
+            jobs_dir: Directory for uploads and job outputs
+            workers: Worker processes (default: default_worker_count())
+            rules_file: Rules JSON file (default: the bundled rules.json)
+        """
+        from rules import load_rules
+
+        self.jobs_dir = os.path.abspath(jobs_dir)
+        self.upload_dir = os.path.join(self.jobs_dir, 'uploads')
+        os.makedirs(self.upload_dir, exist_ok=True)
+        # Fail on a broken rules file here rather than in every job
+        load_rules(rules_file)
+        self.workers = workers or default_worker_count()
+        self.pool = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context('spawn'),
+                                        initializer=_init_worker, initargs=(rules_file,))
+        self.jobs = {}
+        self.lock = threading.Lock()
+
+    def submit(self, name, data, assignments=None, default_days=None, generate_pdf=True):
+        """
+        Queue an export.
+
+        Args:
+            name: Uploaded file name
+            data: Export content (bytes)
+            assignments: Optional parsed assignments JSON (saved assignments
+                file or selection dict)
+            default_days: Working days for fundraisers without any
+            generate_pdf: Whether to render the PDF reports
+
+        Returns:
+            The ServiceJob
+        """
+        options = {'default_days': default_days, 'generate_pdf': generate_pdf}
+        if assignments is not None:
+            if not isinstance(assignments, dict):
+                raise ValueError("Assignments must be a JSON object")
+            if 'weeks' in assignments:
+                options['assignments_file'] = None  # set below, once the job directory exists
+            elif 'working_days' in assignments:
+                options['selection'] = {key: assignments.get(key, {})
+                                        for key in ('team_leaders', 'team_assignments', 'working_days')}
+            else:
+                raise ValueError("Assignments need 'weeks' (saved assignments file) "
+                                 "or 'working_days' (selection)")
+
+        digest = hashlib.sha256(data).hexdigest()
+        export_path = os.path.join(self.upload_dir, f"{digest}.csv")
+        if not os.path.exists(export_path):
+            temp_path = f"{export_path}.{uuid.uuid4().hex}.tmp"
+            with open(temp_path, 'wb') as f:
+                f.write(data)
+            os.replace(temp_path, export_path)
+
+        job = ServiceJob(uuid.uuid4().hex[:12], os.path.basename(name or 'export.csv'), None)
+        job.dir = os.path.join(self.jobs_dir, job.id)
+        os.makedirs(job.dir)
+        if 'assignments_file' in options:
+            options['assignments_file'] = os.path.join(job.dir, 'assignments.json')
+            with open(options['assignments_file'], 'w', encoding='utf-8') as f:
+                json.dump(assignments, f, ensure_ascii=False)
+
+        with self.lock:
+            self.jobs[job.id] = job
+        job.future = self.pool.submit(_process_job, job.dir, export_path, digest, options)
+        job.future.add_done_callback(lambda future: self._finish(job, future))
+        return job
+
+    def job(self, job_id):
+        with self.lock:
+            return self.jobs.get(job_id)
+
+    def statuses(self):
+        with self.lock:
+            jobs = list(self.jobs.values())
+        return [job.status() for job in jobs]
+
+    def pdf_zip(self, job):
+        """Path of a ZIP with the job's PDF reports, built on first download."""
+        path = os.path.join(job.dir, 'pdfs.zip')
+        with self.lock:
+            if not os.path.exists(path):
+                temp_path = path + '.tmp'
+                with zipfile.ZipFile(temp_path, 'w', zipfile.ZIP_DEFLATED) as archive:
+                    for name in job.result['pdf_files']:
+                        archive.write(os.path.join(job.dir, name), os.path.relpath(name, 'pdf'))
+                os.replace(temp_path, path)
+        return path
+
+    def shutdown(self):
+        self.pool.shutdown(wait=False, cancel_futures=True)
+
+    def _finish(self, job, future):
+        error = future.exception() if not future.cancelled() else None
+        with self.lock:
+            job.finished = time.time()
+            if future.cancelled():
+                job.state, job.error = FAILED, "Service stopped"
+            elif error is not None:
+                job.state, job.error = FAILED, str(error)
+            else:
+                job.state, job.result = DONE, future.result()
+
+
+class ServiceHandler(BaseHTTPRequestHandler):
+    """Routes requests to the server's ProcessingService."""
+
+    server_version = "Realisierungsdatenvisualizer"
+
+    def do_GET(self):
+        service = self.server.service
+        parts = [part for part in urlsplit(self.path).path.split('/') if part]
+        if parts == ['health']:
+            statuses = service.statuses()
+            return self._send_json(200, {
+                'status': 'ok',
+                'workers': service.workers,
+                'queued': sum(status['state'] == QUEUED for status in statuses),
+                'running': sum(status['state'] == RUNNING for status in statuses),
+                'jobs': len(statuses),
+            })
+        if parts == ['jobs']:
+            return self._send_json(200, {'jobs': service.statuses()})
+        if len(parts) in (2, 3) and parts[0] == 'jobs':
+            job = service.job(parts[1])
+            if job is None:
+                return self._send_error(404, f"No job {parts[1]}")
+            if len(parts) == 2:
+                return self._send_json(200, job.status())
+            if job.state != DONE:
+                return self._send_error(409, f"Job {job.id} is {job.status()['state']}")
+            name = os.path.splitext(job.name)[0]
+            if parts[2] == 'csv':
+                return self._send_file(os.path.join(job.dir, 'formatted.csv'), 'text/csv; charset=utf-8',
+                                       f"{name}_formatted.csv")
+            if parts[2] == 'pdfs.zip':
+                if not job.result['pdf_files']:
+                    return self._send_error(404, f"Job {job.id} has no PDF reports")
+                return self._send_file(service.pdf_zip(job), 'application/zip', f"{name}_pdfs.zip")
+        return self._send_error(404, "Not found")
+
+    def do_POST(self):
+        url = urlsplit(self.path)
+        if url.path.rstrip('/') != '/jobs':
+            return self._send_error(404, "Not found")
+        length = int(self.headers.get('Content-Length') or 0)
+        if length <= 0:
+            return self._send_error(411, "Upload the export as the request body")
+        if length > MAX_UPLOAD_BYTES:
+            return self._send_error(413, f"Uploads are limited to {MAX_UPLOAD_BYTES // (1024 * 1024)} MB")
+        body = self.rfile.read(length)
+
+        try:
+            content_type = self.headers.get('Content-Type', '')
+            if content_type.startswith('multipart/form-data'):
+                fields, files = parse_multipart(content_type, body)
+            else:
+                fields = {key: values[-1] for key, values in parse_qs(url.query).items()}
+                files = {'export': (fields.get('name', 'export.csv'), body)}
+            if 'export' not in files:
+                raise ValueError("Missing 'export' file field")
+            name, data = files['export']
+
+            assignments = None
+            if 'assignments' in files:
+                assignments = json.loads(files['assignments'][1].decode('utf-8-sig'))
+            elif fields.get('assignments'):
+                assignments = json.loads(fields['assignments'])
+            default_days = float(fields['default_days']) if fields.get('default_days') else None
+            generate_pdf = fields.get('pdf', '1').lower() not in ('0', 'false', 'no')
+
+            job = self.server.service.submit(name, data, assignments, default_days, generate_pdf)
+        except ValueError as e:
+            # json.JSONDecodeError is a ValueError too
+            return self._send_error(400, str(e))
+        self._send_json(202, job.status(), location=f"/jobs/{job.id}")
+
+    def log_message(self, format, *args):
+        if not self.server.quiet:
+            super().log_message(format, *args)
+
+    def _send_json(self, status, payload, location=None):
+        body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        if location:
+            self.send_header('Location', location)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_error(self, status, message):
+        self._send_json(status, {'error': message})
+
+    def _send_file(self, path, content_type, filename):
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(os.path.getsize(path)))
+        self.send_header('Content-Disposition', f'attachment; filename="{filename}"')
+        self.end_headers()
+        with open(path, 'rb') as f:
+            while True:
+                chunk = f.read(1 << 16)
+                if not chunk:
+                    break
+                self.wfile.write(chunk)
+
+
+def parse_multipart(content_type, body):
+    """
+    Split a multipart/form-data body.
+
+    Returns:
+        Tuple of ({field name: text value}, {field name: (file name, bytes)})
+    """
+    message = email.parser.BytesParser(policy=email.policy.HTTP).parsebytes(
+        f"Content-Type: {content_type}\r\n\r\n".encode('latin-1') + body)
+    if not message.is_multipart():
+        raise ValueError("Malformed multipart body")
+    fields, files = {}, {}
+    for part in message.iter_parts():
+        name = part.get_param('name', header='content-disposition')
+        if not name:
+            continue
+        data = part.get_payload(decode=True) or b''
+        filename = part.get_filename()
+        if filename is not None:
+            files[name] = (filename, data)
+        else:
+            fields[name] = data.decode('utf-8')
+    return fields, files
+
+
+def serve(host='127.0.0.1', port=DEFAULT_PORT, jobs_dir='service_jobs', workers=None, rules_file=None, quiet=False):
+    """
+    Run the service until interrupted.
+
+    Args:
+        host: Interface to listen on ('0.0.0.0' for the whole network)
+        port: TCP port
+        jobs_dir: Directory for uploads and job outputs
+        workers: Worker processes (default: default_worker_count())
+        rules_file: Rules JSON file (default: the bundled rules.json)
+        quiet: Do not log every request
+    """
+    service = ProcessingService(jobs_dir, workers, rules_file)
+    server = ThreadingHTTPServer((host, port), ServiceHandler)
+    server.daemon_threads = True
+    server.service = service
+    server.quiet = quiet
+    print(f"Serving on http://{host}:{server.server_port} with {service.workers} workers "
+          f"(jobs in {service.jobs_dir})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\nStopping")
+    finally:
+        server.server_close()
+        service.shutdown()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Local HTTP service that processes uploaded exports')
+    parser.add_argument('--host', default='127.0.0.1',
+                        help="Interface to listen on (default: 127.0.0.1; '0.0.0.0' serves the network)")
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT,
+                        help=f'TCP port (default: {DEFAULT_PORT})')
+    parser.add_argument('--workers', type=int,
+                        help=f'Worker processes (default: {default_worker_count()})')
+    parser.add_argument('--jobs-dir', default='service_jobs',
+                        help='Directory for uploads and job outputs (default: service_jobs)')
+    parser.add_argument('--rules', dest='rules_file',
+                        help='Rules JSON file (defaults to the bundled rules.json)')
+    parser.add_argument('--quiet', action='store_true',
+                        help='Do not log every request')
+
+    args = parser.parse_args()
+    serve(args.host, args.port, args.jobs_dir, args.workers, args.rules_file, args.quiet)
@@ -0,0 +1,251 @@
+import copy
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from csv_formatter import read_export
+from rules import CompiledRules, RuleSetStack, load_rules
+from weeks import ISO_WEEK_PATTERN, parse_iso_week, parse_week_keys, format_iso_week
+
+
+def parse_override(text):
+    """
+    Parse a '--set' override of the form 'variant:path=value'.
+
+    The path is relative to each rule set, with list indexes as numbers,
+    e.g. 'tier240:points.table.3.half-yearly=3.5'. The value is read as JSON
+    where possible and as a plain string otherwise.
+
+    Returns:
+        Tuple of (variant name, path list, value)
+    """
+    name, sep, assignment = text.partition(':')
+    path, eq, raw_value = assignment.partition('=')
+    if not sep or not eq or not name or not path:
+        raise ValueError(f"Invalid override {text!r}, expected 'variant:path.to.field=value'")
+    try:
+        value = json.loads(raw_value)
+    except json.JSONDecodeError:
+        value = raw_value
+    return name, path.split('.'), value
+
+
+def _set_path(data, path, value):
+    """Replace an existing field; raises KeyError naming the first step that does not exist."""
+    target = data
+    for position, key in enumerate(path):
+        if isinstance(target, list):
+            if not key.isdigit() or int(key) >= len(target):
+                raise KeyError(key)
+            key = int(key)
+        elif not isinstance(target, dict) or key not in target:
+            raise KeyError(key)
+        if position == len(path) - 1:
+            target[key] = value
+        else:
+            target = target[key]
+
+
+def apply_overrides(rules, overrides, version):
+    """
+    Return a copy of compiled rules with overrides applied to every rule set.
+
+    Args:
+        rules: CompiledRules to start from
+        overrides: List of (path list, value) pairs
+        version: Version string for the resulting rules
+
+    Returns:
+        CompiledRules instance
+    """
+    data = copy.deepcopy(rules.data)
+    rule_sets = data.get('rule_sets') or [data]
+    for path, value in overrides:
+        for set_data in rule_sets:
+            try:
+                _set_path(set_data, path, value)
+            except KeyError as e:
+                raise ValueError(f"Override path {'.'.join(path)!r} does not exist in rule set "
+                                 f"'{set_data.get('id', 'default')}' (no {e.args[0]!r})") from None
+    data['version'] = version
+    return CompiledRules(data, source=rules.source)
+
+
+def load_variants(base_rules, variant_files=None, overrides=None):
+    """
+    Build the rule variants to compare, starting with the baseline.
+
+    Args:
+        base_rules: CompiledRules used as 'baseline'
+        variant_files: Dictionary of variant name -> rules JSON file
+        overrides: List of '--set' strings (see parse_override); a variant
+            named in an override but not in variant_files starts from baseline
+
+    Returns:
+        Dictionary of variant name -> CompiledRules, baseline first
+    """
+    variants = {'baseline': base_rules}
+    for name, path in (variant_files or {}).items():
+        variants[name] = load_rules(path)
+
+    by_variant = {}
+    for text in overrides or []:
+        name, path, value = parse_override(text)
+        by_variant.setdefault(name, []).append((path, value))
+    for name, variant_overrides in by_variant.items():
+        start = variants.get(name, base_rules)
+        variants[name] = apply_overrides(start, variant_overrides, f"{start.version}+{name}")
+    return variants
+
+
+def load_working_days(path):
+    """
+    Load working days per week and fundraiser from a JSON file.
+
+    The file has the same shape the GUI collects in its team leader dialog:
+    {"18/2025": {"Fundraiser Name": 5, ...}, ...}; weeks may also be given
+    as ISO weeks ("2025-W18"). Weeks without a year ("KW18") take the most
+    common year of the file.
+
+    Returns:
+        {ISO week: {fundraiser name: days}}, as simulate expects
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    labels = list(data)
+    keys = parse_week_keys(labels)
+    for i, label in enumerate(labels):
+        if ISO_WEEK_PATTERN.match(label):
+            keys[i] = parse_iso_week(label)
+    unknown = [label for label, key in zip(labels, keys) if not key]
+    if unknown:
+        raise ValueError(f"Working days file {os.path.basename(path)} has unknown weeks: {', '.join(unknown)}")
+    return {format_iso_week(key): data[label] for label, key in zip(labels, keys)}
+
+
+def simulate(df, variants, working_days=None, default_days=5):
+    """
+    Evaluate several rule variants over the same donor rows.
+
+    Points, status flags, weekly eligibility and payouts are computed for all
+    variants at once as (variant, row) arrays over one stacked table of every
+    variant's rule sets. Nothing is written or rendered.
+
+    Team leader bonuses and milestones depend on the team assignments made in
+    the GUI and are not part of the simulation.
+
+    Args:
+        df: Donor rows as returned by csv_formatter.read_export
+        variants: Dictionary of variant name -> CompiledRules
+        working_days: Working days per ISO week and fundraiser,
+            {'2025-W18': {name: days}} (see load_working_days)
+        default_days: Working days for fundraiser-weeks missing from working_days
+
+    Returns:
+        pandas DataFrame with one row per fundraiser, a points and a payout
+        column per variant, and a final 'Total' row
+    """
+    names = list(variants)
+    # Rows whose week could not be parsed are left out, as in the pipeline
+    df = df[df['week_key'] > 0]
+    intervals = variants[names[0]].intervals
+    for name in names[1:]:
+        if variants[name].intervals.names != intervals.names:
+            raise ValueError(f"Variant '{name}' defines different intervals than '{names[0]}'")
+
+    # One stack holding every variant's rule sets; a row's set index in
+    # variant v is the set valid for its week, offset by v's first set
+    all_sets = [rule_set for name in names for rule_set in variants[name].rule_sets]
+    stack = RuleSetStack(all_sets, intervals)
+    offsets = np.cumsum([0] + [len(variants[name].rule_sets) for name in names[:-1]])
+    week_keys = df['week_key'].to_numpy()
+    sets = np.stack([variants[name].rule_set_index(week_keys) + offset
+                     for name, offset in zip(names, offsets)])  # (variant, row)
+
+    n_variants = sets.shape[0]
+    flat_sets = sets.ravel()
+    points = stack.points(flat_sets, np.tile(df['Age'].to_numpy(), n_variants),
+                          np.tile(df['Interval'].to_numpy(), n_variants),
+                          np.tile(df['Amount Yearly'].to_numpy(), n_variants))
+    counted, approved, excluded = stack.status_masks(flat_sets, np.tile(df['status_agency'].to_numpy(), n_variants))
+    points = np.where(excluded, 0.0, points)
+
+    # Sum per (variant, week, fundraiser) with one bincount over flattened group ids
+    group_codes, groups = pd.MultiIndex.from_arrays([df['week_key'], df['Fundraiser Name']]).factorize()
+    n_groups = len(groups)
+    flat_groups = (np.arange(n_variants)[:, None] * n_groups + group_codes).ravel()
+    size = n_variants * n_groups
+    group_points = np.bincount(flat_groups, weights=points, minlength=size)
+    group_counted = np.bincount(flat_groups, weights=counted, minlength=size)
+    group_approved = np.bincount(flat_groups, weights=approved, minlength=size)
+    group_sets = np.zeros(size, dtype=np.intp)
+    group_sets[flat_groups] = flat_sets
+
+    working_days = working_days or {}
+    days = np.array([working_days.get(format_iso_week(key), {}).get(fundraiser, default_days)
+                     for key, fundraiser in groups], dtype=float)
+    eligible = stack.eligible(group_sets, group_counted, group_approved)
+    payouts = stack.payouts(group_sets, group_points, np.tile(days, n_variants), eligible)
+
+    fundraisers = pd.Index([fundraiser for _, fundraiser in groups])
+    result = pd.DataFrame(index=pd.Index(sorted(fundraisers.unique()), name='Fundraiser Name'))
+    for v, name in enumerate(names):
+        block = slice(v * n_groups, (v + 1) * n_groups)
+        result[f"points {name}"] = pd.Series(group_points[block]).groupby(fundraisers).sum()
+        result[f"payout {name}"] = pd.Series(payouts['payout'][block]).groupby(fundraisers).sum()
+
+    baseline = f"payout {names[0]}"
+    for name in names[1:]:
+        result[f"delta {name}"] = result[f"payout {name}"] - result[baseline]
+
+    result.loc['Total'] = result.sum()
+    return result.round(2)
+
+
+if __name__ == "__main__":
+    import argparse
+    import time
+
+    parser = argparse.ArgumentParser(description='Compare payout costs of rule variants on one export')
+    parser.add_argument('input_file', help='Input CSV file path')
+    parser.add_argument('--rules', dest='rules_file',
+                        help='Baseline rules JSON file (defaults to the bundled rules.json)')
+    parser.add_argument('--variant', action='append', default=[], metavar='NAME=FILE',
+                        help='Rules file to compare against the baseline (repeatable)')
+    parser.add_argument('--set', dest='overrides', action='append', default=[], metavar='NAME:PATH=VALUE',
+                        help="Override one field in every rule set of a variant, "
+                             "e.g. 'tier240:points.table.3.half-yearly=3.5' (repeatable)")
+    parser.add_argument('--working-days', dest='working_days_file',
+                        help='JSON file with working days per week and fundraiser')
+    parser.add_argument('--days', type=float, default=5,
+                        help='Working days for fundraiser-weeks without an entry (default: 5)')
+    parser.add_argument('--output', '-o', help='Write the comparison table to this CSV file')
+
+    args = parser.parse_args()
+
+    variant_files = {}
+    for spec in args.variant:
+        name, sep, path = spec.partition('=')
+        if not sep:
+            parser.error(f"--variant expects NAME=FILE, got {spec!r}")
+        variant_files[name] = path
+
+    start = time.perf_counter()
+    try:
+        variants = load_variants(load_rules(args.rules_file), variant_files, args.overrides)
+        working_days = load_working_days(args.working_days_file) if args.working_days_file else None
+    except ValueError as e:
+        parser.error(str(e))
+    df = read_export(args.input_file)
+    comparison = simulate(df, variants, working_days, args.days)
+    elapsed = time.perf_counter() - start
+
+    with pd.option_context('display.max_rows', None, 'display.max_columns', None, 'display.width', 200):
+        print(comparison)
+    print(f"\nSimulated {len(variants)} variants over {len(df)} donors in {elapsed:.2f}s")
+
+    if args.output:
+        comparison.to_csv(args.output, sep=';', encoding='utf-8-sig', decimal=',')
+        print(f"Comparison saved to: {os.path.abspath(args.output)}")
@@ -0,0 +1,396 @@
+"""
+Generate synthetic agency exports for load and scaling tests.
+
+The files have the exact layout of the agency's export: the banner and
+empty row, the 23-column header, a 'Billing group' section per group, one
+block per fundraiser whose ID and name appear only on its first row and
+whose calendar week appears only where it changes, a Subtotal row after
+each block and a Total row at the end. Calendar weeks mix '18/2025' and
+'KW18' notation; numbers use German formatting (2.160 / 335,16); lines end
+in CRLF and the file starts with a UTF-8 BOM.
+
+Donor counts per fundraiser-week follow each fundraiser's own level, ages
+are skewed young, most donors give monthly, and every fundraiser has an
+approval rate of their own, so some fall below the 70% rule. The same seed
+always produces the same file.
+
+    python synthetic_export.py synthetic.csv --fundraisers 200 --weeks 52 --donors 1000000 --seed 1
+
+Rows are generated and written in chunks of fundraisers, so 10M-row files
+need no more memory than small ones.
+"""
+import csv
+import datetime
+
+import numpy as np
+import pandas as pd
+
+from weeks import iso_week_monday, parse_iso_week, format_iso_week
+
+HEADER = ['Billing group', 'Fundraiser ID', 'Fundraiser Name', 'Calendar week', 'Public RefID', 'Age',
+          'Interval', 'CallReached', 'Donorlevel Formunauts', 'Time Created', 'Campaign', 'status_agency',
+          'Cancellation Date', 'Payment Group', 'Successful Payments', 'Has Email', 'Has Phone No', 'Rating',
+          'Amount Yearly', 'Amount Billable', 'Billed to Agency', 'Claim', 'Missing claim']
+
+BILLING_GROUPS = ['Active & billable', 'Cancellation/payment policy']
+
+CAMPAIGN = 'World Vision Deutschland'
+PAYMENT_GROUP = 'LSV/DD'
+FIRST_REFID = 330000000
+
+FIRST_NAMES = ['Luna', 'Linus', 'Jaime', 'Tara', 'Iman', 'Joshua', 'Killian', 'Charly', 'Mia', 'Noah', 'Emma',
+               'Ben', 'Hannah', 'Paul', 'Lea', 'Finn', 'Sophie', 'Elias', 'Marie', 'Jonas', 'Amira', 'Leon',
+               'Clara', 'Mats', 'Ida', 'Yusuf', 'Frieda', 'Anton', 'Nele', 'Emil', 'Zeynep', 'Theo']
+LAST_NAMES = ['Fenner', 'Möller', 'Dos Santos Mendes', 'Deuchler', 'Shuaibat', 'Carstens', 'Nash-Gavilán',
+              'Büchling', 'Schulz', 'Becker', 'Hoffmann', 'Koch', 'Richter', 'Wolf', 'Schröder', 'Neumann',
+              'Schwarz', 'Braun', 'Zimmermann', 'Krüger', 'Hartmann', 'Lange', 'Yılmaz', 'Jansen', 'Özdemir',
+              'Peters', 'Lehmann', 'Kowalski', 'Nguyen', 'Haas', 'Vogel', 'Friedrich']
+
+# (interval, share of donors, yearly amounts, their shares)
+INTERVALS = [
+    ('Monthly', 0.86, [60, 120, 180, 240, 360, 480, 600], [0.03, 0.12, 0.15, 0.20, 0.38, 0.08, 0.04]),
+    ('Half-Yearly', 0.08, [120, 180, 240, 360, 480], [0.15, 0.20, 0.25, 0.30, 0.10]),
+    ('Yearly', 0.06, [60, 120, 240, 360, 600], [0.10, 0.25, 0.25, 0.25, 0.15]),
+]
+
+# Donor level and the share of the yearly amount billed to the agency
+DONOR_LEVELS = ['Low', 'Mid', 'Top']
+DONOR_LEVEL_SHARES = [0.35, 0.35, 0.30]
+BILLED_FACTORS = np.array([0.63, 0.931, 1.05])
+CLAIM_FACTOR = 1.4
+
+STATUSES = ['approved', 'conditionally-approved', 'cancelled', 'failed']
+
+# Donor rows generated and written at a time
+CHUNK_ROWS = 200_000
+
+
+def german_number(value, decimals=0):
+    """German number notation: 2160 -> '2.160', 335.16 -> '335,16' (trailing zeros dropped)."""
+    text = f"{value:,.{decimals}f}"
+    if decimals:
+        text = text.rstrip('0').rstrip('.')
+    return text.replace(',', ' ').replace('.', ',').replace(' ', '.')
+
+
+def _formatted(values, decimals=0):
+    """german_number of an array, formatting each distinct value once."""
+    unique, inverse = np.unique(np.round(values, 2), return_inverse=True)
+    return np.array([german_number(value, decimals) for value in unique], dtype=object)[inverse]
+
+
+def fundraiser_names(count, rng):
+    """Distinct 'First Last' names, numbered once the combinations run out."""
+    pairs = [(first, last) for first in FIRST_NAMES for last in LAST_NAMES]
+    order = rng.permutation(len(pairs))
+    names = []
+    for index in range(count):
+        first, last = pairs[order[index % len(pairs)]]
+        round_ = index // len(pairs)
+        names.append(f"{first} {last}" + (f" {round_ + 1}" if round_ else ""))
+    return names
+
+
+def plan_export(fundraisers=20, weeks=5, donors=None, start_week=None, seed=0):
+    """
+    Fundraisers, weeks and donor counts of a synthetic export.
+
+    Args:
+        fundraisers: Number of fundraisers
+        weeks: Number of consecutive ISO weeks
+        donors: Approximate number of donor rows (default: about 6 per
+            fundraiser-week, as in real exports)
+        start_week: First week key (default: 2025-W18)
+        seed: Random seed
+
+    Returns:
+        Dictionary with 'ids', 'names', 'week_keys', 'approval' (per
+        fundraiser) and 'counts' (fundraisers x weeks donor counts)
+    """
+    if fundraisers < 1 or weeks < 1:
+        raise ValueError("Need at least one fundraiser and one week")
+    rng = np.random.default_rng(seed)
+    start = iso_week_monday(start_week or parse_iso_week('2025-W18'))
+    mondays = [start + datetime.timedelta(weeks=offset) for offset in range(weeks)]
+    week_keys = np.array([monday.isocalendar()[0] * 100 + monday.isocalendar()[1] for monday in mondays])
+
+    # Each fundraiser has their own level and works most, not all, weeks
+    level = rng.gamma(4.0, 0.25, fundraisers)
+    active = rng.random((fundraisers, weeks)) < 0.85
+    weight = level[:, None] * active
+    target = donors if donors is not None else 6 * fundraisers * weeks
+    rate = target / max(weight.sum(), 1e-9)
+    counts = rng.poisson(rate * weight)
+
+    return {
+        'ids': np.array([f"{index:05d}" for index in rng.choice(np.arange(1, max(99999, fundraisers + 1)),
+                                                                   fundraisers, replace=False)]),
+        'names': np.array(fundraiser_names(fundraisers, rng), dtype=object),
+        'week_keys': week_keys,
+        'approval': rng.beta(9.0, 3.5, fundraisers),
+        'counts': counts,
+        'seed': seed,
+    }
+
+
+def _donor_rows(plan, fundraisers, first_refid, kw_share):
+    """
+    Donor rows of a range of fundraisers, in export order within each fundraiser.
+
+    Generated from a seed derived from the plan's seed and the first
+    fundraiser, so regenerating a chunk gives the same rows.
+    """
+    rng = np.random.default_rng([plan['seed'], int(fundraisers[0])])
+    counts = plan['counts'][fundraisers]
+    n_weeks = counts.shape[1]
+    total = int(counts.sum())
+
+    fundraiser = np.repeat(np.repeat(fundraisers, n_weeks), counts.ravel())
+    week = np.repeat(np.tile(np.arange(n_weeks), len(fundraisers)), counts.ravel())
+    day = rng.integers(0, 6, total)  # Monday to Saturday
+    order = np.lexsort((day, week, fundraiser))
+    fundraiser, week, day = fundraiser[order], week[order], day[order]
+
+    approval = plan['approval'][fundraiser]
+    draw = rng.random(total)
+    status = np.select([draw < approval * 0.93, draw < approval, draw < approval + (1 - approval) * 0.8],
+                       [0, 1, 2], default=3)
+    cancelled = status >= 2
+    policy = rng.random(total) < np.where(cancelled, 0.6, 0.08)
+
+    interval = rng.choice(len(INTERVALS), total, p=[share for _, share, _, _ in INTERVALS])
+    amount = np.zeros(total)
+    for index, (_, _, amounts, shares) in enumerate(INTERVALS):
+        rows = interval == index
+        amount[rows] = rng.choice(amounts, rows.sum(), p=shares)
+    age = np.clip(18 + rng.gamma(2.2, 9.0, total), 18, 90).astype(int)
+    level = rng.choice(len(DONOR_LEVELS), total, p=DONOR_LEVEL_SHARES)
+    billed = np.round(amount * BILLED_FACTORS[level], 2)
+    claim = np.where(policy, 0, np.round(amount * CLAIM_FACTOR, 2))
+
+    # Week labels per fundraiser-week, some in 'KW18' notation
+    kw = rng.random(counts.shape) < kw_share
+    week_keys = plan['week_keys']
+    return pd.DataFrame({
+        'fundraiser': fundraiser,
+        'week': week,
+        'kw': kw[np.searchsorted(fundraisers, fundraiser), week],
+        'week_key': week_keys[week],
+        'day': week * 7 + day,
+        'refid': first_refid + np.arange(total),
+        'age': age,
+        'interval': np.array([name for name, _, _, _ in INTERVALS], dtype=object)[interval],
+        'call_reached': (rng.random(total) < 0.3).astype(int),
+        'level': np.array(DONOR_LEVELS, dtype=object)[level],
+        'status': status,
+        'cancel_after': rng.integers(5, 60, total),
+        'policy': policy,
+        'payments': np.where(cancelled, -1, rng.integers(0, 4, total)),
+        'email': rng.random(total) < 0.9,
+        'phone': rng.random(total) < 0.85,
+        'rating': rng.random(total) < 0.4,
+        'amount': amount,
+        'billed': billed,
+        'claim': claim,
+    })
+
+
+def _date_labels(first_monday, days):
+    """'May 19, 2025' for first_monday + 0..days-1."""
+    labels = []
+    for offset in range(days):
+        date = first_monday + datetime.timedelta(days=offset)
+        labels.append(f"{date:%b} {date.day}, {date.year}")
+    return np.array(labels, dtype=object)
+
+
+def _percent(count, rows):
+    return f"{round(100 * count / rows) if rows else 0}%"
+
+
+def _block(rows, plan, group_name, first_in_group, dates):
+    """Export lines (as a DataFrame of HEADER columns) of one billing group's rows of a chunk."""
+    n = len(rows)
+    fundraiser = rows['fundraiser'].to_numpy()
+    week = rows['week'].to_numpy()
+    new_fundraiser = np.ones(n, dtype=bool)
+    new_fundraiser[1:] = fundraiser[1:] != fundraiser[:-1]
+    new_week = new_fundraiser.copy()
+    new_week[1:] |= week[1:] != week[:-1]
+
+    week_keys = rows['week_key'].to_numpy()
+    week_numbers = (week_keys % 100).astype(str).astype(object)
+    labels = np.where(rows['kw'].to_numpy(), 'KW' + week_numbers,
+                      week_numbers + '/' + (week_keys // 100).astype(str).astype(object))
+    status = rows['status'].to_numpy()
+    policy = rows['policy'].to_numpy()
+
+    lines = pd.DataFrame({
+        'Billing group': '',
+        'Fundraiser ID': np.where(new_fundraiser, plan['ids'][fundraiser], ''),
+        'Fundraiser Name': np.where(new_fundraiser, plan['names'][fundraiser], ''),
+        'Calendar week': np.where(new_week, labels, ''),
+        'Public RefID': rows['refid'].to_numpy(),
+        'Age': rows['age'].to_numpy(),
+        'Interval': rows['interval'].to_numpy(),
+        'CallReached': rows['call_reached'].to_numpy(),
+        'Donorlevel Formunauts': rows['level'].to_numpy(),
+        'Time Created': dates[rows['day'].to_numpy()],
+        'Campaign': CAMPAIGN,
+        'status_agency': np.array(STATUSES, dtype=object)[status],
+        'Cancellation Date': np.where(status >= 2, dates[rows['day'].to_numpy() + rows['cancel_after'].to_numpy()],
+                                      'null'),
+        'Payment Group': PAYMENT_GROUP,
+        'Successful Payments': np.where(rows['payments'].to_numpy() < 0, 'null', rows['payments'].astype(str)),
+        'Has Email': np.where(rows['email'].to_numpy(), '100%', '0%'),
+        'Has Phone No': np.where(rows['phone'].to_numpy(), '100%', '0%'),
+        'Rating': np.where(rows['rating'].to_numpy(), '5', ''),
+        'Amount Yearly': _formatted(rows['amount'].to_numpy()),
+        'Amount Billable': np.where(policy, '', _formatted(rows['amount'].to_numpy())),
+        'Billed to Agency': _formatted(rows['billed'].to_numpy(), 2),
+        'Claim': _formatted(rows['claim'].to_numpy(), 2),
+        'Missing claim': _formatted(rows['claim'].to_numpy() - rows['billed'].to_numpy(), 2),
+    }, columns=HEADER)
+    if first_in_group and n:
+        lines.iloc[0, 0] = group_name
+
+    # Subtotal row after each fundraiser's block
+    starts = np.flatnonzero(new_fundraiser)
+    ends = np.append(starts[1:], n)
+    subtotals = []
+    for start, end in zip(starts, ends):
+        block = rows.iloc[start:end]
+        subtotals.append(_summary_line(f"{plan['ids'][fundraiser[start]]} Subtotal", _sums(block), name_column=2))
+    subtotals = pd.DataFrame(subtotals, columns=HEADER)
+
+    key = np.concatenate([np.arange(n), ends - 0.5])
+    return pd.concat([lines, subtotals], ignore_index=True).iloc[np.argsort(key, kind='stable')]
+
+
+def _sums(rows):
+    """Sums over donor rows that a Subtotal or Total line is made of; add them up with _add_sums."""
+    billable = rows['amount'].to_numpy(dtype=float)[~rows['policy'].to_numpy(dtype=bool)]
+    return {
+        'rows': len(rows),
+        'amount': rows['amount'].sum(),
+        'billable': billable.sum(),
+        'billable_rows': len(billable),
+        'billed': rows['billed'].sum(),
+        'claim': rows['claim'].sum(),
+        'email': int(rows['email'].to_numpy(dtype=bool).sum()),
+        'phone': int(rows['phone'].to_numpy(dtype=bool).sum()),
+        'rating': bool(rows['rating'].to_numpy(dtype=bool).any()),
+    }
+
+
+def _add_sums(total, sums):
+    """total plus sums, as _sums over the rows of both."""
+    added = {key: total[key] + value for key, value in sums.items() if key != 'rating'}
+    added['rating'] = total['rating'] or sums['rating']
+    return added
+
+
+def _summary_line(label, sums, name_column):
+    """Subtotal or Total line values from _sums."""
+    line = [''] * len(HEADER)
+    line[name_column] = label
+    line[15] = _percent(sums['email'], sums['rows'])
+    line[16] = _percent(sums['phone'], sums['rows'])
+    line[17] = '5' if sums['rating'] else ''
+    line[18] = german_number(sums['amount'])
+    line[19] = german_number(sums['billable']) if sums['billable_rows'] else ''
+    line[20] = german_number(sums['billed'], 2)
+    line[21] = german_number(sums['claim'], 2)
+    line[22] = german_number(sums['claim'] - sums['billed'], 2)
+    return line
+
+
+def generate_export(output_file, fundraisers=20, weeks=5, donors=None, start_week=None, seed=0, kw_share=0.3,
+                    chunk_rows=CHUNK_ROWS):
+    """
+    Write a synthetic export.
+
+    Args:
+        output_file: CSV file to write
+        fundraisers: Number of fundraisers
+        weeks: Number of consecutive ISO weeks
+        donors: Approximate number of donor rows (default: about 6 per fundraiser-week)
+        start_week: First week key (default: 2025-W18)
+        seed: Random seed; the same arguments always give the same file
+        kw_share: Share of fundraiser-weeks labelled 'KW18' instead of '18/2025'
+        chunk_rows: Donor rows generated at a time
+
+    Returns:
+        Dictionary with 'rows' (donor rows), 'fundraisers', 'weeks' and
+        'week_range' ('2025-W18'...'2025-W22')
+    """
+    plan = plan_export(fundraisers, weeks, donors, start_week, seed)
+    counts = plan['counts']
+    per_fundraiser = counts.sum(axis=1)
+    first_refids = FIRST_REFID + np.concatenate([[0], np.cumsum(per_fundraiser)[:-1]])
+
+    # Chunks of whole fundraisers of about chunk_rows rows
+    chunks, start, rows = [], 0, 0
+    for index, count in enumerate(per_fundraiser):
+        rows += count
+        if rows >= chunk_rows:
+            chunks.append(np.arange(start, index + 1))
+            start, rows = index + 1, 0
+    if start < fundraisers:
+        chunks.append(np.arange(start, fundraisers))
+
+    first_monday = iso_week_monday(int(plan['week_keys'][0]))
+    dates = _date_labels(first_monday, weeks * 7 + 70)
+    export_date = first_monday + datetime.timedelta(weeks=weeks, days=9)
+
+    # Running sums for the Total line, so no rows are kept between chunks
+    totals = _sums(pd.DataFrame(columns=['amount', 'billed', 'claim', 'policy', 'email', 'phone', 'rating']))
+    with open(output_file, 'w', encoding='utf-8-sig', newline='') as f:
+        f.write(f"WoVi_CW_Final_{export_date:%Y-%m-%d}" + ';' * (len(HEADER) - 1) + '\r\n')
+        f.write(';' * (len(HEADER) - 1) + '\r\n')
+        f.write(';'.join(HEADER) + '\r\n')
+        # Group sections span all fundraisers; each pass regenerates the
+        # chunk's rows from its seed instead of holding the whole file
+        for group, group_name in enumerate(BILLING_GROUPS):
+            first_in_group = True
+            for chunk in chunks:
+                rows = _donor_rows(plan, chunk, int(first_refids[chunk[0]]), kw_share)
+                rows = rows[rows['policy'] == bool(group)].reset_index(drop=True)
+                if rows.empty:
+                    continue
+                block = _block(rows, plan, group_name, first_in_group, dates)
+                block.to_csv(f, sep=';', header=False, index=False, lineterminator='\r\n',
+                             quoting=csv.QUOTE_NONE, escapechar='\\')
+                totals = _add_sums(totals, _sums(rows))
+                first_in_group = False
+        # Like the agency's files, the Total line has no line break
+        f.write(';'.join(_summary_line('Total', totals, name_column=0)))
+
+    return {
+        'rows': int(counts.sum()),
+        'fundraisers': fundraisers,
+        'weeks': weeks,
+        'week_range': f"{format_iso_week(int(plan['week_keys'][0]))}...{format_iso_week(int(plan['week_keys'][-1]))}",
+    }
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Generate a synthetic export in the agency layout')
+    parser.add_argument('output_file', help='CSV file to write')
+    parser.add_argument('--fundraisers', type=int, default=20, help='Number of fundraisers (default: 20)')
+    parser.add_argument('--weeks', type=int, default=5, help='Number of consecutive weeks (default: 5)')
+    parser.add_argument('--donors', type=int,
+                        help='Approximate number of donor rows (default: about 6 per fundraiser-week)')
+    parser.add_argument('--start-week', default='2025-W18', help='First ISO week (default: 2025-W18)')
+    parser.add_argument('--seed', type=int, default=0, help='Random seed (default: 0)')
+    parser.add_argument('--kw-share', type=float, default=0.3,
+                        help="Share of weeks labelled 'KW18' instead of '18/2025' (default: 0.3)")
+
+    args = parser.parse_args()
+
+    result = generate_export(args.output_file, args.fundraisers, args.weeks, args.donors,
+                             parse_iso_week(args.start_week), args.seed, args.kw_share)
+    print(f"Wrote {result['rows']:,} donor rows for {result['fundraisers']} fundraisers "
+          f"over {result['weeks']} weeks ({result['week_range']}) to {args.output_file}")
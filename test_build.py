@@ -81,6 +81,13 @@ def test_csv_processing():
         assert points == 4.0, f"Expected 4.0 points, got {points}"
 
         safe_print(f"{CHECK} Point calculation working")
+
+        # Test rules file compiles and payout brackets apply
+        from rules import load_rules
+        rules = load_rules()
+        payout = rules.payout_details(12, 6)
+        assert payout['rate'] == 10, f"Expected rate 10 for 2.0 points/day, got {payout['rate']}"
+        safe_print(f"{CHECK} Rules {rules.version} compiled")
         return True
 
     except ImportError as e:
@@ -93,12 +100,147 @@ def test_csv_processing():
         safe_print(f"{CROSS} Unexpected error in CSV processing test: {e}")
         return False
 
+# (age, interval, yearly amount, points) with the bundled rules.json: tier
+# edges, age band edges (ages are floored) and interval matching
+POINT_CASES = [
+    (35, 'Monthly', 119.99, 0.5), (35, 'Monthly', 120, 1.0), (35, 'Monthly', 179.99, 1.0),
+    (35, 'Monthly', 180, 1.5), (35, 'Monthly', 359.99, 2.0), (35, 'Monthly', 360, 3.0),
+    (35, 'Yearly', 119.99, 1.0), (35, 'Half-Yearly', 180, 2.5), (35, 'halbjährlich', 240, 3.0),
+    (35, 'jährlich', 240, 4.0), (35, 'Quarterly', 240, 2.0), (35, '', 240, 2.0),
+    (24, 'Yearly', 360, 0.5), (25, 'Monthly', 360, 0.5), (25, 'Yearly', 360, 1.0),
+    (29.9, 'Yearly', 360, 1.0), (30, 'Yearly', 360, 5.0), (40, 'Monthly', 360, 3.0),
+    (40.9, 'Monthly', 360, 3.0), (41, 'Monthly', 360, 4.0), (41, 'Monthly', 0, 1.5),
+    (None, 'Monthly', 360, 0.5), (35, 'Monthly', None, 0.5),
+]
+
+# (points, working days, eligible, rate, bracket) at the payout bracket edges
+PAYOUT_CASES = [
+    (9.99, 5, True, 3.95, 'unter 2er'), (10, 5, True, 10, '2er'), (15, 5, True, 15, '3er'),
+    (25, 5, True, 20, '5er'), (35, 5, True, 30, '7er+'), (35, 5, False, 0, 'nicht gewährt'),
+    (35, 0, True, 0, 'keine Arbeitstage'),
+]
+
+# (week key, points of a 45 year old's 600 € yearly donation) for
+# effective_dated_rules(): the first set, the one extending it, and weeks
+# no set covers (None)
+WEEK_CASES = [(202510, 6.0), (202520, 6.0), (202521, 9.0), (202552, 9.0), (202509, None), (0, 9.0)]
+
+def effective_dated_rules():
+    """The bundled rules split at 2025-W21 into a set and one extending it with another table and age bonus."""
+    import copy
+    import json
+    from rules import CompiledRules
+    with open('rules.json', encoding='utf-8') as f:
+        data = json.load(f)
+    base = copy.deepcopy(data['rule_sets'][0])
+    base.update({'id': 'spring', 'valid_from': '2025-W10', 'valid_to': '2025-W20'})
+    table = base['points']['table'] + [{'min_amount': 600, 'monthly': 4, 'half-yearly': 6, 'yearly': 7}]
+    later = {'id': 'summer', 'extends': 'spring', 'valid_from': '2025-W21', 'valid_to': None,
+             'points': {'table': table, 'age_bonus': [{'min_age': 45, 'points': 2}]}}
+    data['rule_sets'] = [base, later]
+    return CompiledRules(data)
+
+def test_rules():
+    """Test the rules engine at its edges: points, payout brackets, rule sets per week."""
+    try:
+        import numpy as np
+        from rules import load_rules, plain_number
+
+        rules = load_rules()
+        ages, intervals, amounts, expected = (list(column) for column in zip(*POINT_CASES))
+        vectorized = rules.points(ages, intervals, amounts, [202518] * len(ages))
+        for (age, interval, amount, points), value in zip(POINT_CASES, vectorized):
+            scalar = rules.donor_points(age, interval, amount, 202518)
+            assert scalar == points == value, \
+                f"{age} / {interval} / {amount}: expected {points}, got {scalar} (vectorized {value})"
+        safe_print(f"{CHECK} {len(POINT_CASES)} point edges")
+
+        for points, days, eligible, rate, bracket in PAYOUT_CASES:
+            payout = rules.payout_details(points, days, eligible)
+            assert (payout['rate'], payout['bracket']) == (rate, bracket), \
+                f"{points} points in {days} days: expected {rate} ({bracket}), got {payout}"
+        assert rules.eligible([10, 10, 0], [7, 6, 0]).tolist() == [True, False, False], "70% approval edge"
+        assert repr(plain_number(20.0)) == '20' and repr(plain_number(2.5)) == '2.5', "plain_number"
+        safe_print(f"{CHECK} {len(PAYOUT_CASES)} payout brackets, approval edge")
+
+        dated = effective_dated_rules()
+        assert [rule_set.id for rule_set in dated.rule_sets] == ['spring', 'summer'], "rule sets by start"
+        summer = dated.for_week(202521)
+        assert summer.min_approval_rate == 0.7 and len(summer.payout_rates) == 5, "'extends' inherits sections"
+        for week_key, points in WEEK_CASES:
+            try:
+                scalar = dated.donor_points(45, 'Yearly', 600, week_key)
+            except ValueError:
+                scalar = None
+            assert scalar == points, f"Week {week_key}: expected {points}, got {scalar}"
+        covered = [(week_key, points) for week_key, points in WEEK_CASES if points is not None]
+        keys = [week_key for week_key, _ in covered]
+        assert dated.points([45] * len(keys), ['Yearly'] * len(keys), [600] * len(keys), keys).tolist() == \
+            [points for _, points in covered], "stacked rule sets"
+        assert dated.rule_set_index(keys).tolist() == [0, 0, 1, 1, 1], "rule_set_index"
+        try:
+            dated.rule_set_index([202518, 202509])
+            raise AssertionError("Week 2025-W09 is covered by no rule set but was accepted")
+        except ValueError:
+            pass
+        assert np.array_equal(dated.points([45, 45], ['Yearly'] * 2, [599.99, 599.99], [202520, 202521]),
+                              [6.0, 7.0]), "bins below the extra tier"
+        safe_print(f"{CHECK} Effective-dated rule sets")
+        return True
+
+    except AssertionError as e:
+        safe_print(f"{CROSS} Rules test failed: {e}")
+        return False
+    except Exception as e:
+        safe_print(f"{CROSS} Unexpected error in rules test: {e}")
+        return False
+
+# Seconds importing the GUI module may take before the window can be built
+GUI_IMPORT_BUDGET_S = 1.0
+
+# Modules the GUI must not import at load time (they load in the background)
+DEFERRED_MODULES = ['pandas', 'numpy', 'reportlab']
+
+def test_gui_startup():
+    """Test that the GUI module imports fast and defers the heavy modules."""
+    import ast
+    import subprocess
+
+    # Fresh interpreter, so nothing imported by the other tests counts
+    code = (
+        "import sys, time\n"
+        "start = time.perf_counter()\n"
+        "import csv_formatter_gui\n"
+        "elapsed = time.perf_counter() - start\n"
+        f"loaded = [m for m in {DEFERRED_MODULES!r} if m in sys.modules]\n"
+        "print(repr((elapsed, loaded)))\n"
+    )
+    try:
+        result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__)), timeout=120)
+        elapsed, loaded = ast.literal_eval(result.stdout.strip().splitlines()[-1])
+    except Exception as e:
+        safe_print(f"{CROSS} Could not measure GUI import time: {e}")
+        return False
+
+    if loaded:
+        safe_print(f"{CROSS} GUI imports {', '.join(loaded)} at startup")
+        return False
+    if elapsed > GUI_IMPORT_BUDGET_S:
+        safe_print(f"{CROSS} GUI import took {elapsed:.2f}s (budget {GUI_IMPORT_BUDGET_S:.1f}s)")
+        return False
+
+    safe_print(f"{CHECK} GUI import {elapsed * 1000:.0f} ms, heavy modules deferred")
+    return True
+
 def test_file_exists():
     """Test that required files exist."""
     required_files = [
         'csv_formatter.py',
         'csv_formatter_gui.py',
         'html_generator.py',
+        'rules.py',
+        'rules.json',
         'realisierungsdaten.html'
     ]
 
@@ -120,6 +262,8 @@ def main():
         ("File existence", test_file_exists),
         ("Module imports", test_imports),
         ("CSV processing", test_csv_processing),
+        ("Rules", test_rules),
+        ("GUI startup", test_gui_startup),
     ]
 
     all_passed = True
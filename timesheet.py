@@ -0,0 +1,272 @@
+"""
+Import working days and team structure from a timesheet or roster file.
+
+A timesheet is a CSV or XLSX file with one row per fundraiser and week, or
+per fundraiser and working day:
+
+    Fundraiser Name | Fundraiser ID | Calendar week | Working days | Team leader
+    Linus Möller    | 00042         | 18/2025       | 5            | Charly Büchling
+
+Name or ID identify the fundraiser (IDs win where both sides have them).
+The week comes from 'Calendar week' (any export or ISO notation) or from
+'Date'; weeks without a year ('KW18') take the year of the export's week
+18. Working days are summed from 'Working days', or counted as distinct
+dates when that column is missing. 'Team leader' names each fundraiser's TL
+for that week; everyone named there is a TL, and the rows pointing to them
+form their team. Column names are matched case-insensitively, German
+headers included.
+"""
+import logging
+import os
+
+import numpy as np
+import pandas as pd
+
+from assignments import MissingWorkingDays, empty_selection, missing_working_days
+from rules import plain_number
+from weeks import WEEK_PATTERN, parse_week_keys, parse_iso_week, format_iso_week
+
+logger = logging.getLogger(__name__)
+
+# Canonical column -> accepted headers (lower case)
+COLUMN_ALIASES = {
+    'fundraiser_id': ['fundraiser id', 'fundraiser_id', 'id', 'personalnummer'],
+    'name': ['fundraiser name', 'fundraiser_name', 'fundraiser', 'name'],
+    'week': ['calendar week', 'calendar_week', 'week', 'kw', 'kalenderwoche'],
+    'date': ['date', 'datum'],
+    'days': ['working days', 'working_days', 'days', 'arbeitstage', 'tage'],
+    'team_leader': ['team leader', 'team_leader', 'tl', 'teamleiter', 'teamleitung'],
+}
+
+TIMESHEET_ENCODINGS = ['utf-8-sig', 'utf-8', 'cp1252', 'iso-8859-1']
+
+
+def read_timesheet(path):
+    """
+    Read a timesheet into cleaned rows.
+
+    Args:
+        path: CSV (',' or ';' separated) or XLSX file
+
+    Returns:
+        pandas DataFrame with columns week (the row's week or date text),
+        week_key (0 where unparseable), yearless (week given without a year;
+        its key has the sheet's most common year until match_timesheet
+        resolves it), name, fundraiser_id, days, date (set for sheets with
+        one row per working day) and team_leader ('' where not given)
+    """
+    raw = _read_table(path)
+    columns = {}
+    for column in raw.columns:
+        header = str(column).strip().lower()
+        for canonical, aliases in COLUMN_ALIASES.items():
+            if header in aliases and canonical not in columns.values():
+                columns[column] = canonical
+    sheet = raw.rename(columns=columns)[list(columns.values())].copy()
+
+    if 'name' not in sheet and 'fundraiser_id' not in sheet:
+        raise ValueError(f"Timesheet {os.path.basename(path)} needs a 'Fundraiser Name' or 'Fundraiser ID' column")
+    if 'week' not in sheet and 'date' not in sheet:
+        raise ValueError(f"Timesheet {os.path.basename(path)} needs a 'Calendar week' or 'Date' column")
+    if 'days' not in sheet and 'date' not in sheet:
+        raise ValueError(f"Timesheet {os.path.basename(path)} needs a 'Working days' or 'Date' column")
+
+    for column in ['name', 'fundraiser_id', 'team_leader']:
+        sheet[column] = _clean_text(sheet[column]) if column in sheet else ''
+
+    dates = pd.to_datetime(sheet['date'], errors='coerce', dayfirst=True) if 'date' in sheet else None
+    if 'week' in sheet:
+        sheet['week_key'], sheet['yearless'] = _week_keys(sheet['week'])
+        sheet['week'] = _clean_text(sheet['week'])
+    else:
+        iso = dates.dt.isocalendar()
+        sheet['week_key'] = (iso['year'] * 100 + iso['week']).fillna(0).astype(np.int32)
+        sheet['yearless'] = False
+        sheet['week'] = _clean_text(sheet['date'])
+
+    if 'days' in sheet:
+        sheet['days'] = pd.to_numeric(sheet['days'].astype(str).str.replace(',', '.', regex=False), errors='coerce')
+        sheet['date'] = pd.NaT
+    else:
+        # One working day per distinct date, counted after matching
+        sheet['days'] = 1.0
+        sheet['date'] = dates
+
+    # Rows with an unparseable week are kept for match_timesheet to report
+    sheet = sheet[(sheet['name'] != '') | (sheet['fundraiser_id'] != '')]
+    return sheet[['week', 'week_key', 'yearless', 'name', 'fundraiser_id', 'days', 'date',
+                  'team_leader']].reset_index(drop=True)
+
+
+def match_timesheet(timesheet, fundraisers_by_week, week_keys, fundraiser_ids=None):
+    """
+    Join a timesheet onto the fundraisers of an export.
+
+    Args:
+        timesheet: DataFrame as returned by read_timesheet
+        fundraisers_by_week: {week label: [fundraiser names]} of the export
+        week_keys: {week label: week key}
+        fundraiser_ids: Optional {fundraiser name: Fundraiser ID} of the export
+
+    Returns:
+        Tuple of (selection dict keyed by week label, report dict with
+        'unknown_weeks' [(timesheet week, name or ID)] for rows whose week
+        is unparseable or, without a year, fits several export weeks,
+        'unmatched' [(ISO week, timesheet name or ID)] for timesheet rows
+        that match no fundraiser of that week, 'unmatched_team_leaders'
+        [(ISO week, name)], and 'missing' [(week label, name)] for export
+        fundraisers without timesheet rows)
+    """
+    fundraiser_ids = fundraiser_ids or {}
+    roster = pd.DataFrame([(label, week_keys[label], name, str(fundraiser_ids.get(name, '')).strip())
+                           for label, names in fundraisers_by_week.items() if week_keys.get(label)
+                           for name in names],
+                          columns=['label', 'week_key', 'export_name', 'fundraiser_id'])
+    roster['name_key'] = _name_key(roster['export_name'])
+
+    sheet = timesheet.copy()
+    # Weeks without a year take the year of the export week with that
+    # number; when the export has it in several years the row is reported
+    export_weeks = {}
+    for key in set(week_keys.values()):
+        if key:
+            export_weeks.setdefault(key % 100, []).append(key)
+    yearless = sheet['yearless'].astype(bool) & (sheet['week_key'] > 0)
+    for number, keys in export_weeks.items():
+        sheet.loc[yearless & (sheet['week_key'] % 100 == number), 'week_key'] = keys[0] if len(keys) == 1 else 0
+    unknown_weeks = sheet[sheet['week_key'] == 0]
+    sheet = sheet[sheet['week_key'] > 0].copy()
+    sheet['name_key'] = _name_key(sheet['name'])
+    sheet['row'] = np.arange(len(sheet))
+
+    # IDs where both sides have one, names otherwise
+    with_id = sheet['fundraiser_id'] != ''
+    by_id = sheet[with_id].merge(roster.loc[roster['fundraiser_id'] != '', ['week_key', 'fundraiser_id', 'label', 'export_name']],
+                                 on=['week_key', 'fundraiser_id'], how='inner')
+    by_name = sheet[~sheet['row'].isin(by_id['row'])].merge(roster[['week_key', 'name_key', 'label', 'export_name']],
+                                                            on=['week_key', 'name_key'], how='left')
+    matched = pd.concat([by_id, by_name], ignore_index=True).sort_values('row')
+    unmatched_rows = matched[matched['export_name'].isna()]
+    matched = matched[matched['export_name'].notna()]
+
+    # Several rows per fundraiser and week add up; a date counts once
+    per_day = matched['date'].notna()
+    matched = pd.concat([matched[~per_day], matched[per_day].drop_duplicates(['label', 'export_name', 'date'])])
+    totals = matched.groupby(['label', 'export_name'], sort=False)['days'].sum(min_count=1)
+
+    # Resolve team leader names within the same week; everyone named is a
+    # TL and the rows naming them are their team
+    leaders = matched.loc[matched['team_leader'] != '', ['week_key', 'label', 'export_name', 'team_leader']] \
+        .drop_duplicates(['label', 'export_name'], keep='last')
+    leaders['name_key'] = _name_key(leaders['team_leader'])
+    leaders = leaders.merge(roster[['week_key', 'name_key', 'export_name']].rename(columns={'export_name': 'leader'}),
+                            on=['week_key', 'name_key'], how='left')
+    unmatched_leaders = leaders[leaders['leader'].isna()]
+    leaders = leaders[leaders['leader'].notna()]
+
+    selection = empty_selection()
+    for (label, name), days in totals.items():
+        if pd.notna(days):
+            selection['working_days'].setdefault(label, {})[name] = plain_number(days)
+
+    for (label, leader), team in leaders.groupby(['label', 'leader'], sort=True):
+        selection['team_leaders'].setdefault(label, {})[leader] = \
+            selection['working_days'].get(label, {}).get(leader, 0)
+        selection['team_assignments'].setdefault(label, {})[leader] = \
+            sorted(name for name in team['export_name'] if name != leader)
+
+    report = {
+        'unknown_weeks': sorted({(week or 'no week', name or fundraiser_id) for week, name, fundraiser_id in
+                                 zip(unknown_weeks['week'], unknown_weeks['name'], unknown_weeks['fundraiser_id'])}),
+        'unmatched': sorted({(format_iso_week(key), name or fundraiser_id) for key, name, fundraiser_id in
+                             zip(unmatched_rows['week_key'], unmatched_rows['name'], unmatched_rows['fundraiser_id'])}),
+        'unmatched_team_leaders': sorted({(format_iso_week(key), name) for key, name in
+                                          zip(unmatched_leaders['week_key'], unmatched_leaders['team_leader'])}),
+        'missing': missing_working_days(fundraisers_by_week, selection),
+    }
+    return selection, report
+
+
+def format_report(report):
+    """Readable lines for a match_timesheet report."""
+    lines = []
+    if report['unknown_weeks']:
+        lines.append("Unreadable or ambiguous weeks: " + ", ".join(f"{name} ({week})"
+                                                                 for week, name in report['unknown_weeks']))
+    if report['unmatched']:
+        lines.append("Not in the export: " + ", ".join(f"{name} ({week})" for week, name in report['unmatched']))
+    if report['unmatched_team_leaders']:
+        lines.append("Unknown team leaders: " + ", ".join(f"{name} ({week})"
+                                                          for week, name in report['unmatched_team_leaders']))
+    if report['missing']:
+        lines.append("No timesheet entry: " + ", ".join(f"{name} ({week})" for week, name in report['missing']))
+    return lines
+
+
+def timesheet_selection(path, default_days=None):
+    """
+    request_selection for pipeline.process_export that answers from a timesheet.
+
+    Args:
+        path: Timesheet CSV or XLSX file
+        default_days: Working days for fundraisers without timesheet rows;
+            when None, any missing working days raise MissingWorkingDays
+
+    Returns:
+        Callable taking (fundraisers_by_week, week_keys, fundraiser_ids)
+    """
+    def request_selection(fundraisers_by_week, week_keys, fundraiser_ids=None):
+        selection, report = match_timesheet(read_timesheet(path), fundraisers_by_week, week_keys, fundraiser_ids)
+        for line in format_report(report):
+            logger.warning("Timesheet: %s", line)
+
+        if report['missing'] and default_days is None:
+            raise MissingWorkingDays(f"Timesheet {os.path.basename(path)} has no working days for "
+                             f"{len(report['missing'])} fundraiser-weeks (see above)")
+        for label, name in report['missing']:
+            selection['working_days'].setdefault(label, {})[name] = default_days
+        return lambda: selection
+    return request_selection
+
+
+def _read_table(path):
+    if os.path.splitext(path)[1].lower() in ('.xlsx', '.xlsm', '.xls'):
+        try:
+            return pd.read_excel(path, dtype=str)
+        except ImportError:
+            raise ValueError("Reading .xlsx timesheets needs openpyxl (pip install openpyxl); "
+                             "or save the sheet as CSV")
+
+    last_error = None
+    for encoding in TIMESHEET_ENCODINGS:
+        try:
+            return pd.read_csv(path, sep=None, engine='python', dtype=str, encoding=encoding)
+        except UnicodeDecodeError as e:
+            last_error = e
+    raise ValueError(f"Could not decode timesheet {os.path.basename(path)}: {last_error}")
+
+
+def _week_keys(values):
+    """
+    Week keys from export week labels ('18/2025', 'KW18') or ISO weeks ('2025-W18').
+
+    Returns the keys and a mask of the labels without a year.
+    """
+    keys = parse_week_keys(values)
+    text = pd.Series(np.asarray(values, dtype=object)).astype(str)
+    iso = text.str.match(r'^\s*\d{4}-?W\d{1,2}\s*$', case=False)
+    if iso.any():
+        keys[iso.to_numpy()] = [parse_iso_week(value) for value in text[iso]]
+    parts = text.str.extract(WEEK_PATTERN)
+    return keys, (parts[0].notna() & parts[1].isna()).to_numpy()
+
+
+def _clean_text(values):
+    return values.fillna('').astype(str).str.strip()
+
+
+def _name_key(names):
+    """Case- and whitespace-insensitive form of names for matching."""
+    return pd.Series(names, dtype=object).fillna('').astype(str).str.strip() \
+        .str.replace(r'\s+', ' ', regex=True).str.casefold().to_numpy()
+
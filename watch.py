@@ -0,0 +1,245 @@
+"""
+Watch a folder and process new exports as they arrive.
+
+Exports dropped into the watched folder are picked up once they stop
+changing for SETTLE_S seconds (so files still being copied are left
+alone), processed into an output tree, and recorded in a processed-files
+index keyed by content hash. A file that was already processed, under any
+name, is not processed again.
+
+    output_root/
+        processed.json                       # {sha256: {file, output_file, rows, ...}}
+        <export name>_<hash>/
+            <export name>_formatted.csv
+            pdf/...
+
+Run headless with `python watch.py <folder> --assignments assignments.json`;
+the GUI's "Watch Folder" button uses the same FolderWatcher.
+"""
+import datetime
+import hashlib
+import json
+import logging
+import os
+import time
+
+logger = logging.getLogger(__name__)
+
+# Seconds a file's size and modification time must stay unchanged before it is processed
+SETTLE_S = 5.0
+
+# Seconds between folder scans
+SCAN_INTERVAL_S = 2.0
+
+INDEX_FILE = 'processed.json'
+INDEX_VERSION = 1
+
+# Files that are never exports: our own output and temporary files of
+# editors, browsers and copy tools
+IGNORED_SUFFIXES = ('_formatted.csv',)
+IGNORED_PREFIXES = ('.', '~$')
+
+
+def file_digest(path, chunk_size=1 << 20):
+    """SHA-256 of a file's content."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def load_index(path):
+    """Processed-files index: {sha256: entry}, empty if there is none yet."""
+    if not os.path.exists(path):
+        return {}
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f).get('files', {})
+
+
+def save_index(files, path):
+    """Write the index, replacing the file only once it is complete."""
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    temp_path = path + '.tmp'
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        json.dump({'version': INDEX_VERSION, 'files': files}, f, ensure_ascii=False, indent=2, sort_keys=True)
+    os.replace(temp_path, path)
+
+
+class FolderWatcher:
+    """
+    Finds exports in a folder that are complete and not processed yet.
+
+    Call ready_files() periodically; process each file it returns into
+    output_paths() and report the outcome with mark_processed() or
+    mark_failed(). Failed files are retried once their content changes or
+    the watcher is restarted.
+    """
+
+    def __init__(self, directory, output_root=None, settle_s=SETTLE_S, clock=time.monotonic):
+        """
+        Args:
+            directory: Folder to watch (not recursive)
+            output_root: Output tree (default: 'processed' inside directory)
+            settle_s: Seconds a file must stay unchanged before it counts as complete
+            clock: Time source in seconds (for tests)
+        """
+        self.directory = os.path.abspath(directory)
+        self.output_root = os.path.abspath(output_root or os.path.join(self.directory, 'processed'))
+        self.index_path = os.path.join(self.output_root, INDEX_FILE)
+        self.settle_s = settle_s
+        self.clock = clock
+        self.index = load_index(self.index_path)
+        self.pending = {}   # path -> ((size, mtime_ns), time first seen with that state)
+        self.handled = {}   # path -> (size, mtime_ns) already returned or skipped
+        self.failed = set()  # digests that failed in this session
+        self.in_progress = set()
+
+        if not os.path.isdir(self.directory):
+            raise ValueError(f"Watch folder does not exist: {self.directory}")
+
+    def ready_files(self):
+        """
+        Exports that have settled and whose content was not processed yet.
+
+        Returns:
+            List of (path, sha256) tuples; each is returned once until
+            mark_processed or mark_failed is called for it
+        """
+        now = self.clock()
+        ready = []
+        for path, state in self._scan().items():
+            if self.handled.get(path) == state:
+                continue
+            seen = self.pending.get(path)
+            if seen is None or seen[0] != state:
+                # New or still changing: wait for it to settle
+                self.pending[path] = (state, now)
+                continue
+            if now - seen[1] < self.settle_s:
+                continue
+
+            try:
+                digest = file_digest(path)
+            except OSError:
+                # Still locked by the program writing it (Windows); try again later
+                continue
+            del self.pending[path]
+            self.handled[path] = state
+            if digest in self.index or digest in self.failed or digest in self.in_progress:
+                continue
+            self.in_progress.add(digest)
+            ready.append((path, digest))
+        return ready
+
+    def output_paths(self, path, digest):
+        """(formatted CSV path, PDF directory) in the output tree for an export, created if needed."""
+        name = os.path.splitext(os.path.basename(path))[0]
+        folder = os.path.join(self.output_root, f"{name}_{digest[:8]}")
+        os.makedirs(folder, exist_ok=True)
+        return os.path.join(folder, f"{name}_formatted.csv"), os.path.join(folder, 'pdf')
+
+    def mark_processed(self, path, digest, result):
+        """Record a processed export in the index."""
+        self.in_progress.discard(digest)
+        output_file, pdf_dir = self.output_paths(path, digest)
+        self.index[digest] = {
+            'file': os.path.basename(path),
+            'processed_at': datetime.datetime.now().isoformat(timespec='seconds'),
+            'output_file': os.path.relpath(output_file, self.output_root),
+            'rows': result['rows'],
+            'pdf_files': len(result['pdf_files']),
+            'rules_version': result['rules_version'],
+        }
+        save_index(self.index, self.index_path)
+
+    def mark_failed(self, path, digest):
+        """Skip an export until its content changes or the watcher restarts."""
+        self.in_progress.discard(digest)
+        self.failed.add(digest)
+
+    def _scan(self):
+        """{path: (size, mtime_ns)} of the candidate exports in the folder."""
+        files = {}
+        for entry in os.scandir(self.directory):
+            name = entry.name
+            if (not entry.is_file() or not name.lower().endswith('.csv')
+                    or name.lower().endswith(IGNORED_SUFFIXES) or name.startswith(IGNORED_PREFIXES)):
+                continue
+            stat = entry.stat()
+            files[entry.path] = (stat.st_size, stat.st_mtime_ns)
+        for path in list(self.pending):
+            if path not in files:
+                del self.pending[path]
+        return files
+
+
+def watch(directory, output_root=None, options=None, interval=SCAN_INTERVAL_S, settle_s=SETTLE_S, once=False):
+    """
+    Process new exports in a folder until interrupted.
+
+    Args:
+        directory: Folder to watch
+        output_root: Output tree (default: 'processed' inside directory)
+        options: pipeline.PipelineConfig keyword arguments shared by every
+            run (rules, assignments_file, timesheet_file, default_days)
+        interval: Seconds between scans
+        settle_s: Seconds a file must stay unchanged before it is processed
+        once: Stop as soon as no file is pending (for scripts and tests)
+
+    Returns:
+        Number of exports processed
+    """
+    from pipeline import PipelineConfig, run
+
+    watcher = FolderWatcher(directory, output_root, settle_s)
+    logger.info("Watching %s (output: %s)", watcher.directory, watcher.output_root)
+    processed = 0
+    while True:
+        for path, digest in watcher.ready_files():
+            output_file, pdf_dir = watcher.output_paths(path, digest)
+            logger.info("Processing %s", os.path.basename(path))
+            try:
+                result = run(PipelineConfig(path, output_file, pdf_dir, **(options or {})))
+            except Exception as e:
+                logger.error("%s failed: %s", os.path.basename(path), e, exc_info=True)
+                watcher.mark_failed(path, digest)
+                continue
+            watcher.mark_processed(path, digest, result)
+            processed += 1
+            logger.info("%s: %d rows, %d PDF files -> %s", os.path.basename(path), result['rows'],
+                        len(result['pdf_files']), os.path.dirname(output_file))
+        if once and not watcher.pending:
+            return processed
+        time.sleep(interval)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from logs import add_logging_arguments, configure_from_args
+    from pipeline import add_config_arguments, config_options
+
+    parser = argparse.ArgumentParser(description='Watch a folder and process new exports from saved assignments')
+    parser.add_argument('directory', help='Folder the exports are dropped into')
+    parser.add_argument('--output', '-o', dest='output_root',
+                        help="Output tree (defaults to 'processed' inside the watched folder)")
+    add_config_arguments(parser)
+    parser.add_argument('--interval', type=float, default=SCAN_INTERVAL_S,
+                        help=f'Seconds between folder scans (default: {SCAN_INTERVAL_S:g})')
+    parser.add_argument('--settle', type=float, default=SETTLE_S,
+                        help=f'Seconds a file must stay unchanged before it is processed (default: {SETTLE_S:g})')
+    parser.add_argument('--once', action='store_true',
+                        help='Process what is in the folder now and exit')
+
+    add_logging_arguments(parser)
+
+    args = parser.parse_args()
+    # Each processed export is worth a line here
+    configure_from_args(args, default=logging.INFO)
+
+    try:
+        count = watch(args.directory, args.output_root, config_options(args), args.interval, args.settle, args.once)
+        print(f"\nProcessed {count} exports")
+    except KeyboardInterrupt:
+        print("\nStopped watching")
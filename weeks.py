@@ -0,0 +1,168 @@
+import re
+import datetime
+
+import numpy as np
+import pandas as pd
+
+# Calendar week formats found in the agency exports: "18/2025", "KW5", "KW 5/2025"
+WEEK_PATTERN = re.compile(r'^\s*(?:KW\s*)?(\d{1,2})(?:\s*/\s*(\d{4}))?\s*$', re.IGNORECASE)
+
+# ISO week notation used in rules.json: "2025-W18"
+ISO_WEEK_PATTERN = re.compile(r'^\s*(\d{4})-?W(\d{1,2})\s*$', re.IGNORECASE)
+
+MONTH_NAMES = ["Januar", "Februar", "März", "April", "Mai", "Juni", "Juli",
+               "August", "September", "Oktober", "November", "Dezember"]
+
+
+def week_key(year, week):
+    """Combine ISO year and week into one sortable integer key (2025, 18) -> 202518."""
+    return int(year) * 100 + int(week)
+
+
+def split_week_key(key):
+    """Split an integer week key back into (year, week)."""
+    return int(key) // 100, int(key) % 100
+
+
+def format_iso_week(key):
+    """Format a week key as ISO week notation, e.g. 202518 -> '2025-W18'."""
+    year, week = split_week_key(key)
+    return f"{year}-W{week:02d}"
+
+
+def parse_iso_week(text):
+    """Parse ISO week notation ('2025-W18') into a week key."""
+    match = ISO_WEEK_PATTERN.match(str(text))
+    if not match:
+        raise ValueError(f"Invalid ISO week {text!r}, expected e.g. '2025-W18'")
+    year, week = int(match.group(1)), int(match.group(2))
+    if not 1 <= week <= 53:
+        raise ValueError(f"Invalid ISO week {text!r}, week must be 1-53")
+    return week_key(year, week)
+
+
+def parse_week_keys(calendar_weeks, default_year=None, created=None):
+    """
+    Parse 'Calendar week' values into integer (year, week) keys.
+
+    Each distinct value is parsed once. Weeks without a year ("KW5") take the
+    ISO year of the row's creation date when given (choosing the year that
+    puts the week closest to that date, so KW1 created on 30 Dec lands in
+    the new year), otherwise default_year, which defaults to the most common
+    explicit year in the data.
+
+    Args:
+        calendar_weeks: Sequence or Series of calendar week strings
+        default_year: Year for week values that carry no year
+        created: Optional per-row creation dates ('Time Created') used to
+            infer missing years
+
+    Returns:
+        NumPy int32 array of year * 100 + week keys (0 where unparseable)
+    """
+    values = pd.Series(np.atleast_1d(np.asarray(calendar_weeks, dtype=object)))
+    codes, uniques = pd.factorize(values, use_na_sentinel=True)
+
+    parts = pd.Series(uniques, dtype=object).astype(str).str.extract(WEEK_PATTERN)
+    unique_weeks = pd.to_numeric(parts[0], errors='coerce').to_numpy(dtype=float)
+    unique_years = pd.to_numeric(parts[1], errors='coerce').to_numpy(dtype=float)
+
+    if default_year is None:
+        explicit = pd.Series(unique_years[codes[codes >= 0]]).dropna()
+        default_year = int(explicit.mode().iloc[0]) if not explicit.empty else datetime.date.today().year
+
+    found = codes >= 0
+    weeks = np.full(len(values), np.nan)
+    years = np.full(len(values), np.nan)
+    weeks[found] = unique_weeks[codes[found]]
+    years[found] = unique_years[codes[found]]
+
+    if created is not None:
+        missing = np.isnan(years) & ~np.isnan(weeks)
+        if missing.any():
+            years[missing] = _years_near(weeks[missing], pd.Series(np.asarray(created, dtype=object))[missing])
+
+    years = np.where(np.isnan(years), default_year, years)
+    valid = (weeks >= 1) & (weeks <= 53)
+    return np.where(valid, years * 100 + np.nan_to_num(weeks), 0).astype(np.int32)
+
+
+def resolve_week_keys(calendar_weeks, known_keys=None):
+    """
+    Week keys for calendar week labels, preferring keys already resolved.
+
+    The formatted CSV no longer has the creation dates used to place
+    yearless weeks, so the report generators take the export's
+    {label: week key} mapping and only parse labels missing from it.
+    """
+    keys = parse_week_keys(calendar_weeks)
+    if known_keys:
+        mapped = pd.Series(np.atleast_1d(np.asarray(calendar_weeks, dtype=object))).map(known_keys)
+        keys = np.where(mapped.notna(), mapped.fillna(0), keys).astype(np.int32)
+    return keys
+
+
+def week_key_map(df):
+    """{Calendar week label: week key} for the donor rows of a parsed export."""
+    return df[df['week_key'] > 0].groupby('Calendar week', observed=True)['week_key'].first().to_dict()
+
+
+def parse_created_dates(values):
+    """
+    'Time Created' values as datetimes (NaT where missing or unparseable).
+
+    Each distinct value is parsed once, with format='mixed' so one inferred
+    format does not turn the other dates ('Jan 12, 2026' after 'May 1, 2025')
+    into NaT. The result has a fresh RangeIndex.
+    """
+    if isinstance(values, pd.Series):
+        values = values.reset_index(drop=True)
+    else:
+        values = pd.Series(np.atleast_1d(np.asarray(values, dtype=object)))
+    codes, uniques = pd.factorize(values)
+    parsed = pd.to_datetime(pd.Series(uniques, dtype=object).astype(str), errors='coerce', format='mixed')
+    return pd.Series(np.append(parsed.to_numpy(), np.datetime64('NaT'))[codes])
+
+
+def _years_near(weeks, created):
+    """Year for each week number that puts it closest to the matching creation date."""
+    iso = parse_created_dates(created).dt.isocalendar()
+    created_year = iso['year'].to_numpy(dtype=float, na_value=np.nan)
+    created_week = iso['week'].to_numpy(dtype=float, na_value=np.nan)
+
+    # Distance in weeks from the created date for the previous, same and next year
+    candidates = created_year[:, None] + np.array([-1, 0, 1])
+    distance = np.abs((candidates - created_year[:, None]) * 52 + weeks[:, None] - created_week[:, None])
+    best = candidates[np.arange(len(weeks)), np.argmin(np.nan_to_num(distance, nan=np.inf), axis=1)]
+    return np.where(np.isnan(created_year), np.nan, best)
+
+
+def parse_week_key(calendar_week, default_year=None):
+    """Scalar version of parse_week_keys."""
+    return int(parse_week_keys([calendar_week], default_year)[0])
+
+
+def iso_week_monday(key):
+    """Monday of the ISO week of a week key."""
+    year, week = split_week_key(key)
+    try:
+        return datetime.date.fromisocalendar(year, week, 1)
+    except ValueError:
+        # Week 53 in a year with 52 ISO weeks: treat as the following week 1
+        return datetime.date.fromisocalendar(year + 1, 1, 1)
+
+
+def iso_month(key):
+    """
+    Calendar (year, month) an ISO week belongs to.
+
+    A week counts towards the month that contains its Thursday, the same rule
+    that assigns weeks to ISO years.
+    """
+    thursday = iso_week_monday(key) + datetime.timedelta(days=3)
+    return thursday.year, thursday.month
+
+
+def month_name(key):
+    """German month name for a week key, e.g. 202518 -> 'Mai'."""
+    return MONTH_NAMES[iso_month(key)[1] - 1]
@@ -0,0 +1,168 @@
+"""
+Run pipeline.run in a separate process for the GUI.
+
+pandas and ReportLab hold the GIL for long stretches, so processing in a
+thread of the Tk process makes the window stutter. The GUI instead starts a
+WorkerProcess and polls it from the Tk main loop. Both sides exchange
+(message type, payload) tuples over two queues:
+
+    worker -> GUI   ('progress', progress.Progress update dict)
+                    ('tl_request', ({week: [fundraiser names]}, {week: week key},
+                                    {fundraiser name: Fundraiser ID}))
+                    ('result', {'rows': ..., 'pdf_files': ..., 'rules_version': ..., 'preview': ...})
+                    ('error', error message)
+                    ('cancelled', None)
+                    ('log', logging.LogRecord), handled inside poll()
+    GUI -> worker   ('tl_response', selection dict, or None if the dialog was cancelled)
+                    ('cancel', None)
+"""
+import logging
+import logging.handlers
+import multiprocessing
+import queue
+import time
+
+import logs
+
+MSG_PROGRESS = 'progress'
+MSG_TL_REQUEST = 'tl_request'
+MSG_TL_RESPONSE = 'tl_response'
+MSG_RESULT = 'result'
+MSG_ERROR = 'error'
+MSG_CANCEL = 'cancel'
+MSG_CANCELLED = 'cancelled'
+MSG_LOG = 'log'
+
+logger = logging.getLogger(__name__)
+
+# Seconds a cancelled worker gets to stop on its own before it is terminated
+CANCEL_GRACE_S = 2.0
+
+
+class _EventLogHandler(logging.handlers.QueueHandler):
+    """Sends the worker's log records to the GUI as ('log', record) events."""
+
+    def enqueue(self, record):
+        self.queue.put((MSG_LOG, record))
+
+
+def _run_job(config, events, replies, cancel_event, log_settings=None):
+    """Entry point of the worker process."""
+    # The GUI process writes the records to its console and log file
+    logs.configure(console=False, handlers=[_EventLogHandler(events)], **(log_settings or {}))
+
+    # Imported here so the GUI process does not pay for them when it only
+    # needs the protocol constants
+    from pipeline import run
+    from progress import Progress, Cancelled
+
+    progress = Progress(lambda update: events.put((MSG_PROGRESS, update)), cancel_event)
+
+    def request_selection(fundraisers_by_week, week_keys, fundraiser_ids=None):
+        events.put((MSG_TL_REQUEST, (fundraisers_by_week, week_keys, fundraiser_ids)))
+
+        def wait():
+            # Blocks without CPU until the GUI answers or cancels
+            message, payload = replies.get()
+            if message == MSG_CANCEL:
+                raise Cancelled("Processing was cancelled")
+            return payload
+        return wait
+
+    try:
+        # The team leader selection always comes from the GUI
+        config.request_selection = request_selection
+        result = run(config, progress)
+        events.put((MSG_RESULT, result))
+    except Cancelled:
+        events.put((MSG_CANCELLED, None))
+    except Exception as e:
+        logger.exception("Processing %s failed", config.input_file)
+        events.put((MSG_ERROR, str(e)))
+
+
+class WorkerProcess:
+    """GUI-side handle of one processing run in a separate process."""
+
+    def __init__(self, config):
+        """
+        Args:
+            config: pipeline.PipelineConfig of the run; its rules are best a
+                loaded CompiledRules, so the worker does not load and compile
+                the rules file again
+        """
+        # spawn everywhere: fork would copy the Tk process state on Linux
+        context = multiprocessing.get_context('spawn')
+        self.events = context.Queue()
+        self.replies = context.Queue()
+        self.cancel_event = context.Event()
+        self.process = context.Process(target=_run_job, daemon=True,
+                                       args=(config, self.events, self.replies, self.cancel_event, logs.settings()))
+        self.cancel_deadline = None
+        self.finished = False
+
+    def start(self):
+        self.process.start()
+
+    def send_selection(self, selection):
+        """Answer a 'tl_request' with the dialog's selection, or None if it was cancelled."""
+        self.replies.put((MSG_TL_RESPONSE, selection))
+
+    def cancel(self):
+        """
+        Ask the worker to stop.
+
+        The worker checks for cancellation between stages, after each
+        fundraiser's report and while waiting for the team leader selection;
+        poll() terminates it if it has not stopped within CANCEL_GRACE_S.
+        """
+        if self.finished or self.cancel_deadline is not None:
+            return
+        self.cancel_event.set()
+        self.replies.put((MSG_CANCEL, None))
+        self.cancel_deadline = time.monotonic() + CANCEL_GRACE_S
+
+    def poll(self):
+        """
+        Messages the worker sent since the last call, without blocking.
+
+        Once the run has ended the list closes with exactly one 'result',
+        'error' or 'cancelled' message, also when the process died or had to
+        be terminated.
+        """
+        messages = []
+        if self.finished:
+            return messages
+
+        alive = self.process.is_alive()
+        while True:
+            try:
+                message, payload = self.events.get_nowait()
+            except queue.Empty:
+                break
+            if message == MSG_LOG:
+                logging.getLogger(payload.name).handle(payload)
+            else:
+                messages.append((message, payload))
+
+        if any(message in (MSG_RESULT, MSG_ERROR, MSG_CANCELLED) for message, _ in messages):
+            self._finish()
+        elif self.cancel_deadline is not None and time.monotonic() >= self.cancel_deadline:
+            self.process.terminate()
+            self._finish()
+            messages.append((MSG_CANCELLED, None))
+        elif not alive:
+            # Checked before draining: anything sent before the exit is in messages
+            self._finish()
+            if self.cancel_deadline is not None:
+                messages.append((MSG_CANCELLED, None))
+            else:
+                messages.append((MSG_ERROR, f"Processing stopped unexpectedly (exit code {self.process.exitcode})"))
+        return messages
+
+    def _finish(self):
+        self.finished = True
+        self.process.join(timeout=CANCEL_GRACE_S)
+        if self.process.is_alive():
+            self.process.terminate()
+            self.process.join()